@@ -1,22 +1,47 @@
 from pydub import AudioSegment
-import json
+import numpy as np
+import logging
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 import yt_dlp
-from typing import Dict, List, Union, Optional
+from typing import Any, Callable, Dict, Iterator, List, Union, Optional, Tuple
+from app.data_instances.language_prediction import LanguagePrediction
 from app.data_instances.video_meta import VideoMetaData
-from tqdm import tqdm
-from app.utils.transcription_utils import (
-    calculate_similarity,
-    find_longest_common_substring,
-    clean_transcription,
-)
-from app.utils.common_utils import save_json
+from app.data_instances.video_stage import VideoStage
+from app.utils.transcription_utils import clean_transcription
+from app.utils.common_utils import load_json, save_json
 from app.utils.file_utils import create_dir
+from app.utils.audio_utils import export_chunks_parallel, get_chunk_duration
 from app.db.db_functions import insert_video_metadata
+from app.db.metadata_writer import VideoMetadataWriter
+from app.db.checkpoint import VideoCheckpoint
+from app.storage.manifest import ManifestWriter
+from app.storage.pcm_shards import PCMShardWriter
+from app.metrics import (
+    ASR_REAL_TIME_FACTOR,
+    CHUNKS_PER_VIDEO,
+    DOWNLOAD_BYTES,
+    DOWNLOAD_BYTES_PER_SECOND,
+    LID_LANGUAGES,
+    PERCENT_MATCH,
+    STAGE_ITEMS,
+    STAGE_SECONDS,
+)
+from app.tracing import TRACER
+from app.serving.protocol import ModelServerUnavailableError
 from app.models.speech_language_detection.speech_language_detection import (
     SpeechLanguageDetection,
 )
 from app.models.asr.asr import ASR
+from app.similarity.similarity_scorer import SimilarityScorer
+from app.similarity.lcs_scorer import LCSScorer
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+REQUIRED_LANGUAGE = "hi"
 
 
 class AudioProcessor:
@@ -29,13 +54,57 @@ class AudioProcessor:
         SpeechLanguageDetection object to detect the language of the audio
     asr: ``ASR``
         ASR object to transcribe the audio
+    similarity_scorer: ``Optional[SimilarityScorer]``, ( default = None )
+        SimilarityScorer object to match the YouTube and ASR transcriptions,
+        the longest common substring scorer is used if not given
+    chunk_format: ``str``, ( default = "mp3" )
+        The format of the exported chunks, one of "mp3", "flac" and "wav"
+    export_engine: ``str``, ( default = "pydub" )
+        "pydub" exports each chunk from the decoded audio, "ffmpeg" exports many
+        chunks per ffmpeg process straight from the audio file
+    export_workers: ``int``, ( default = 1 )
+        The number of chunk exports or ffmpeg processes running at the same time
+    chunks_per_export_process: ``int``, ( default = 64 )
+        The number of chunks exported by one ffmpeg process of the "ffmpeg" engine
+    metadata_writer: ``Optional[VideoMetadataWriter]``, ( default = None )
+        VideoMetadataWriter object to write the metadata of the valid videos in batches,
+        each video is inserted on its own if not given
+    checkpoint: ``Optional[VideoCheckpoint]``, ( default = None )
+        VideoCheckpoint object to record the stage of each video and the model results,
+        so an interrupted video resumes from its last finished stage
+    shard_writer: ``Optional[PCMShardWriter]``, ( default = None )
+        PCMShardWriter object to pack the chunks into PCM shards instead of writing
+        one audio file per chunk, the videos are then always processed in memory
+    manifest_writer: ``Optional[ManifestWriter]``, ( default = None )
+        ManifestWriter object to append a row for every accepted chunk to the dataset
+        manifest
     """
 
     def __init__(
-        self, speech_language_detector: SpeechLanguageDetection, asr: ASR
+        self,
+        speech_language_detector: SpeechLanguageDetection,
+        asr: ASR,
+        similarity_scorer: Optional[SimilarityScorer] = None,
+        chunk_format: str = "mp3",
+        export_engine: str = "pydub",
+        export_workers: int = 1,
+        chunks_per_export_process: int = 64,
+        metadata_writer: Optional[VideoMetadataWriter] = None,
+        checkpoint: Optional[VideoCheckpoint] = None,
+        shard_writer: Optional[PCMShardWriter] = None,
+        manifest_writer: Optional[ManifestWriter] = None,
     ) -> None:
         self.speech_language_detector = speech_language_detector
         self.asr = asr
+        self.similarity_scorer = similarity_scorer or LCSScorer()
+        self.chunk_format = chunk_format
+        self.export_engine = export_engine
+        self.export_workers = export_workers
+        self.chunks_per_export_process = chunks_per_export_process
+        self.metadata_writer = metadata_writer
+        self.checkpoint = checkpoint
+        self.shard_writer = shard_writer
+        self.manifest_writer = manifest_writer
 
     def download_audio(
         self, url: str, root_path: Union[str, Path], format: str
@@ -55,7 +124,7 @@ class AudioProcessor:
         ``Path``
             Path to the downloaded audio
         """
-        print(f"Downloading audio from {url}")
+        logger.info(f"Downloading audio from {url}")
         if isinstance(root_path, str):
             root_path = Path(root_path)
 
@@ -63,6 +132,11 @@ class AudioProcessor:
         audio_file_path = download_path.with_suffix(f".{format}")
 
         if audio_file_path.exists():
+            # the audio was downloaded before an interruption that came before the
+            # stage was recorded
+            STAGE_ITEMS.inc(stage="download", status="cached")
+            if self.checkpoint:
+                self.checkpoint.mark(url.split("=")[-1], VideoStage.DOWNLOADED)
             return audio_file_path
 
         ydl_opts = {
@@ -74,25 +148,108 @@ class AudioProcessor:
                 }
             ],
             "outtmpl": str(download_path),
-            "quiet": True
+            "quiet": True,
+            "postprocessor_hooks": [self._trace_postprocessor],
         }
+        start_time = time.perf_counter()
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl, TRACER.span("download", url=url):
                 ydl.download(url)
         except Exception as e:
-            print(f"Exception occurred while downloading audio: {e}")
+            STAGE_ITEMS.inc(stage="download", status="failed")
+            logger.warning(f"Exception occurred while downloading audio: {e}")
             return None
 
+        elapsed_time = time.perf_counter() - start_time
+        STAGE_SECONDS.observe(elapsed_time, stage="download")
+        if not audio_file_path.exists():
+            STAGE_ITEMS.inc(stage="download", status="missing")
+        else:
+            size_bytes = audio_file_path.stat().st_size
+            STAGE_ITEMS.inc(stage="download", status="ok")
+            DOWNLOAD_BYTES.inc(size_bytes)
+            DOWNLOAD_BYTES_PER_SECOND.observe(size_bytes / max(elapsed_time, 1e-9))
+            logger.info(
+                f"Downloaded {size_bytes / (1024 * 1024):.2f} MB from {url} in {elapsed_time:.2f}s"
+            )
+            if self.checkpoint:
+                self.checkpoint.mark(url.split("=")[-1], VideoStage.DOWNLOADED)
+
         return audio_file_path
 
+    def _trace_postprocessor(self, status: Dict[str, Any]):
+        # the yt-dlp postprocessors report their start and end on the download thread
+        if status["status"] == "started":
+            TRACER.begin("postprocess", postprocessor=status.get("postprocessor"))
+        elif status["status"] == "finished":
+            TRACER.end("postprocess")
+
+    def iter_downloaded_audios(
+        self,
+        urls: List[str],
+        root_path: Union[str, Path],
+        format: str,
+        workers: int = 4,
+        lookahead: int = 8,
+    ) -> Iterator[Tuple[str, Optional[Path]]]:
+        """
+        Download the audios on a thread pool and yield them in completion order. At most
+        ``lookahead`` downloads are in flight or waiting to be consumed, so the downloads
+        stay only a bounded window ahead of the processing.
+
+        Parameters
+        ----------
+        urls: ``List[str]``
+            Youtube urls of the videos to download
+        root_path: ``Union[str, Path]``
+            Path to save the downloaded audios
+        format: ``str``
+            Format to download the audio
+        workers: ``int``, ( default = 4 )
+            The number of concurrent downloads, at most ``lookahead``
+        lookahead: ``int``, ( default = 8 )
+            The maximum number of downloads ahead of the consumer
+
+        Returns
+        -------
+        ``Iterator[Tuple[str, Optional[Path]]]``
+            The url and the path to its downloaded audio, None if the download failed
+        """
+        pending_urls = iter(urls)
+        futures = {}
+        lookahead = max(lookahead, 1)
+
+        # more workers than the lookahead would only idle, the window bounds the downloads
+        with ThreadPoolExecutor(max_workers=max(min(workers, lookahead), 1)) as executor:
+            for url in pending_urls:
+                futures[executor.submit(self.download_audio, url, root_path, format)] = url
+                if len(futures) >= lookahead:
+                    break
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    yield url, future.result()
+
+                    next_url = next(pending_urls, None)
+                    if next_url is not None:
+                        futures[
+                            executor.submit(
+                                self.download_audio, next_url, root_path, format
+                            )
+                        ] = next_url
+
     def split_audio_and_save_transcription(
         self,
         audio_path: Path,
         audio_chunk_save_folder: str,
         transcription_data: List[Dict[str, str]],
+        audio: Optional[AudioSegment] = None,
     ):
         """
-        Split the audio into chunks and save the transcription of each chunk in a json file
+        Split the audio into chunks and save the transcription of each chunk in a json file.
+        The chunks are exported with the ``export_engine`` on ``export_workers`` workers.
 
         Parameters
         ----------
@@ -100,31 +257,215 @@ class AudioProcessor:
             Path to the audio file to split into chunks
         transcription_data: ``List[Dict[str, str]]``
             A list of dictionaries containing text and time of the audio
+        audio: ``Optional[AudioSegment]``, ( default = None )
+            The already decoded mono audio, the audio file is decoded if not given
         """
         transcript = {}
-        audio = AudioSegment.from_mp3(audio_path)
-        audio = audio.set_channels(1)
-        audio_path = Path(audio_path)
+        chunks = {}
         create_dir(audio_chunk_save_folder)
 
         for data in transcription_data:
-            start_time = data["start"]
-            end_time = data["start"] + data["duration"]
-            audio_chunk = audio[start_time * 1000 : end_time * 1000]
-            file_name = f"{start_time}_{end_time}.mp3"
-            audio_chunk.export(f"{audio_chunk_save_folder}/{file_name}", format="mp3")
+            file_name = self.get_chunk_name(data)
+            chunks[file_name] = (
+                data["start"],
+                data["start"] + data["duration"],
+                Path(audio_chunk_save_folder) / file_name,
+            )
             transcript[file_name] = data["text"]
 
-        with open(f"{audio_chunk_save_folder}/transcript.json", "w") as f:
-            json.dump(transcript, f, ensure_ascii=False)
+        if self.export_engine == "ffmpeg":
+            with TRACER.span("export_chunks", chunks=len(chunks)):
+                export_chunks_parallel(
+                    audio_path,
+                    list(chunks.values()),
+                    self.chunk_format,
+                    self.export_workers,
+                    self.chunks_per_export_process,
+                )
+        else:
+            if audio is None:
+                with TRACER.span("decode", path=str(audio_path)):
+                    audio = AudioSegment.from_file(audio_path)
+                    audio = audio.set_channels(1)
+
+            def export_chunk(start_time: float, end_time: float, chunk_path: Path):
+                with TRACER.span("export_chunk", chunk=chunk_path.name):
+                    audio_chunk = audio[start_time * 1000 : end_time * 1000]
+                    audio_chunk.export(chunk_path, format=self.chunk_format)
+
+            with ThreadPoolExecutor(max_workers=self.export_workers) as executor, TRACER.span(
+                "export_chunks", chunks=len(chunks)
+            ):
+                for future in [
+                    executor.submit(export_chunk, *chunk) for chunk in chunks.values()
+                ]:
+                    future.result()
+
+        # transcript.json is written last and renamed into place, so its presence
+        # means every chunk of the folder is complete
+        save_json(
+            transcript, Path(audio_chunk_save_folder) / "transcript.json", ensure_ascii=False
+        )
+
+    def get_chunk_name(self, data: Dict[str, str]) -> str:
+        """
+        Get the file name of the audio chunk of a transcript segment
+
+        Parameters
+        ----------
+        data: ``Dict[str, str]``
+            A dictionary containing text and time of the segment
+
+        Returns
+        -------
+        ``str``
+            The chunk file name in the format ``{start}_{end}.{chunk_format}``
+        """
+        return f"{data['start']}_{data['start'] + data['duration']}.{self.chunk_format}"
+
+    def decode_audio(self, audio_path: Path) -> Tuple[AudioSegment, np.ndarray]:
+        """
+        Decode the audio file once into a mono ``AudioSegment`` and a 16 kHz mono float
+        signal in ``[-1, 1]`` that the models can consume directly
+
+        Parameters
+        ----------
+        audio_path: ``Path``
+            Path to the audio file to decode
+
+        Returns
+        -------
+        ``Tuple[AudioSegment, np.ndarray]``
+            The mono audio and its 16 kHz float32 signal
+        """
+        with TRACER.span("decode", path=str(audio_path)):
+            audio = AudioSegment.from_file(audio_path).set_channels(1)
+            resampled_audio = audio.set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+            signal = np.frombuffer(resampled_audio.raw_data, dtype=np.int16)
+
+        return audio, signal.astype(np.float32) / 32768.0
+
+    def split_audio_signal(
+        self, signal: np.ndarray, transcription_data: List[Dict[str, str]]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Split the 16 kHz signal into chunks without copying, each chunk is a view of
+        the signal
+
+        Parameters
+        ----------
+        signal: ``np.ndarray``
+            The 16 kHz mono signal of the whole audio
+        transcription_data: ``List[Dict[str, str]]``
+            A list of dictionaries containing text and time of the audio
+
+        Returns
+        -------
+        ``Dict[str, np.ndarray]``
+            A dictionary of chunk file name and its signal
+        """
+        audio_signals = {}
+
+        for data in transcription_data:
+            start = int(data["start"] * SAMPLE_RATE)
+            end = int((data["start"] + data["duration"]) * SAMPLE_RATE)
+            audio_signals[self.get_chunk_name(data)] = signal[start:end]
+
+        return audio_signals
+
+    def detect_languages(
+        self, audio_inputs: List[Union[str, np.ndarray]]
+    ) -> List[Optional[LanguagePrediction]]:
+        """
+        Detect the language of the audios in one batch. If the batch fails every audio
+        is detected on its own, so one undecodable chunk only loses its own language.
+
+        Parameters
+        ----------
+        audio_inputs: ``List[Union[str, np.ndarray]]``
+            The audio files or the 16 kHz signals of the chunks
+
+        Returns
+        -------
+        ``List[Optional[LanguagePrediction]]``
+            The prediction of every audio, None for the audios that failed
+        """
+        try:
+            return self.speech_language_detector.detect_language_batch(audio_inputs)
+        except ModelServerUnavailableError:
+            raise
+        except Exception as e:
+            logger.warning(
+                f"Exception occurred in the language detection batch, detecting the audios one by one: {e}"
+            )
+
+        predictions = []
+        for audio_input in audio_inputs:
+            try:
+                predictions.append(
+                    self.speech_language_detector.detect_language_batch([audio_input])[0]
+                )
+            except ModelServerUnavailableError:
+                raise
+            except Exception as e:
+                STAGE_ITEMS.inc(stage="lid", status="failed")
+                logger.warning(f"Exception occurred while detecting the language of an audio: {e}")
+                predictions.append(None)
+
+        return predictions
+
+    def transcribe_chunks(
+        self, audio_inputs: List[Union[str, np.ndarray]]
+    ) -> List[Optional[str]]:
+        """
+        Transcribe the audios in one batch. If the batch fails every audio is
+        transcribed on its own, so one undecodable or oversized chunk only loses its
+        own transcription.
+
+        Parameters
+        ----------
+        audio_inputs: ``List[Union[str, np.ndarray]]``
+            The audio files or the 16 kHz signals of the chunks
+
+        Returns
+        -------
+        ``List[Optional[str]]``
+            The transcription of every audio, None for the audios that failed
+        """
+        try:
+            return self.asr.transcribe_batch(audio_inputs)
+        except ModelServerUnavailableError:
+            raise
+        except Exception as e:
+            logger.warning(
+                f"Exception occurred in the ASR batch, transcribing the audios one by one: {e}"
+            )
+
+        texts = []
+        for audio_input in audio_inputs:
+            try:
+                texts.append(self.asr.transcribe_batch([audio_input])[0])
+            except ModelServerUnavailableError:
+                raise
+            except Exception as e:
+                STAGE_ITEMS.inc(stage="asr", status="failed")
+                logger.warning(f"Exception occurred while transcribing an audio: {e}")
+                texts.append(None)
+
+        return texts
 
     def validate_transcriptions(
         self,
         transcription_data: Dict[str, List[Dict[str, str]]],
         audio_folder: Path,
-        video_metadata: Optional[VideoMetaData],
+        video_metadata: Optional[VideoMetaData] = None,
         threshold: int = 20,
-    ):
+        *,
+        audio_signals: Optional[Dict[str, np.ndarray]] = None,
+        hindi_audio_names: Optional[List[str]] = None,
+        nemo_texts: Optional[Dict[str, str]] = None,
+        on_stage: Optional[Callable[[VideoStage, Any], None]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
         """
         Validate the transcriptions of the audios whether they are in Hindi or not.
         Using Whisper model to detect the language of the audio and Nemo model to transcribe the audio.
@@ -136,48 +477,172 @@ class AudioProcessor:
             A dictionary of audio name and its transcription
         audio_folder: ``Path``
             Path to the folder containing the audio files
-        video_metadata: ``Optional[VideoMetaData]``
-            VideoMetaData object of the video
+        video_metadata: ``Optional[VideoMetaData]``, ( default = None )
+            Deprecated, the metadata of the video is added to the metadata writer or
+            the database if any chunk matched. ``process_video`` adds the metadata
+            itself after the manifest rows of the video, so it does not pass it.
         threshold: ``int``, ( default = 20 )
             Threshold to consider the similarity between the transcriptions
+        audio_signals: ``Optional[Dict[str, np.ndarray]]``, ( default = None )
+            A dictionary of audio name and its 16 kHz signal, the audio files in
+            ``audio_folder`` are used if not given
+        hindi_audio_names: ``Optional[List[str]]``, ( default = None )
+            The audios already detected as Hindi by a previous run, the language
+            detection is skipped if given
+        nemo_texts: ``Optional[Dict[str, str]]``, ( default = None )
+            A dictionary of audio name and its ASR transcription from a previous run,
+            the ASR is skipped if given
+        on_stage: ``Optional[Callable[[VideoStage, Any], None]]``, ( default = None )
+            Called with ``VideoStage.LID_DONE`` and the Hindi audio names after the
+            language detection and with ``VideoStage.ASR_DONE`` and the ASR
+            transcriptions after the ASR
+
+        Returns
+        -------
+        ``Dict[str, Dict[str, Any]]``
+            A dictionary of audio name and its YouTube text, ASR text, percent match and
+            detected language for the chunks that matched their ASR transcription. The
+            same entries are saved to ``text_similarity.json``.
         """
+        if video_metadata is not None:
+            warnings.warn(
+                "passing video_metadata to validate_transcriptions is deprecated, "
+                "add the metadata once the chunks of the video are stored",
+                DeprecationWarning,
+                stacklevel=2,
+            )
 
         similarity = {}
         req_langugage_file_count = 0
-        for audio_name, yt_text in tqdm(transcription_data.items()):
-            try:
-                if yt_text.strip() == "":
+        hindi_audios = []
+        # the language detected for each audio, audios from a previous run were all
+        # detected as the required language
+        languages = {}
+        audios = [
+            (audio_name, yt_text)
+            for audio_name, yt_text in transcription_data.items()
+            if yt_text.strip() != ""
+        ]
+        if audio_signals is None:
+            audio_inputs = [str(audio_folder / audio_name) for audio_name, _ in audios]
+        else:
+            audio_inputs = [audio_signals[audio_name] for audio_name, _ in audios]
+
+        try:
+            if hindi_audio_names is None:
+                with STAGE_SECONDS.time(stage="lid"), TRACER.span(
+                    "lid", audios=len(audio_inputs)
+                ):
+                    predictions = self.detect_languages(audio_inputs)
+                for (audio_name, _), prediction in zip(audios, predictions):
+                    if prediction is not None:
+                        languages[audio_name] = prediction.language.lower()
+                        LID_LANGUAGES.inc(language=languages[audio_name])
+                is_hindi = [
+                    languages.get(audio_name) == REQUIRED_LANGUAGE
+                    for audio_name, _ in audios
+                ]
+            else:
+                hindi_audio_names = set(hindi_audio_names)
+                is_hindi = [audio_name in hindi_audio_names for audio_name, _ in audios]
+
+            for (audio_name, yt_text), audio_input, hindi in zip(
+                audios, audio_inputs, is_hindi
+            ):
+                if hindi:
+                    req_langugage_file_count += 1
+                    hindi_audios.append((audio_name, yt_text, audio_input))
+
+            if hindi_audio_names is None and on_stage:
+                on_stage(
+                    VideoStage.LID_DONE,
+                    [audio_name for audio_name, _, _ in hindi_audios],
+                )
+        except ModelServerUnavailableError:
+            # an outage of the model server is not a property of the video, so the
+            # video is left unfinished for a retry instead of rejected
+            raise
+        except Exception as e:
+            STAGE_ITEMS.inc(stage="lid", status="failed")
+            logger.warning(
+                f"Exception occurred while detecting language of audios in {audio_folder}: {e}"
+            )
+
+        text_pairs = []
+        try:
+            if nemo_texts is None:
+                start_time = time.perf_counter()
+                with TRACER.span("asr", audios=len(hindi_audios)):
+                    nemo_texts = dict(
+                        zip(
+                            [audio_name for audio_name, _, _ in hindi_audios],
+                            self.transcribe_chunks(
+                                [audio_input for _, _, audio_input in hindi_audios]
+                            ),
+                        )
+                    )
+                elapsed_time = time.perf_counter() - start_time
+                STAGE_SECONDS.observe(elapsed_time, stage="asr")
+                audio_seconds = sum(
+                    get_chunk_duration(audio_name) for audio_name, _, _ in hindi_audios
+                )
+                if audio_seconds > 0:
+                    ASR_REAL_TIME_FACTOR.observe(elapsed_time / audio_seconds)
+                if on_stage:
+                    on_stage(VideoStage.ASR_DONE, nemo_texts)
+
+            for audio_name, yt_text, _ in hindi_audios:
+                nemo_text = nemo_texts.get(audio_name)
+                if nemo_text is None:
                     continue
+                yt_text = clean_transcription(yt_text)
+                nemo_text = clean_transcription(nemo_text)
+                text_pairs.append((audio_name, yt_text, nemo_text))
+        except ModelServerUnavailableError:
+            raise
+        except Exception as e:
+            STAGE_ITEMS.inc(stage="asr", status="failed")
+            logger.warning(f"Exception occurred while transcribing audios in {audio_folder}: {e}")
 
-                audio_file_path = audio_folder / audio_name
-                language = self.speech_language_detector.detect_language_from_file(str(audio_file_path))
+        with TRACER.span("similarity", pairs=len(text_pairs)):
+            scores = self.similarity_scorer.score_batch(
+                [(yt_text, nemo_text) for _, yt_text, nemo_text in text_pairs], threshold
+            )
 
-                if language.lower() == "hi":
-                    req_langugage_file_count += 1
-                    nemo_text = self.asr.transcribe_audio_file(str(audio_file_path))[0]
-                    yt_text = clean_transcription(yt_text)
-                    nemo_text = clean_transcription(nemo_text)
-                    sub_string = find_longest_common_substring(yt_text, nemo_text)
-                    percent_match = calculate_similarity(yt_text, nemo_text, sub_string)
-
-                    if percent_match > threshold:
-                        similarity[audio_name] = {
-                            "normal": yt_text,
-                            "nemo": nemo_text,
-                            "sub_string": sub_string,
-                            "percent_match": percent_match,
-                        }
-            except Exception:
-                print(f"Exception occurred while processing audio: {audio_name}")
+        for (audio_name, yt_text, nemo_text), score in zip(text_pairs, scores):
+            if score is None:
+                # the score of a pruned chunk was never computed, it is only counted
+                STAGE_ITEMS.inc(stage="score", status="pruned")
+                continue
+
+            PERCENT_MATCH.observe(score.percent_match)
+            if score.percent_match > threshold:
+                STAGE_ITEMS.inc(stage="score", status="accepted")
+                similarity[audio_name] = {"normal": yt_text, "nemo": nemo_text}
+                if score.sub_string is not None:
+                    similarity[audio_name]["sub_string"] = score.sub_string
+                similarity[audio_name]["percent_match"] = score.percent_match
+                similarity[audio_name]["language"] = languages.get(
+                    audio_name, REQUIRED_LANGUAGE
+                )
+            else:
+                STAGE_ITEMS.inc(stage="score", status="rejected")
 
         if similarity:
             save_json(
                 similarity, audio_folder / "text_similarity.json", ensure_ascii=False
             )
             if video_metadata:
-                insert_video_metadata(video_metadata)
+                if self.metadata_writer:
+                    self.metadata_writer.add(video_metadata)
+                else:
+                    insert_video_metadata(video_metadata)
         else:
-            print(f"files with hindi language are : {req_langugage_file_count} in {audio_folder}")
+            logger.info(
+                f"files with hindi language are : {req_langugage_file_count} in {audio_folder}"
+            )
+
+        return similarity
 
     def download_and_split_audio(
         self,
@@ -186,10 +651,20 @@ class AudioProcessor:
         videos_metadata: Optional[List[VideoMetaData]],
         format: str,
         threshold: int = 20,
+        in_memory: bool = False,
+        export_chunks: bool = True,
+        download_workers: int = 1,
+        download_lookahead: int = 4,
     ):
         """
         Download the audio and split it into chunks and save the transcription of each chunk in a json file and validate the transcriptions.
 
+        With more than one download worker the audios are downloaded ahead of the processing
+        and the videos are processed in the order their downloads finish.
+
+        In the ``in_memory`` mode the audio is decoded once and the chunks are passed to the
+        models as slices of the decoded signal, writing the chunks to disk is then optional.
+
         Parameters
         ----------
         root_audio_dir: ``Union[str, Path]``
@@ -202,38 +677,292 @@ class AudioProcessor:
             Format to download the audio
         threshold: ``int``, ( default = 20 )
             Threshold to consider the similarity between the transcriptions
+        in_memory: ``bool``, ( default = False )
+            Flag to validate the chunks from the decoded signal instead of the chunk files
+        export_chunks: ``bool``, ( default = True )
+            Flag to save the chunks and transcript.json to disk in the ``in_memory`` mode
+        download_workers: ``int``, ( default = 1 )
+            The number of concurrent downloads
+        download_lookahead: ``int``, ( default = 4 )
+            The maximum number of downloads ahead of the processing
         """
         if isinstance(root_audio_dir, str):
             root_audio_dir = Path(root_audio_dir)
 
-        for video_url, transcription_data in valid_transcription_data.items():
+        stages = (
+            self.checkpoint.get_stages(
+                [video_url.split("=")[-1] for video_url in valid_transcription_data]
+            )
+            if self.checkpoint
+            else {}
+        )
+        video_urls = [
+            video_url
+            for video_url in valid_transcription_data
+            if not self.is_video_finished(
+                root_audio_dir, video_url.split("=")[-1], stages
+            )
+        ]
+
+        if download_workers > 1:
+            downloaded_audios = self.iter_downloaded_audios(
+                video_urls, root_audio_dir, format, download_workers, download_lookahead
+            )
+        else:
+            downloaded_audios = (
+                (video_url, self.download_audio(video_url, root_audio_dir, format))
+                for video_url in video_urls
+            )
+
+        for video_url, audio_path in downloaded_audios:
             video_id = video_url.split("=")[-1]
+            transcription_data = valid_transcription_data[video_url]
 
-            if (root_audio_dir / video_id).exists():
+            if not audio_path:
                 continue
 
-            audio_path = self.download_audio(video_url, root_audio_dir, format)
+            video_metadata = None
 
-            if audio_path:
-                for transcription_type, transcriptions in transcription_data.items():
-                    if transcriptions:
-                        audio_folder = (
-                            audio_path.parent / audio_path.stem / transcription_type
-                        )
-                        self.split_audio_and_save_transcription(
-                            audio_path, audio_folder, transcriptions
-                        )
+            if videos_metadata:
+                for video_metadata in videos_metadata:
+                    if video_metadata.video_id == video_id:
+                        break
 
-                        with open(audio_folder / f"transcript.json", "r") as f:
-                            transcriptions = json.load(f)
+            with TRACER.span("process_video", video_id=video_id):
+                self.process_video(
+                    audio_path,
+                    transcription_data,
+                    video_metadata,
+                    threshold,
+                    in_memory,
+                    export_chunks,
+                )
 
-                        video_metadata = None
+    def add_manifest_rows(
+        self,
+        video_id: str,
+        video_metadata: Optional[VideoMetaData],
+        transcription_type: str,
+        transcriptions: List[Dict[str, Any]],
+        similarity: Dict[str, Dict[str, Any]],
+        locations: Dict[str, str],
+    ):
+        """
+        Append a manifest row for every accepted chunk of a transcription
 
-                        if videos_metadata:
-                            for video_metadata in videos_metadata:
-                                if video_metadata.video_id == video_id:
-                                    break
+        Parameters
+        ----------
+        video_id: ``str``
+            The id of the video
+        video_metadata: ``Optional[VideoMetaData]``
+            VideoMetaData object of the video
+        transcription_type: ``str``
+            The type of the transcription, "manual" or "auto"
+        transcriptions: ``List[Dict[str, Any]]``
+            The segments of the transcription with their text, start and duration
+        similarity: ``Dict[str, Dict[str, Any]]``
+            The accepted chunks returned by ``validate_transcriptions``
+        locations: ``Dict[str, str]``
+            A dictionary of chunk file name and the chunk file or shard location
+        """
+        for data in transcriptions:
+            audio_name = self.get_chunk_name(data)
+            if audio_name not in similarity:
+                continue
+
+            self.manifest_writer.add(
+                video_id=video_id,
+                channel_name=video_metadata.channel_name if video_metadata else None,
+                published_year=(
+                    video_metadata.published_year if video_metadata else None
+                ),
+                transcription_type=transcription_type,
+                start=float(data["start"]),
+                duration=float(data["duration"]),
+                youtube_text=similarity[audio_name]["normal"],
+                asr_text=similarity[audio_name]["nemo"],
+                percent_match=float(similarity[audio_name]["percent_match"]),
+                language=similarity[audio_name].get("language", REQUIRED_LANGUAGE),
+                location=locations.get(audio_name),
+            )
+
+    def is_video_finished(
+        self, root_audio_dir: Path, video_id: str, stages: Dict[str, VideoStage]
+    ) -> bool:
+        """
+        Check whether a video is already processed. A video with a recorded stage is
+        finished once persisted or rejected, a half processed folder is resumed.
+        Without a recorded stage the existing folder of the video marks it finished.
+
+        Parameters
+        ----------
+        root_audio_dir: ``Path``
+            Path to the folder of the downloaded audios
+        video_id: ``str``
+            The id of the video
+        stages: ``Dict[str, VideoStage]``
+            A dictionary of video id and its recorded stage
+
+        Returns
+        -------
+        ``bool``
+            Whether the video should be skipped
+        """
+        if video_id in stages:
+            return stages[video_id].is_at_least(VideoStage.PERSISTED)
+
+        return (root_audio_dir / video_id).exists()
+
+    def process_video(
+        self,
+        audio_path: Path,
+        transcription_data: Dict[str, List[Dict[str, str]]],
+        video_metadata: Optional[VideoMetaData],
+        threshold: int = 20,
+        in_memory: bool = False,
+        export_chunks: bool = True,
+    ):
+        """
+        Split the downloaded audio of a video into chunks and validate the manual and
+        auto generated transcriptions of the chunks
+
+        Parameters
+        ----------
+        audio_path: ``Path``
+            Path to the downloaded audio of the video
+        transcription_data: ``Dict[str, List[Dict[str, str]]]``
+            A dictionary of transcription type and its valid transcription
+        video_metadata: ``Optional[VideoMetaData]``
+            VideoMetaData object of the video
+        threshold: ``int``, ( default = 20 )
+            Threshold to consider the similarity between the transcriptions
+        in_memory: ``bool``, ( default = False )
+            Flag to validate the chunks from the decoded signal instead of the chunk files
+        export_chunks: ``bool``, ( default = True )
+            Flag to save the chunks and transcript.json to disk in the ``in_memory`` mode
+
+        With a shard writer the chunks of the decoded signal are appended to the shards
+        and only transcript.json and shards.json, the location of each chunk, are written
+        to the folder of the transcription type.
+
+        With a checkpoint the chunking, language detection and ASR results of every
+        transcription type are recorded, and a resumed video only runs the stages that
+        did not finish.
+        """
+        video_id = audio_path.stem
+        start_time = time.perf_counter()
+        checkpoint_data = self.checkpoint.get_data(video_id) if self.checkpoint else {}
+        is_accepted = False
+        in_memory = in_memory or self.shard_writer is not None
+
+        if in_memory:
+            audio, signal = self.decode_audio(audio_path)
+
+        for transcription_type, transcriptions in transcription_data.items():
+            if not transcriptions:
+                continue
+
+            CHUNKS_PER_VIDEO.observe(len(transcriptions))
+            audio_folder = audio_path.parent / audio_path.stem / transcription_type
+            is_chunked = (
+                self.checkpoint is not None
+                and (audio_folder / "transcript.json").exists()
+            )
+
+            def on_stage(stage: VideoStage, results: Any):
+                key = "lid" if stage == VideoStage.LID_DONE else "asr"
+                self.checkpoint.mark(video_id, stage, **{key: {transcription_type: results}})
+
+            stage_kwargs = {}
+            if self.checkpoint:
+                stage_kwargs = {
+                    "hindi_audio_names": checkpoint_data.get("lid", {}).get(
+                        transcription_type
+                    ),
+                    "nemo_texts": checkpoint_data.get("asr", {}).get(transcription_type),
+                    "on_stage": on_stage,
+                }
+
+            locations = {}
+            if in_memory:
+                audio_signals = self.split_audio_signal(signal, transcriptions)
+                transcript = {
+                    self.get_chunk_name(data): data["text"] for data in transcriptions
+                }
+                create_dir(audio_folder)
 
-                        self.validate_transcriptions(
-                            transcriptions, audio_folder, video_metadata, threshold
+                if self.shard_writer and not is_chunked:
+                    with TRACER.span("write_shards", chunks=len(audio_signals)):
+                        locations = self.shard_writer.write_chunks(
+                            video_id, transcription_type, audio_signals, transcript
                         )
+                    save_json(
+                        locations, audio_folder / "shards.json", ensure_ascii=False
+                    )
+                    save_json(
+                        transcript, audio_folder / "transcript.json", ensure_ascii=False
+                    )
+                elif self.shard_writer and (audio_folder / "shards.json").exists():
+                    locations = load_json(audio_folder / "shards.json")
+                elif export_chunks and not is_chunked:
+                    self.split_audio_and_save_transcription(
+                        audio_path, audio_folder, transcriptions, audio
+                    )
+                # marked before the language detection and ASR, a video never moves
+                # back to an earlier stage
+                if self.checkpoint and not is_chunked:
+                    self.checkpoint.mark(video_id, VideoStage.CHUNKED)
+
+                similarity = self.validate_transcriptions(
+                    transcript,
+                    audio_folder,
+                    threshold=threshold,
+                    audio_signals=audio_signals,
+                    **stage_kwargs,
+                )
+            else:
+                if not is_chunked:
+                    self.split_audio_and_save_transcription(
+                        audio_path, audio_folder, transcriptions
+                    )
+                    if self.checkpoint:
+                        self.checkpoint.mark(video_id, VideoStage.CHUNKED)
+
+                transcript = load_json(audio_folder / "transcript.json")
+                similarity = self.validate_transcriptions(
+                    transcript, audio_folder, threshold=threshold, **stage_kwargs
+                )
+
+            is_accepted |= bool(similarity)
+            if self.manifest_writer and similarity:
+                if not locations and (not in_memory or export_chunks):
+                    locations = {
+                        audio_name: str(audio_folder / audio_name)
+                        for audio_name in similarity
+                    }
+                self.add_manifest_rows(
+                    video_id,
+                    video_metadata,
+                    transcription_type,
+                    transcriptions,
+                    similarity,
+                    locations,
+                )
+
+        # the metadata is added after every manifest row of the video, so a flush of
+        # the metadata never marks the video persisted before its rows are written
+        if is_accepted and video_metadata and self.metadata_writer:
+            self.metadata_writer.add(video_metadata)
+        elif is_accepted and video_metadata:
+            insert_video_metadata(video_metadata)
+
+        STAGE_SECONDS.observe(time.perf_counter() - start_time, stage="process")
+        STAGE_ITEMS.inc(stage="process", status="accepted" if is_accepted else "rejected")
+
+        if self.checkpoint:
+            if not is_accepted:
+                self.checkpoint.mark(video_id, VideoStage.REJECTED)
+            elif not (video_metadata and self.metadata_writer):
+                # with a metadata writer the video is marked persisted once its
+                # metadata is flushed to the database
+                self.checkpoint.mark(video_id, VideoStage.PERSISTED)
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class DatabaseConfig:
+    db_path: str = "youtube.db"
+    busy_timeout: float = 30
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    pool_size: int = 5
+    metadata_batch_size: int = 50
+    metadata_flush_seconds: float = 30
+    db_url: Optional[str] = None
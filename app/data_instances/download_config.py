@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class DownloadConfig:
@@ -11,4 +12,30 @@ class DownloadConfig:
     language: str
     dst_folder_name: str
     download_audio_format: str
-    
\ No newline at end of file
+    mode: str = "full"
+    in_memory_chunks: bool = False
+    export_chunks: bool = True
+    transcript_workers: int = 8
+    license_workers: int = 8
+    use_video_cache: bool = True
+    video_cache_ttl_days: float = 30
+    download_workers: int = 1
+    download_lookahead: int = 4
+    chunk_format: str = "mp3"
+    chunk_export_engine: str = "pydub"
+    chunk_export_workers: int = 1
+    chunks_per_export_process: int = 64
+    use_seen_video_index: bool = True
+    seen_video_index_capacity: int = 10_000_000
+    seen_video_index_false_positive_rate: float = 0.01
+    use_checkpoint: bool = True
+    chunk_storage: str = "files"
+    shard_dir: Optional[str] = None
+    shard_size_mb: float = 1024
+    use_manifest: bool = True
+    manifest_dir: Optional[str] = None
+    manifest_rows_per_file: int = 50_000
+    metrics_dir: Optional[str] = None
+    trace_path: Optional[str] = None
+    profile_stage: Optional[str] = None
+    profile_interval: float = 0.005
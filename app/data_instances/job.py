@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Optional
+
+
+class JobState(str, Enum):
+    """
+    The state of a job in the job queue. A leased job whose lease expired is claimed
+    again, and a job that used up its attempts is dead lettered.
+    """
+
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    DEAD = "dead"
+
+
+@dataclass
+class Job:
+    job_id: str
+    queue: str
+    kind: str
+    key: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    parent: Optional[str] = None
+    state: JobState = JobState.PENDING
+    attempts: int = 0
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    last_error: Optional[str] = None
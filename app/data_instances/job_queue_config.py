@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class JobQueueConfig:
+    enabled: bool = False
+    backend: str = "sql"
+    worker_id: Optional[str] = None
+    lease_seconds: float = 900
+    heartbeat_seconds: float = 60
+    max_attempts: int = 3
+    retry_delay_seconds: float = 60
+    poll_seconds: float = 10
+    exit_when_idle: bool = True
@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass
+class LanguagePrediction:
+    language: str
+    probabilities: Dict[str, float]
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class PipelineConfig:
+    enabled: bool = False
+    search_workers: int = 1
+    transcript_workers: int = 1
+    download_workers: int = 2
+    process_workers: int = 1
+    queue_size: int = 4
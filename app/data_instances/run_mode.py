@@ -0,0 +1,21 @@
+from enum import Enum
+
+
+class RunMode(str, Enum):
+    """
+    How far a run takes every query. ``discover`` searches and records the new videos,
+    ``transcripts`` also fetches, validates and stores their transcripts, and ``full``
+    also downloads and validates the audio with the models. A later mode resumes from
+    what an earlier mode stored in the checkpoint.
+    """
+
+    DISCOVER = "discover"
+    TRANSCRIPTS = "transcripts"
+    FULL = "full"
+
+    @property
+    def order(self) -> int:
+        return list(RunMode).index(self)
+
+    def includes(self, mode: "RunMode") -> bool:
+        return self.order >= mode.order
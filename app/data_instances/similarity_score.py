@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class SimilarityScore:
+    percent_match: float
+    sub_string: Optional[str] = None
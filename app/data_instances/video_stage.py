@@ -0,0 +1,24 @@
+from enum import Enum
+
+
+class VideoStage(str, Enum):
+    DISCOVERED = "discovered"
+    TRANSCRIPTS_FETCHED = "transcripts_fetched"
+    VALIDATED = "validated"
+    DOWNLOADED = "downloaded"
+    CHUNKED = "chunked"
+    LID_DONE = "lid_done"
+    ASR_DONE = "asr_done"
+    PERSISTED = "persisted"
+    REJECTED = "rejected"
+
+    @property
+    def order(self) -> int:
+        return list(VideoStage).index(self)
+
+    def is_at_least(self, stage: "VideoStage") -> bool:
+        """
+        Whether this stage is the given stage or a later one. A rejected video is
+        finished, so it counts as past every stage.
+        """
+        return self.order >= stage.order
@@ -1,11 +1,18 @@
-from typing import List, Union, Dict, Any
+from typing import List, Union, Dict, Any, Iterator, Optional, Tuple
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from youtubesearchpython import CustomSearch
-from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api import NoTranscriptFound, YouTubeTranscriptApi
 from youtube_transcript_api._transcripts import  TranscriptList
 from app.data_instances.video_meta import VideoMetaData
 from app.utils.date_utils import get_date_with_duration, duration_to_seconds
-from tqdm import tqdm
+from app.db.checkpoint import VideoCheckpoint
+from app.db.db_functions import get_video_cache, update_video_cache
+from app.db.seen_video_index import SeenVideoIndex
+from app.metrics import STAGE_ITEMS, STAGE_SECONDS, TRANSCRIPT_FETCH_SECONDS
+from app.tracing import TRACER
 from youtubesearchpython import Playlist, playlist_from_channel_id
 import yt_dlp
 import logging
@@ -17,28 +24,186 @@ logging.basicConfig(
     format="%(asctime)s | %(levelname)s:%(message)s",
 )
 
+# ℹ️ See help(yt_dlp.YoutubeDL) for a list of available options and public functions
+LICENSE_YDL_OPTS = {
+    "quiet": True,
+    "skip_download": True,
+    "noplaylist": True,
+    "extractor_args": {"youtube": {"skip": ["dash", "hls", "translated_subs"]}},
+}
+
 
 class DataRetrieval:
     """
     DataRetrieval class to retrieve the video metadata and transcriptions from YouTube.
+
+    Attributes
+    ----------
+    transcript_api: ``Any``, ( default = YouTubeTranscriptApi )
+        The api used to list the transcripts of a video, it can be replaced with a
+        stand-in that talks to a local transcript server
+    use_cache: ``bool``, ( default = False )
+        Flag to consult the video cache in the database before the license checks
+        and transcript fetches, and to store their results in it
+    cache_ttl_days: ``float``, ( default = 30 )
+        The number of days a cached license or transcript availability stays valid
+    seen_video_index: ``Optional[SeenVideoIndex]``, ( default = None )
+        Index of the videos already in the database, they are dropped from the search
+        results before any license check or transcript fetch
+    search_client: ``Any``, ( default = CustomSearch )
+        The class used to search the videos of a query, called with the query and the
+        search preferences and paged with ``result`` and ``next``. It can be replaced
+        with a stand-in that talks to a local search server
     """
 
-    def get_license_info(self, url):
-        # ℹ️ See help(yt_dlp.YoutubeDL) for a list of available options and public functions
-        ydl_opts = {
-            "quiet": True,
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+    def __init__(
+        self,
+        transcript_api: Any = YouTubeTranscriptApi,
+        use_cache: bool = False,
+        cache_ttl_days: float = 30,
+        seen_video_index: Optional[SeenVideoIndex] = None,
+        search_client: Any = CustomSearch,
+    ) -> None:
+        self.transcript_api = transcript_api
+        self.search_client = search_client
+        self.use_cache = use_cache
+        self.cache_ttl = cache_ttl_days * 24 * 60 * 60
+        self.seen_video_index = seen_video_index
+
+    def _is_fresh(self, checked_at: Optional[float]) -> bool:
+        return checked_at is not None and time.time() - checked_at < self.cache_ttl
+
+    def _filter_seen_videos(self, video_urls: List[str]) -> List[str]:
+        if self.seen_video_index is None:
+            return video_urls
+
+        unseen_urls = self.seen_video_index.filter_unseen(video_urls)
+        logger.info(f"skipping {len(video_urls) - len(unseen_urls)} already collected videos")
+
+        return unseen_urls
+
+    def _cache_video_metadata(self, videos_metadata: List[VideoMetaData]):
+        if self.use_cache:
+            update_video_cache(
+                [
+                    {
+                        "video_id": video_metadata.video_id,
+                        "title": video_metadata.title,
+                        "duration": video_metadata.duration,
+                        "channel_name": video_metadata.channel_name,
+                    }
+                    for video_metadata in videos_metadata
+                ]
+            )
+
+    def get_license_info(self, url, ydl: Optional[yt_dlp.YoutubeDL] = None):
+        """
+        Get the license of the video. Only the extractor runs, the formats are not
+        processed and the DASH/HLS manifests are not requested since the license is
+        known as soon as the watch page is parsed.
+
+        Parameters
+        ----------
+        url: ``str``
+            The url of the video
+        ydl: ``Optional[yt_dlp.YoutubeDL]``, ( default = None )
+            A YoutubeDL instance to reuse, a new one is created if not given
+
+        Returns
+        -------
+        ``Optional[str]``
+            The license of the video, or None if the video has no license
+        """
+        if ydl is None:
+            with yt_dlp.YoutubeDL(LICENSE_YDL_OPTS) as ydl:
+                return self.get_license_info(url, ydl)
 
-            # ℹ️ ydl.sanitize_info makes the info json-serializable
-            d = ydl.sanitize_info(info)
-            if "license" in d:
-                return d["license"]
-            return None
+        info = ydl.extract_info(url, download=False, process=False)
+        return info.get("license") if info else None
+
+    def get_license_infos(
+        self, video_urls: List[str], max_workers: int = 8
+    ) -> Dict[str, Optional[str]]:
+        """
+        Get the license of the videos on a thread pool. Each worker thread reuses its
+        own YoutubeDL instance and a failure only affects its own video. Licenses that
+        are still fresh in the video cache are not looked up again.
+
+        Parameters
+        ----------
+        video_urls: ``List[str]``
+            The urls of the videos
+        max_workers: ``int``, ( default = 8 )
+            The number of threads resolving licenses
+
+        Returns
+        -------
+        ``Dict[str, Optional[str]]``
+            A dictionary of video url and its license, None if the video has no
+            license or the lookup failed
+        """
+        local = threading.local()
+        ydl_instances = []
+        licenses = {}
+        cache_entries = []
+
+        if self.use_cache:
+            cache = get_video_cache([video_url.split("=")[-1] for video_url in video_urls])
+            for video_url in video_urls:
+                entry = cache.get(video_url.split("=")[-1])
+                if entry and self._is_fresh(entry.license_checked_at):
+                    licenses[video_url] = entry.license
+            video_urls = [
+                video_url for video_url in video_urls if video_url not in licenses
+            ]
+
+        def get_license(video_url: str) -> Tuple[Optional[str], bool]:
+            if not hasattr(local, "ydl"):
+                local.ydl = yt_dlp.YoutubeDL(LICENSE_YDL_OPTS)
+                ydl_instances.append(local.ydl)
+            try:
+                with STAGE_SECONDS.time(stage="license"), TRACER.span(
+                    "license", url=video_url
+                ):
+                    license = self.get_license_info(video_url, local.ydl)
+                STAGE_ITEMS.inc(
+                    stage="license",
+                    status="licensed" if license is not None else "unlicensed",
+                )
+                return license, True
+            except Exception as e:
+                STAGE_ITEMS.inc(stage="license", status="failed")
+                logger.warning(f"Exception occurred while getting license of {video_url}: {e}")
+                return None, False
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(get_license, video_url): video_url
+                for video_url in video_urls
+            }
+            for future in as_completed(futures):
+                video_url = futures[future]
+                licenses[video_url], checked = future.result()
+                if checked:
+                    cache_entries.append(
+                        {
+                            "video_id": video_url.split("=")[-1],
+                            "license": licenses[video_url],
+                            "license_checked_at": time.time(),
+                        }
+                    )
+
+        for ydl in ydl_instances:
+            ydl.close()
+        logger.info(f"checked the license of {len(video_urls)} videos")
+
+        if self.use_cache:
+            update_video_cache(cache_entries)
+
+        return licenses
 
     def get_video_metadata_with_channel_id(
-        self, channel_id: str
+        self, channel_id: str, max_workers: int = 8
     ) -> List[VideoMetaData]:
         """
         Get the metadata of the videos with the given channel id
@@ -47,6 +212,8 @@ class DataRetrieval:
         ----------
         channel_id: ``str``
             The channel id to search for videos on YouTube
+        max_workers: ``int``, ( default = 8 )
+            The number of threads resolving the licenses of the videos
 
         Returns
         -------
@@ -56,27 +223,15 @@ class DataRetrieval:
         """
         raw_video_data = []
         temp_storage = []
-        video_ids = set()
         try:
-            playlist = Playlist(playlist_from_channel_id(channel_id))
+            with TRACER.span("channel_playlist", channel_id=channel_id):
+                playlist = Playlist(playlist_from_channel_id(channel_id))
 
-            while playlist.hasMoreVideos:
-                raw_video_data.extend(playlist.videos)
-                playlist.getNextVideos()
+                while playlist.hasMoreVideos:
+                    raw_video_data.extend(playlist.videos)
+                    playlist.getNextVideos()
             logger.info(f"total videos found: {len(raw_video_data)}")
 
-            for video_data in tqdm(raw_video_data):
-                video_url = f"https://www.youtube.com/watch?v={video_data['id']}"
-
-                if (
-                    video_data["id"] not in video_ids
-                    and self.get_license_info(video_url) is not None
-                ):
-                    video_data["link"] = video_url
-                    temp_storage.append(video_data)
-
-                video_ids.add(video_data["id"])
-
         except TypeError as type_error:
             logger.warning(
                 f"Exception occurred while extracting video links: {type_error}"
@@ -84,7 +239,21 @@ class DataRetrieval:
         except Exception as e:
             logger.warning(f"Exception occurred while extracting video links: {e}")
 
-        return self._extract_video_metadata(temp_storage)
+        unique_video_data = {}
+        for video_data in raw_video_data:
+            video_data["link"] = f"https://www.youtube.com/watch?v={video_data['id']}"
+            unique_video_data.setdefault(video_data["link"], video_data)
+
+        video_urls = self._filter_seen_videos(list(unique_video_data))
+        licenses = self.get_license_infos(video_urls, max_workers)
+        for video_url in video_urls:
+            if licenses[video_url] is not None:
+                temp_storage.append(unique_video_data[video_url])
+
+        videos_metadata = self._extract_video_metadata(temp_storage)
+        self._cache_video_metadata(videos_metadata)
+
+        return videos_metadata
 
     def get_video_metadata_with_query(
         self, search_query: str, max_pages: int = 1
@@ -105,19 +274,39 @@ class DataRetrieval:
             A list of VideoMetaData objects for each video
         """
         videos_metadata: List[VideoMetaData] = []
-        custom_search = CustomSearch(
+        custom_search = self.search_client(
             search_query,
             searchPreferences="EgQoATAB",
         )
 
         for _ in range(max_pages):
             try:
-                results = custom_search.result()
-                video_metadata = self._extract_video_metadata(results["result"])
-                videos_metadata.extend(video_metadata)
-                custom_search.next()
+                with STAGE_SECONDS.time(stage="search"):
+                    with TRACER.span("search.result", query=search_query):
+                        results = custom_search.result()
+                    video_metadata = self._extract_video_metadata(results["result"])
+                    videos_metadata.extend(video_metadata)
+                    with TRACER.span("search.next", query=search_query):
+                        custom_search.next()
+                STAGE_ITEMS.inc(stage="search", status="ok")
             except Exception as e:
-                print(f"Exception occurred while extracting video links: {e}")
+                STAGE_ITEMS.inc(stage="search", status="failed")
+                logger.warning(f"Exception occurred while extracting video links: {e}")
+        logger.info(f"total videos found for {search_query}: {len(videos_metadata)}")
+
+        if self.seen_video_index:
+            unseen_urls = set(
+                self._filter_seen_videos(
+                    [video_metadata.url for video_metadata in videos_metadata]
+                )
+            )
+            videos_metadata = [
+                video_metadata
+                for video_metadata in videos_metadata
+                if video_metadata.url in unseen_urls
+            ]
+
+        self._cache_video_metadata(videos_metadata)
 
         return videos_metadata
 
@@ -165,23 +354,206 @@ class DataRetrieval:
                 video_metadata.append(video_meta_data)
 
             except Exception as e:
-                print(f"Exception occurred while extracting video metadata: {e}")
+                STAGE_ITEMS.inc(stage="metadata", status="failed")
+                logger.warning(f"Exception occurred while extracting video metadata: {e}")
 
         return video_metadata
 
-    def get_manually_created_transcription(self,transcript_list:TranscriptList):
+    def _fetch_transcription(
+        self, transcript_list: TranscriptList, transcription_type: str
+    ) -> Optional[List[Dict[str, Any]]]:
         try:
-            return transcript_list.find_manually_created_transcript(["hi"]).fetch()
-        except:
-            return None
+            if transcription_type == "manual":
+                transcript = transcript_list.find_manually_created_transcript(["hi"])
+            else:
+                transcript = transcript_list.find_generated_transcript(["hi"])
+            return transcript.fetch()
+        except NoTranscriptFound:
+            STAGE_ITEMS.inc(stage=f"{transcription_type}_transcript", status="missing")
+        except Exception as e:
+            STAGE_ITEMS.inc(stage=f"{transcription_type}_transcript", status="failed")
+            logger.warning(
+                f"Exception occurred while fetching the {transcription_type} transcript: {e}"
+            )
+
+        return None
+
+    def get_manually_created_transcription(self,transcript_list:TranscriptList):
+        return self._fetch_transcription(transcript_list, "manual")
 
     def get_auto_generated_transcription(self,transcript_list:TranscriptList):
-        try:
-            return transcript_list.find_generated_transcript(["hi"]).fetch()
-        except:
-            return None
+        return self._fetch_transcription(transcript_list, "auto")
 
-    def get_video_transcripts(self, videos_metadata: List[Union[str, VideoMetaData]])-> Dict[str, Dict[str, Any]]:
+    def _get_video_urls(
+        self, videos_metadata: List[Union[str, VideoMetaData]]
+    ) -> List[str]:
+        if videos_metadata and isinstance(videos_metadata[0], VideoMetaData):
+            video_urls = [video_metadata.url for video_metadata in videos_metadata]
+        else:
+            video_urls = videos_metadata
+
+        if not self.use_cache:
+            return video_urls
+
+        # Skip the videos that are known to have no transcripts
+        cache = get_video_cache([video_url.split("=")[-1] for video_url in video_urls])
+        filtered_urls = []
+        for video_url in video_urls:
+            entry = cache.get(video_url.split("=")[-1])
+            if (
+                entry
+                and entry.has_transcripts is False
+                and self._is_fresh(entry.transcripts_checked_at)
+            ):
+                continue
+            filtered_urls.append(video_url)
+
+        return filtered_urls
+
+    def _fetch_video_transcript(
+        self, video_url: str
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        with TRANSCRIPT_FETCH_SECONDS.time(), TRACER.span(
+            "transcript_fetch", url=video_url
+        ):
+            try:
+                transcript_list = self.transcript_api.list_transcripts(
+                    video_url.split("=")[-1]
+                )
+            except Exception as e:
+                STAGE_ITEMS.inc(stage="transcripts", status="failed")
+                logger.debug(f"Exception occurred while listing transcripts of {video_url}: {e}")
+                return None, False
+
+            manual_transcript = self.get_manually_created_transcription(transcript_list)
+            auto_transcript = self.get_auto_generated_transcription(transcript_list)
+
+        if manual_transcript or auto_transcript:
+            STAGE_ITEMS.inc(stage="transcripts", status="found")
+            return {"manual": manual_transcript, "auto": auto_transcript}, True
+
+        STAGE_ITEMS.inc(stage="transcripts", status="missing")
+        return None, True
+
+    def _cache_transcript_availability(
+        self, transcript_availability: Dict[str, bool]
+    ):
+        if self.use_cache:
+            checked_at = time.time()
+            update_video_cache(
+                [
+                    {
+                        "video_id": video_url.split("=")[-1],
+                        "has_transcripts": has_transcripts,
+                        "transcripts_checked_at": checked_at,
+                    }
+                    for video_url, has_transcripts in transcript_availability.items()
+                ]
+            )
+
+    def get_video_transcript(self, video_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the manual and auto generated transcriptions of a single video
+
+        Parameters
+        ----------
+        video_url: ``str``
+            The url of the video
+
+        Returns
+        -------
+        ``Optional[Dict[str, Any]]``
+            A dictionary with the manual and auto generated transcriptions, or None if
+            the video has neither
+        """
+        transcripts, _ = self._fetch_video_transcript(video_url)
+        return transcripts
+
+    def _skip_fetched_videos(
+        self,
+        videos_metadata: List[Union[str, VideoMetaData]],
+        checkpoint: Optional[VideoCheckpoint],
+    ) -> Tuple[List[Union[str, VideoMetaData]], Dict[str, Dict[str, Any]]]:
+        """
+        Split off the videos whose transcripts were fetched before an interruption,
+        with the stored transcripts of those that have any
+        """
+        if checkpoint is None or not videos_metadata:
+            return videos_metadata, {}
+
+        fetched = checkpoint.get_fetched_transcripts(
+            [
+                video.url if isinstance(video, VideoMetaData) else video
+                for video in videos_metadata
+            ]
+        )
+        if fetched:
+            logger.info(f"reusing the fetched transcripts of {len(fetched)} videos")
+
+        return [
+            video
+            for video in videos_metadata
+            if (video.url if isinstance(video, VideoMetaData) else video) not in fetched
+        ], {video_url: transcripts for video_url, transcripts in fetched.items() if transcripts}
+
+    def iter_video_transcripts(
+        self,
+        videos_metadata: List[Union[str, VideoMetaData]],
+        max_workers: int = 8,
+        checkpoint: Optional[VideoCheckpoint] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Fetch the video transcripts on a thread pool and yield them as they finish
+
+        Parameters
+        ----------
+        videos_metadata: ``List[Union[str, VideoMetaData]]``
+            A list of video urls or VideoMetaData objects for each video
+        max_workers: ``int``, ( default = 8 )
+            The number of threads fetching transcripts, which is also the number of
+            concurrent requests to YouTube
+        checkpoint: ``Optional[VideoCheckpoint]``, ( default = None )
+            Checkpoint that stores the transcripts of every video as its fetch
+            finishes, the videos fetched before are yielded from it
+
+        Returns
+        -------
+        ``Iterator[Tuple[str, Dict[str, Any]]]``
+            The video url and its manual and auto generated transcriptions, in
+            completion order. Videos without transcriptions are skipped.
+        """
+        videos_metadata, fetched_transcripts = self._skip_fetched_videos(
+            videos_metadata, checkpoint
+        )
+        yield from fetched_transcripts.items()
+
+        video_urls = self._get_video_urls(videos_metadata)
+        transcript_availability = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self._fetch_video_transcript, video_url): video_url
+                    for video_url in video_urls
+                }
+                for future in as_completed(futures):
+                    video_url = futures[future]
+                    transcripts, checked = future.result()
+                    if checked:
+                        transcript_availability[video_url] = transcripts is not None
+                        if checkpoint:
+                            checkpoint.mark_transcripts_fetched(video_url, transcripts)
+                    if transcripts:
+                        yield video_url, transcripts
+        finally:
+            self._cache_transcript_availability(transcript_availability)
+
+    def get_video_transcripts(
+        self,
+        videos_metadata: List[Union[str, VideoMetaData]],
+        max_workers: int = 1,
+        checkpoint: Optional[VideoCheckpoint] = None,
+    ) -> Dict[str, Dict[str, Any]]:
         """
         Get the video transcript for the given list of videos metadata
 
@@ -189,33 +561,40 @@ class DataRetrieval:
         ----------
         videos_metadata: ``List[VideoMetaData]``
             A list of VideoMetaData objects for each video
+        max_workers: ``int``, ( default = 1 )
+            The number of threads fetching transcripts, the videos are fetched one by one if 1
+        checkpoint: ``Optional[VideoCheckpoint]``, ( default = None )
+            Checkpoint that stores the transcripts of every video as its fetch
+            finishes, the videos fetched before are not fetched again
 
         Returns
         -------
         video_transcription_data: ``Dict[str, Dict[str, Any]]``
             A dictionary containing the video url as key and the manual and auto generated transcriptions as values
         """
-        video_transcription_data = {}
-        video_urls: List[str] = []
-
-        if videos_metadata and isinstance(videos_metadata[0], VideoMetaData):
-            video_urls = [video_metadata.url for video_metadata in videos_metadata]
-        else:
-            video_urls = videos_metadata
+        if max_workers > 1:
+            return dict(
+                self.iter_video_transcripts(videos_metadata, max_workers, checkpoint)
+            )
 
-        for video_url in tqdm(video_urls):
-            try:
-                transcript_list = YouTubeTranscriptApi.list_transcripts(
-                    video_url.split("=")[-1]
-                )
-                manual_transcript = self.get_manually_created_transcription(transcript_list)
-                auto_transcript = self.get_auto_generated_transcription(transcript_list)
-                if manual_transcript or auto_transcript:
-                    video_transcription_data[video_url] = {
-                        "manual": manual_transcript,
-                        "auto": auto_transcript,
-                    }
-            except Exception as e:
-                continue
+        videos_metadata, video_transcription_data = self._skip_fetched_videos(
+            videos_metadata, checkpoint
+        )
+        transcript_availability = {}
+
+        for video_url in self._get_video_urls(videos_metadata):
+            transcripts, checked = self._fetch_video_transcript(video_url)
+            if checked:
+                transcript_availability[video_url] = transcripts is not None
+                if checkpoint:
+                    checkpoint.mark_transcripts_fetched(video_url, transcripts)
+            if transcripts:
+                video_transcription_data[video_url] = transcripts
+
+        self._cache_transcript_availability(transcript_availability)
+        logger.info(
+            f"found transcripts of {len(video_transcription_data)} of "
+            f"{len(transcript_availability)} videos"
+        )
 
         return video_transcription_data
@@ -0,0 +1,269 @@
+from typing import Any, Dict, List, Optional
+import json
+from app.data_instances.video_meta import VideoMetaData
+from app.data_instances.video_stage import VideoStage
+from app.db.db_functions import (
+    get_query_stage,
+    get_video_states,
+    set_query_stage,
+    update_video_states,
+)
+
+QUERY_SEARCHED = "searched"
+QUERY_DONE = "done"
+
+
+class VideoCheckpoint:
+    """
+    Record the stage every video has reached in the ``video_state`` table, so a
+    restarted run continues each query and each video from where it stopped instead
+    of searching, fetching and downloading again
+
+    The discovered metadata and the validated transcriptions are stored with the state
+    of the video, together with the language detection and ASR results of each
+    transcription type.
+    """
+
+    def is_query_searched(self, query: str) -> bool:
+        return get_query_stage(query) in (QUERY_SEARCHED, QUERY_DONE)
+
+    def is_query_done(self, query: str) -> bool:
+        return get_query_stage(query) == QUERY_DONE
+
+    def mark_query_done(self, query: str):
+        set_query_stage(query, QUERY_DONE)
+
+    def mark_discovered(self, query: str, videos_metadata: List[VideoMetaData]):
+        """
+        Record the new videos of a query and mark the query as searched
+
+        Parameters
+        ----------
+        query: ``str``
+            The search query or channel id
+        videos_metadata: ``List[VideoMetaData]``
+            The new videos found for the query
+        """
+        update_video_states(
+            [
+                {
+                    "video_id": video_metadata.video_id,
+                    "query": query,
+                    "url": video_metadata.url,
+                    "stage": VideoStage.DISCOVERED.value,
+                    "video_metadata": json.dumps(
+                        video_metadata.as_dict(), ensure_ascii=False
+                    ),
+                }
+                for video_metadata in videos_metadata
+            ]
+        )
+        set_query_stage(query, QUERY_SEARCHED)
+
+    def get_query_videos(
+        self,
+        query: str,
+        stage: Optional[VideoStage] = None,
+        before: Optional[VideoStage] = None,
+    ) -> List[VideoMetaData]:
+        """
+        Get the discovered videos of a query that have not finished yet
+
+        Parameters
+        ----------
+        query: ``str``
+            The search query or channel id
+        stage: ``Optional[VideoStage]``, ( default = None )
+            Only get the videos at this stage
+        before: ``Optional[VideoStage]``, ( default = None )
+            Only get the videos that have not reached this stage
+
+        Returns
+        -------
+        ``List[VideoMetaData]``
+            The metadata of the videos
+        """
+        videos_metadata = []
+
+        for state in get_video_states(query=query).values():
+            video_stage = VideoStage(state.stage)
+            if not state.video_metadata or video_stage.is_at_least(VideoStage.PERSISTED):
+                continue
+            if before is not None and video_stage.is_at_least(before):
+                continue
+            if stage is None or video_stage == stage:
+                videos_metadata.append(VideoMetaData(**json.loads(state.video_metadata)))
+
+        return videos_metadata
+
+    def get_stages(self, video_ids: List[str]) -> Dict[str, VideoStage]:
+        """
+        Get the stage of the videos, videos without a state are left out
+        """
+        return {
+            video_id: VideoStage(state.stage)
+            for video_id, state in get_video_states(video_ids).items()
+        }
+
+    def mark_transcripts_fetched(
+        self, video_url: str, transcripts: Optional[Dict[str, Any]]
+    ):
+        """
+        Store the transcripts of a video as soon as its fetch finishes, so an
+        interrupted fetch does not fetch them again. A video without transcripts is
+        stored too and rejected by the validation.
+
+        Parameters
+        ----------
+        video_url: ``str``
+            The url of the video
+        transcripts: ``Optional[Dict[str, Any]]``
+            The manual and auto transcriptions of the video, or None if it has neither
+        """
+        self.mark(
+            video_url.split("=")[-1],
+            VideoStage.TRANSCRIPTS_FETCHED,
+            fetched_transcripts=transcripts,
+        )
+
+    def get_fetched_transcripts(
+        self, video_urls: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get the stored transcripts of the videos that were fetched but not validated
+        yet, videos without transcripts are included with None
+        """
+        states = get_video_states([video_url.split("=")[-1] for video_url in video_urls])
+        fetched_transcripts = {}
+
+        for video_url in video_urls:
+            state = states.get(video_url.split("=")[-1])
+            if state and state.data and state.stage == VideoStage.TRANSCRIPTS_FETCHED.value:
+                data = json.loads(state.data)
+                if "fetched_transcripts" in data:
+                    fetched_transcripts[video_url] = data["fetched_transcripts"]
+
+        return fetched_transcripts
+
+    def mark_validated(
+        self,
+        video_urls: List[str],
+        valid_transcriptions: Dict[str, Dict[str, Any]],
+    ):
+        """
+        Store the validated transcriptions of the fetched videos. Videos without a valid
+        transcription are marked as rejected so they are not fetched again.
+
+        Parameters
+        ----------
+        video_urls: ``List[str]``
+            The urls of the videos whose transcripts were fetched
+        valid_transcriptions: ``Dict[str, Dict[str, Any]]``
+            A dictionary of video url and its valid manual and auto transcriptions
+        """
+        states = get_video_states([video_url.split("=")[-1] for video_url in video_urls])
+        entries = []
+        for video_url in video_urls:
+            if video_url.split("=")[-1] not in states:
+                continue
+
+            transcription_data = valid_transcriptions.get(video_url)
+            if transcription_data and any(transcription_data.values()):
+                entries.append(
+                    {
+                        "video_id": video_url.split("=")[-1],
+                        "stage": VideoStage.VALIDATED.value,
+                        "data": json.dumps(
+                            {"transcriptions": transcription_data}, ensure_ascii=False
+                        ),
+                    }
+                )
+            else:
+                entries.append(
+                    {
+                        "video_id": video_url.split("=")[-1],
+                        "stage": VideoStage.REJECTED.value,
+                    }
+                )
+        update_video_states(entries)
+
+    def get_validated_transcriptions(
+        self, video_urls: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the stored valid transcriptions of the videos that passed validation and
+        have not finished yet
+        """
+        states = get_video_states([video_url.split("=")[-1] for video_url in video_urls])
+        valid_transcriptions = {}
+
+        for video_url in video_urls:
+            state = states.get(video_url.split("=")[-1])
+            if (
+                state
+                and state.data
+                and VideoStage(state.stage).is_at_least(VideoStage.VALIDATED)
+                and not VideoStage(state.stage).is_at_least(VideoStage.PERSISTED)
+            ):
+                valid_transcriptions[video_url] = json.loads(state.data)[
+                    "transcriptions"
+                ]
+
+        return valid_transcriptions
+
+    def get_data(self, video_id: str) -> Dict[str, Any]:
+        state = get_video_states([video_id]).get(video_id)
+        return json.loads(state.data) if state and state.data else {}
+
+    def mark(self, video_id: str, stage: VideoStage, **data: Any):
+        """
+        Advance a video to the given stage and merge the given values into its data.
+        A video never moves back to an earlier stage.
+
+        Parameters
+        ----------
+        video_id: ``str``
+            The id of the video
+        stage: ``VideoStage``
+            The stage the video has reached
+        data: ``Any``
+            Values to store with the state, nested dictionaries are merged
+        """
+        state = get_video_states([video_id]).get(video_id)
+        if state is None:
+            return
+
+        stored_data = json.loads(state.data) if state.data else {}
+        for key, value in data.items():
+            if isinstance(value, dict) and isinstance(stored_data.get(key), dict):
+                stored_data[key].update(value)
+            else:
+                stored_data[key] = value
+
+        current_stage = VideoStage(state.stage)
+        update_video_states(
+            [
+                {
+                    "video_id": video_id,
+                    "stage": (
+                        stage if stage.order > current_stage.order else current_stage
+                    ).value,
+                    "data": json.dumps(stored_data, ensure_ascii=False),
+                }
+            ]
+        )
+
+    def mark_persisted(self, videos_metadata: List[VideoMetaData]):
+        """
+        Mark the videos whose metadata was written to the database as persisted
+        """
+        states = get_video_states(
+            [video_metadata.video_id for video_metadata in videos_metadata]
+        )
+        update_video_states(
+            [
+                {"video_id": video_id, "stage": VideoStage.PERSISTED.value}
+                for video_id, state in states.items()
+                if not VideoStage(state.stage).is_at_least(VideoStage.PERSISTED)
+            ]
+        )
@@ -1,10 +1,82 @@
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
 from sqlmodel import create_engine, SQLModel
 
-sqlite_db="youtube.db"
+sqlite_db = "youtube.db"
 
 sqlite_url = f"sqlite:///{sqlite_db}"
 
-engine=create_engine(sqlite_url)
+engine = create_engine(sqlite_url)
+
+
+def configure_engine(
+    db_path: str = sqlite_db,
+    busy_timeout: float = 30,
+    journal_mode: str = "WAL",
+    synchronous: str = "NORMAL",
+    pool_size: int = 5,
+    db_url: Optional[str] = None,
+) -> Engine:
+    """
+    Replace the default engine with a pooled SQLite engine that is safe to use from
+    several collector processes on the same machine, or with a pooled engine for the
+    database at ``db_url``, such as a Postgres server shared by several machines
+
+    Parameters
+    ----------
+    db_path: ``str``, ( default = "youtube.db" )
+        The path to the SQLite database file
+    busy_timeout: ``float``, ( default = 30 )
+        The number of seconds to wait for a lock held by another connection
+    journal_mode: ``str``, ( default = "WAL" )
+        The SQLite journal mode, WAL lets readers run while another process writes
+    synchronous: ``str``, ( default = "NORMAL" )
+        The SQLite synchronous setting, NORMAL is safe with WAL and fsyncs less often
+    pool_size: ``int``, ( default = 5 )
+        The number of connections kept open in the pool
+    db_url: ``Optional[str]``, ( default = None )
+        The url of a database to use instead of the SQLite file, the SQLite settings
+        are ignored
+
+    Returns
+    -------
+    ``Engine``
+        The configured engine
+    """
+    global engine
+
+    if db_url is not None and not db_url.startswith("sqlite"):
+        new_engine = create_engine(db_url, pool_size=pool_size, pool_pre_ping=True)
+    else:
+        new_engine = create_engine(
+            db_url or f"sqlite:///{db_path}",
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            connect_args={"timeout": busy_timeout, "check_same_thread": False},
+        )
+
+        @event.listens_for(new_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+            cursor.close()
+
+    engine.dispose()
+    engine = new_engine
+
+    return engine
+
+
+def get_engine() -> Engine:
+    """
+    Get the current engine, which is replaced by ``configure_engine``
+    """
+    return engine
+
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    SQLModel.metadata.create_all(engine)
@@ -1,9 +1,23 @@
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import Session, select
-from app.db.connection import engine
+from app.db.connection import get_engine
+from app.data_instances.job import Job, JobState
+from app.db.job_model import JobModel
 from app.db.url_model import VideoUrls
 from app.data_instances.video_meta import VideoMetaData
 from app.db.video_metadata_model import VideoMetaDataModel
-from typing import List, Optional
+from app.db.video_cache_model import VideoCacheModel
+from app.db.video_state_model import QueryStateModel, VideoStateModel
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import json
+import time
+
+# SQLite limits the number of variables in a single statement
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# The number of claimable jobs read at once, the first one still free is leased
+CLAIM_CANDIDATES = 16
 
 
 def filter_and_insert_videos(
@@ -12,6 +26,10 @@ def filter_and_insert_videos(
     """
     Insert the video urls into the database that do not already exist in the database
 
+    The existing urls are looked up with chunked ``IN (...)`` queries instead of one
+    query per url, and duplicates within ``videos_metadata`` are removed in memory,
+    keeping the first occurrence.
+
     Parameters
     ----------
     videos_metadata: ``List[VideoMetaData]``
@@ -22,25 +40,73 @@ def filter_and_insert_videos(
     ``List[VideoMetaData]``
         A list of VideoMetaData objects for each video that were inserted into the database
     """
-    filtered_videos = []
+    unique_videos: Dict[str, VideoMetaData] = {}
+    for video_metadata in videos_metadata:
+        unique_videos.setdefault(video_metadata.url, video_metadata)
 
-    with Session(engine) as session:
-        for video_metadata in videos_metadata:
-            url_exists = session.exec(
-                select(VideoUrls).where(VideoUrls.url == video_metadata.url)
-            ).first()
+    existing_urls = get_existing_urls(list(unique_videos))
 
-            if url_exists:
-                continue
-
-            video_url = VideoUrls(url=video_metadata.url)
-            session.add(video_url)
-            filtered_videos.append(video_metadata)
+    with Session(get_engine()) as session:
+        filtered_videos = [
+            video_metadata
+            for url, video_metadata in unique_videos.items()
+            if url not in existing_urls
+        ]
+        session.add_all(
+            VideoUrls(url=video_metadata.url) for video_metadata in filtered_videos
+        )
         session.commit()
 
     return filtered_videos
 
 
+def get_existing_urls(urls: List[str]) -> Set[str]:
+    """
+    Find which of the given urls already exist in the database, with chunked
+    ``IN (...)`` queries
+
+    Parameters
+    ----------
+    urls: ``List[str]``
+        The video urls to look up
+
+    Returns
+    -------
+    ``Set[str]``
+        The urls that exist in the database
+    """
+    existing_urls = set()
+
+    with Session(get_engine()) as session:
+        for start in range(0, len(urls), IN_CLAUSE_CHUNK_SIZE):
+            statement = select(VideoUrls.url).where(
+                VideoUrls.url.in_(urls[start : start + IN_CLAUSE_CHUNK_SIZE])
+            )
+            existing_urls.update(session.exec(statement))
+
+    return existing_urls
+
+
+def iter_video_urls(batch_size: int = 100_000) -> Iterator[List[str]]:
+    """
+    Stream all the video urls of the database in batches
+
+    Parameters
+    ----------
+    batch_size: ``int``, ( default = 100_000 )
+        The number of urls in each batch
+
+    Returns
+    -------
+    ``Iterator[List[str]]``
+        The batches of video urls
+    """
+    with Session(get_engine()) as session:
+        statement = select(VideoUrls.url).execution_options(yield_per=batch_size)
+        for partition in session.exec(statement).partitions():
+            yield list(partition)
+
+
 def get_video_metadata(session: Session, video_id: str) -> Optional[VideoMetaDataModel]:
     """
     Retrieve the video metadata from the database for the given video id
@@ -65,6 +131,35 @@ def get_video_metadata(session: Session, video_id: str) -> Optional[VideoMetaDat
     return video_metadata
 
 
+def get_videos_metadata(video_ids: List[str]) -> Dict[str, VideoMetaDataModel]:
+    """
+    Retrieve the metadata of the given videos from the database
+
+    Parameters
+    ----------
+    video_ids: ``List[str]``
+        The video ids to look up
+
+    Returns
+    -------
+    ``Dict[str, VideoMetaDataModel]``
+        A dictionary of video id and its metadata, videos without metadata are left out
+    """
+    videos_metadata = {}
+
+    with Session(get_engine()) as session:
+        for start in range(0, len(video_ids), IN_CLAUSE_CHUNK_SIZE):
+            statement = select(VideoMetaDataModel).where(
+                VideoMetaDataModel.video_id.in_(
+                    video_ids[start : start + IN_CLAUSE_CHUNK_SIZE]
+                )
+            )
+            for video_metadata in session.exec(statement):
+                videos_metadata[video_metadata.video_id] = video_metadata
+
+    return videos_metadata
+
+
 def insert_video_metadata(video_metadata: VideoMetaData):
     """
     Insert the video metadata into the database if it does not already exist in the database
@@ -74,7 +169,7 @@ def insert_video_metadata(video_metadata: VideoMetaData):
     video_metadata: ``VideoMetaData``
         The video metadata to insert into the database
     """
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         video_metadata_model = VideoMetaDataModel(**video_metadata.as_dict())
         video_metadata = get_video_metadata(session, video_metadata_model.video_id)
         
@@ -83,3 +178,561 @@ def insert_video_metadata(video_metadata: VideoMetaData):
         
         session.add(video_metadata_model)
         session.commit()
+
+
+def insert_videos_metadata(videos_metadata: List[VideoMetaData]):
+    """
+    Insert the videos metadata that do not already exist in the database in a single
+    transaction
+
+    Parameters
+    ----------
+    videos_metadata: ``List[VideoMetaData]``
+        The videos metadata to insert into the database
+    """
+    unique_videos: Dict[str, VideoMetaData] = {}
+    for video_metadata in videos_metadata:
+        unique_videos.setdefault(video_metadata.video_id, video_metadata)
+
+    video_ids = list(unique_videos)
+    existing_ids = set()
+
+    with Session(get_engine()) as session:
+        for start in range(0, len(video_ids), IN_CLAUSE_CHUNK_SIZE):
+            statement = select(VideoMetaDataModel.video_id).where(
+                VideoMetaDataModel.video_id.in_(
+                    video_ids[start : start + IN_CLAUSE_CHUNK_SIZE]
+                )
+            )
+            existing_ids.update(session.exec(statement))
+
+        session.add_all(
+            VideoMetaDataModel(**video_metadata.as_dict())
+            for video_id, video_metadata in unique_videos.items()
+            if video_id not in existing_ids
+        )
+        session.commit()
+
+
+def get_video_cache(video_ids: List[str]) -> Dict[str, VideoCacheModel]:
+    """
+    Retrieve the cached metadata of the given videos from the database
+
+    Parameters
+    ----------
+    video_ids: ``List[str]``
+        The video ids to look up
+
+    Returns
+    -------
+    ``Dict[str, VideoCacheModel]``
+        A dictionary of video id and its cache entry, videos without an entry are left out
+    """
+    cache = {}
+
+    with Session(get_engine()) as session:
+        for start in range(0, len(video_ids), IN_CLAUSE_CHUNK_SIZE):
+            statement = select(VideoCacheModel).where(
+                VideoCacheModel.video_id.in_(
+                    video_ids[start : start + IN_CLAUSE_CHUNK_SIZE]
+                )
+            )
+            for entry in session.exec(statement):
+                cache[entry.video_id] = entry
+
+    return cache
+
+
+def update_video_cache(entries: List[Dict[str, Any]]):
+    """
+    Insert or update the cached metadata of videos. Only the given fields of an
+    existing entry are updated.
+
+    Parameters
+    ----------
+    entries: ``List[Dict[str, Any]]``
+        A list of dictionaries with the ``video_id`` and the fields of ``VideoCacheModel`` to set
+    """
+    if not entries:
+        return
+
+    video_ids = list({entry["video_id"] for entry in entries})
+
+    with Session(get_engine()) as session:
+        cache = {}
+        for start in range(0, len(video_ids), IN_CLAUSE_CHUNK_SIZE):
+            statement = select(VideoCacheModel).where(
+                VideoCacheModel.video_id.in_(
+                    video_ids[start : start + IN_CLAUSE_CHUNK_SIZE]
+                )
+            )
+            for cached in session.exec(statement):
+                cache[cached.video_id] = cached
+
+        for entry in entries:
+            cached = cache.get(entry["video_id"])
+            if cached is None:
+                cache[entry["video_id"]] = VideoCacheModel(**entry)
+                session.add(cache[entry["video_id"]])
+                continue
+
+            for field, value in entry.items():
+                setattr(cached, field, value)
+            session.add(cached)
+        session.commit()
+
+
+def invalidate_video_cache(
+    video_ids: Optional[List[str]] = None, older_than: Optional[float] = None
+) -> int:
+    """
+    Delete entries from the video cache
+
+    Parameters
+    ----------
+    video_ids: ``Optional[List[str]]``, ( default = None )
+        The video ids to delete, all entries are considered if not given
+    older_than: ``Optional[float]``, ( default = None )
+        Only delete the entries that were last checked more than this many seconds ago
+
+    Returns
+    -------
+    ``int``
+        The number of deleted entries
+    """
+    conditions = []
+    if older_than is not None:
+        # an entry is stale once both of its checks are older than the cutoff
+        cutoff = time.time() - older_than
+        conditions = [
+            func.coalesce(VideoCacheModel.license_checked_at, 0) < cutoff,
+            func.coalesce(VideoCacheModel.transcripts_checked_at, 0) < cutoff,
+        ]
+
+    if video_ids is None:
+        statements = [delete(VideoCacheModel).where(*conditions)]
+    else:
+        statements = [
+            delete(VideoCacheModel).where(
+                VideoCacheModel.video_id.in_(
+                    video_ids[start : start + IN_CLAUSE_CHUNK_SIZE]
+                ),
+                *conditions,
+            )
+            for start in range(0, len(video_ids), IN_CLAUSE_CHUNK_SIZE)
+        ]
+
+    deleted = 0
+
+    with Session(get_engine()) as session:
+        for statement in statements:
+            deleted += session.execute(statement).rowcount
+        session.commit()
+
+    return deleted
+
+
+def get_video_states(
+    video_ids: Optional[List[str]] = None, query: Optional[str] = None
+) -> Dict[str, VideoStateModel]:
+    """
+    Retrieve the pipeline state of videos from the database
+
+    Parameters
+    ----------
+    video_ids: ``Optional[List[str]]``, ( default = None )
+        The video ids to look up
+    query: ``Optional[str]``, ( default = None )
+        Look up all the videos discovered by this query instead
+
+    Returns
+    -------
+    ``Dict[str, VideoStateModel]``
+        A dictionary of video id and its state, videos without a state are left out
+    """
+    states = {}
+
+    with Session(get_engine()) as session:
+        if query is not None:
+            statement = select(VideoStateModel).where(VideoStateModel.query == query)
+            for state in session.exec(statement):
+                states[state.video_id] = state
+            return states
+
+        for start in range(0, len(video_ids), IN_CLAUSE_CHUNK_SIZE):
+            statement = select(VideoStateModel).where(
+                VideoStateModel.video_id.in_(
+                    video_ids[start : start + IN_CLAUSE_CHUNK_SIZE]
+                )
+            )
+            for state in session.exec(statement):
+                states[state.video_id] = state
+
+    return states
+
+
+def update_video_states(entries: List[Dict[str, Any]]):
+    """
+    Insert or update the pipeline state of videos in a single transaction. Only the
+    given fields of an existing state are updated.
+
+    Parameters
+    ----------
+    entries: ``List[Dict[str, Any]]``
+        A list of dictionaries with the ``video_id`` and the fields of ``VideoStateModel`` to set
+    """
+    if not entries:
+        return
+
+    updated_at = time.time()
+
+    with Session(get_engine()) as session:
+        for entry in entries:
+            state = session.get(VideoStateModel, entry["video_id"])
+            if state is None:
+                session.add(VideoStateModel(**entry, updated_at=updated_at))
+                continue
+
+            for field, value in entry.items():
+                setattr(state, field, value)
+            state.updated_at = updated_at
+            session.add(state)
+        session.commit()
+
+
+def get_query_stage(query: str) -> Optional[str]:
+    """
+    Retrieve the stage of a search query, None if the query was never searched
+    """
+    with Session(get_engine()) as session:
+        state = session.get(QueryStateModel, query)
+        return state.stage if state else None
+
+
+def set_query_stage(query: str, stage: str):
+    """
+    Set the stage of a search query
+    """
+    with Session(get_engine()) as session:
+        state = session.get(QueryStateModel, query) or QueryStateModel(query=query)
+        state.stage = stage
+        state.updated_at = time.time()
+        session.add(state)
+        session.commit()
+
+
+def _to_job(job_model: JobModel) -> Job:
+    return Job(
+        job_id=job_model.job_id,
+        queue=job_model.queue,
+        kind=job_model.kind,
+        key=job_model.key,
+        payload=json.loads(job_model.payload) if job_model.payload else {},
+        parent=job_model.parent,
+        state=JobState(job_model.state),
+        attempts=job_model.attempts,
+        lease_owner=job_model.lease_owner,
+        lease_expires_at=job_model.lease_expires_at,
+        last_error=job_model.last_error,
+    )
+
+
+def enqueue_jobs(
+    queue: str,
+    kind: str,
+    entries: List[Tuple[str, Dict[str, Any]]],
+    parent: Optional[str] = None,
+) -> int:
+    """
+    Insert the jobs that are not in the queue yet, so every node can enqueue the same
+    work without duplicating it. Jobs already in the queue are left unchanged
+    whatever their state.
+
+    Parameters
+    ----------
+    queue: ``str``
+        The name of the queue
+    kind: ``str``
+        The kind of the jobs
+    entries: ``List[Tuple[str, Dict[str, Any]]]``
+        A list of the key and the payload of each job
+    parent: ``Optional[str]``, ( default = None )
+        The key of the job that added these jobs
+
+    Returns
+    -------
+    ``int``
+        The number of jobs inserted
+    """
+    if not entries:
+        return 0
+
+    now = time.time()
+    rows = {
+        f"{queue}:{kind}:{key}": {
+            "job_id": f"{queue}:{kind}:{key}",
+            "queue": queue,
+            "kind": kind,
+            "key": key,
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "parent": parent,
+            "state": JobState.PENDING.value,
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for key, payload in entries
+    }
+    rows = list(rows.values())
+    rows_per_statement = IN_CLAUSE_CHUNK_SIZE // len(rows[0])
+    dialect = postgresql if get_engine().dialect.name == "postgresql" else sqlite
+    inserted = 0
+
+    with Session(get_engine()) as session:
+        for start in range(0, len(rows), rows_per_statement):
+            statement = (
+                dialect.insert(JobModel)
+                .values(rows[start : start + rows_per_statement])
+                .on_conflict_do_nothing(index_elements=["job_id"])
+            )
+            inserted += session.execute(statement).rowcount
+        session.commit()
+
+    return inserted
+
+
+def claim_job(
+    queue: str,
+    kinds: List[str],
+    owner: str,
+    lease_seconds: float,
+    max_attempts: int,
+) -> Optional[Job]:
+    """
+    Lease the next available job of the queue. A job is leased with a conditional
+    update, so on a shared database only one worker wins a job and the others move
+    on to the next candidate. Jobs whose lease expired are claimed again, unless they
+    used up their attempts, then they are dead lettered.
+
+    Parameters
+    ----------
+    queue: ``str``
+        The name of the queue
+    kinds: ``List[str]``
+        The kinds of jobs to claim, the earlier kinds are claimed first
+    owner: ``str``
+        The id of the worker taking the lease
+    lease_seconds: ``float``
+        The number of seconds the lease lasts without a heartbeat
+    max_attempts: ``int``
+        The number of attempts before a job is dead lettered
+
+    Returns
+    -------
+    ``Optional[Job]``
+        The leased job, or None if no job is available
+    """
+    now = time.time()
+    is_expired = and_(
+        JobModel.state == JobState.LEASED.value, JobModel.lease_expires_at < now
+    )
+    is_claimable = or_(
+        and_(
+            JobModel.state == JobState.PENDING.value, JobModel.available_at <= now
+        ),
+        and_(is_expired, JobModel.attempts < max_attempts),
+    )
+
+    with Session(get_engine()) as session:
+        session.execute(
+            update(JobModel)
+            .where(JobModel.queue == queue, is_expired, JobModel.attempts >= max_attempts)
+            .values(
+                state=JobState.DEAD.value,
+                last_error="the lease expired on the last attempt",
+                updated_at=now,
+            )
+        )
+        session.commit()
+
+        for kind in kinds:
+            statement = (
+                select(JobModel.job_id)
+                .where(JobModel.queue == queue, JobModel.kind == kind, is_claimable)
+                .order_by(JobModel.available_at)
+                .limit(CLAIM_CANDIDATES)
+            )
+            for job_id in session.exec(statement).all():
+                result = session.execute(
+                    update(JobModel)
+                    .where(JobModel.job_id == job_id, is_claimable)
+                    .values(
+                        state=JobState.LEASED.value,
+                        lease_owner=owner,
+                        lease_expires_at=now + lease_seconds,
+                        attempts=JobModel.attempts + 1,
+                        updated_at=now,
+                    )
+                )
+                session.commit()
+                if result.rowcount == 1:
+                    return _to_job(session.get(JobModel, job_id))
+
+    return None
+
+
+def _update_leased_job(job: Job, **values: Any) -> bool:
+    with Session(get_engine()) as session:
+        result = session.execute(
+            update(JobModel)
+            .where(
+                JobModel.job_id == job.job_id,
+                JobModel.state == JobState.LEASED.value,
+                JobModel.lease_owner == job.lease_owner,
+            )
+            .values(**values, updated_at=time.time())
+        )
+        session.commit()
+
+    return result.rowcount == 1
+
+
+def extend_job_lease(job: Job, lease_seconds: float) -> bool:
+    """
+    Extend the lease of a job, False if the worker no longer holds the lease
+    """
+    return _update_leased_job(job, lease_expires_at=time.time() + lease_seconds)
+
+
+def complete_job(job: Job) -> bool:
+    """
+    Mark a leased job as done, False if the worker no longer holds the lease
+    """
+    return _update_leased_job(job, state=JobState.DONE.value, lease_owner=None)
+
+
+def fail_job(job: Job, error: str, retry_delay: float, max_attempts: int) -> bool:
+    """
+    Release a leased job that failed. It is retried after ``retry_delay`` seconds,
+    doubled on every attempt, or dead lettered once it used up its attempts.
+
+    Returns
+    -------
+    ``bool``
+        False if the worker no longer holds the lease
+    """
+    if job.attempts >= max_attempts:
+        return _update_leased_job(
+            job, state=JobState.DEAD.value, lease_owner=None, last_error=error
+        )
+
+    return _update_leased_job(
+        job,
+        state=JobState.PENDING.value,
+        lease_owner=None,
+        lease_expires_at=None,
+        available_at=time.time() + retry_delay * 2 ** (job.attempts - 1),
+        last_error=error,
+    )
+
+
+def get_job_counts(queue: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Count the jobs of every kind by their state
+
+    Parameters
+    ----------
+    queue: ``Optional[str]``, ( default = None )
+        Only count the jobs of this queue
+
+    Returns
+    -------
+    ``Dict[str, Dict[str, int]]``
+        A dictionary of kind and the number of its jobs in every state
+    """
+    counts: Dict[str, Dict[str, int]] = {}
+
+    with Session(get_engine()) as session:
+        statement = select(JobModel.kind, JobModel.state, func.count()).group_by(
+            JobModel.kind, JobModel.state
+        )
+        if queue is not None:
+            statement = statement.where(JobModel.queue == queue)
+        for kind, state, count in session.exec(statement):
+            counts.setdefault(kind, {})[state] = count
+
+    return counts
+
+
+def count_unfinished_jobs(queue: str, parent: Optional[str] = None) -> int:
+    """
+    Count the pending and leased jobs of a queue
+
+    Parameters
+    ----------
+    queue: ``str``
+        The name of the queue
+    parent: ``Optional[str]``, ( default = None )
+        Only count the jobs added by the job with this key
+
+    Returns
+    -------
+    ``int``
+        The number of unfinished jobs
+    """
+    statement = select(func.count()).where(
+        JobModel.queue == queue,
+        JobModel.state.in_([JobState.PENDING.value, JobState.LEASED.value]),
+    )
+    if parent is not None:
+        statement = statement.where(JobModel.parent == parent)
+
+    with Session(get_engine()) as session:
+        return session.exec(statement).one()
+
+
+def get_dead_jobs(queue: Optional[str] = None, limit: int = 100) -> List[Job]:
+    """
+    Retrieve the dead lettered jobs with the last error of each
+    """
+    with Session(get_engine()) as session:
+        statement = select(JobModel).where(JobModel.state == JobState.DEAD.value)
+        if queue is not None:
+            statement = statement.where(JobModel.queue == queue)
+        return [
+            _to_job(job_model)
+            for job_model in session.exec(statement.order_by(JobModel.updated_at).limit(limit))
+        ]
+
+
+def requeue_dead_jobs(queue: Optional[str] = None, kind: Optional[str] = None) -> int:
+    """
+    Move the dead lettered jobs back to pending with their attempts reset
+
+    Returns
+    -------
+    ``int``
+        The number of jobs requeued
+    """
+    now = time.time()
+    statement = update(JobModel).where(JobModel.state == JobState.DEAD.value)
+    if queue is not None:
+        statement = statement.where(JobModel.queue == queue)
+    if kind is not None:
+        statement = statement.where(JobModel.kind == kind)
+
+    with Session(get_engine()) as session:
+        result = session.execute(
+            statement.values(
+                state=JobState.PENDING.value,
+                attempts=0,
+                lease_owner=None,
+                lease_expires_at=None,
+                available_at=now,
+                updated_at=now,
+            )
+        )
+        session.commit()
+
+    return result.rowcount
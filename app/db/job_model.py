@@ -0,0 +1,20 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+
+class JobModel(SQLModel, table=True):
+    __tablename__ = "job"
+    job_id: str = Field(default=None, primary_key=True)
+    queue: str = Field(index=True)
+    kind: str
+    key: str
+    payload: Optional[str] = None
+    parent: Optional[str] = Field(default=None, index=True)
+    state: str = Field(index=True)
+    attempts: int = 0
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    available_at: float
+    last_error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,75 @@
+from typing import Callable, List, Optional
+import threading
+from app.data_instances.video_meta import VideoMetaData
+from app.db.db_functions import insert_videos_metadata
+
+
+class VideoMetadataWriter:
+    """
+    Buffer the validated videos metadata and write them to the database in batches,
+    so a single transaction covers many videos instead of one each
+
+    The buffer is flushed when it holds ``max_batch_size`` videos or when the oldest
+    buffered video has waited ``max_delay`` seconds, and on ``close``.
+
+    Attributes
+    ----------
+    max_batch_size: ``int``, ( default = 50 )
+        The number of buffered videos that triggers a flush
+    max_delay: ``float``, ( default = 30 )
+        The maximum number of seconds a video stays in the buffer
+    on_flush: ``Optional[Callable[[List[VideoMetaData]], None]]``, ( default = None )
+        Called with the videos metadata after they are written to the database
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 50,
+        max_delay: float = 30,
+        on_flush: Optional[Callable[[List[VideoMetaData]], None]] = None,
+    ) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.on_flush = on_flush
+        self.buffer: List[VideoMetaData] = []
+        self.lock = threading.RLock()
+        self.timer: Optional[threading.Timer] = None
+
+    def add(self, video_metadata: VideoMetaData):
+        """
+        Add the metadata of a video to the buffer
+
+        Parameters
+        ----------
+        video_metadata: ``VideoMetaData``
+            The video metadata to insert into the database
+        """
+        with self.lock:
+            self.buffer.append(video_metadata)
+
+            if len(self.buffer) >= self.max_batch_size:
+                self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.max_delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """
+        Write the buffered videos metadata to the database
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            if not self.buffer:
+                return
+
+            insert_videos_metadata(self.buffer)
+            if self.on_flush:
+                self.on_flush(self.buffer)
+            self.buffer = []
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,199 @@
+from typing import Iterable, List
+import hashlib
+import math
+import string
+import threading
+import numpy as np
+from app.db.db_functions import get_existing_urls, iter_video_urls
+
+ID_ALPHABET = string.ascii_uppercase + string.ascii_lowercase + string.digits + "-_"
+ID_LENGTH = 11
+
+_CHAR_VALUES = np.full(256, -1, dtype=np.int64)
+for _value, _char in enumerate(ID_ALPHABET):
+    _CHAR_VALUES[ord(_char)] = _value
+
+
+def _splitmix64(values: np.ndarray) -> np.ndarray:
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def pack_video_ids(video_ids: List[str]) -> np.ndarray:
+    """
+    Pack the video ids into 64 bit integers. A YouTube id is 11 base64 characters
+    holding 64 bits, the last character only uses its upper 4 bits. Ids that do not
+    follow this format are hashed instead.
+
+    Parameters
+    ----------
+    video_ids: ``List[str]``
+        The video ids to pack
+
+    Returns
+    -------
+    ``np.ndarray``
+        A uint64 array with one value per video id
+    """
+    packed = np.zeros(len(video_ids), dtype=np.uint64)
+    is_standard = np.array(
+        [len(video_id) == ID_LENGTH and video_id.isascii() for video_id in video_ids],
+        dtype=bool,
+    )
+
+    if is_standard.any():
+        standard_ids = [video_ids[i] for i in np.flatnonzero(is_standard)]
+        characters = np.frombuffer(
+            "".join(standard_ids).encode("ascii"), dtype=np.uint8
+        ).reshape(-1, ID_LENGTH)
+        values = _CHAR_VALUES[characters]
+
+        valid = (values >= 0).all(axis=1) & (values[:, -1] & 3 == 0)
+        values = values.astype(np.uint64)
+        result = np.zeros(len(standard_ids), dtype=np.uint64)
+        for column in range(ID_LENGTH - 1):
+            result = (result << np.uint64(6)) | values[:, column]
+        result = (result << np.uint64(4)) | (values[:, -1] >> np.uint64(2))
+
+        packed[np.flatnonzero(is_standard)] = result
+        is_standard[np.flatnonzero(is_standard)[~valid]] = False
+
+    for i in np.flatnonzero(~is_standard):
+        digest = hashlib.blake2b(video_ids[i].encode("utf-8"), digest_size=8).digest()
+        packed[i] = int.from_bytes(digest, "little")
+
+    return packed
+
+
+class SeenVideoIndex:
+    """
+    A Bloom filter of the video ids that are already in the ``video_urls`` table, so
+    that the videos we already have are dropped before any per-video network call.
+    A hit of the filter is confirmed in the database, so no new video is ever dropped
+    because of a false positive.
+
+    With the default false positive rate the filter takes about 1.2 bytes per id,
+    12 MB for 10M ids.
+
+    Attributes
+    ----------
+    capacity: ``int``, ( default = 10_000_000 )
+        The expected number of video ids
+    false_positive_rate: ``float``, ( default = 0.01 )
+        The false positive rate of the filter at ``capacity`` ids
+    """
+
+    def __init__(
+        self, capacity: int = 10_000_000, false_positive_rate: float = 0.01
+    ) -> None:
+        self.num_bits = max(
+            64, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = np.zeros((self.num_bits + 63) // 64, dtype=np.uint64)
+        self.lock = threading.Lock()
+
+    def _bit_positions(self, video_ids: List[str]) -> np.ndarray:
+        packed = pack_video_ids(video_ids)
+        hash1 = _splitmix64(packed)
+        hash2 = _splitmix64(hash1) | np.uint64(1)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+
+        with np.errstate(over="ignore"):
+            positions = hash1[:, None] + steps[None, :] * hash2[:, None]
+
+        return positions % np.uint64(self.num_bits)
+
+    def add_many(self, video_ids: List[str]):
+        """
+        Add the video ids to the index
+
+        Parameters
+        ----------
+        video_ids: ``List[str]``
+            The video ids to add
+        """
+        if not video_ids:
+            return
+
+        positions = self._bit_positions(video_ids).ravel()
+        words = positions >> np.uint64(6)
+        masks = np.uint64(1) << (positions & np.uint64(63))
+        with self.lock:
+            np.bitwise_or.at(self.bits, words.astype(np.int64), masks)
+
+    def might_contain_many(self, video_ids: List[str]) -> np.ndarray:
+        """
+        Check the video ids against the Bloom filter only
+
+        Parameters
+        ----------
+        video_ids: ``List[str]``
+            The video ids to check
+
+        Returns
+        -------
+        ``np.ndarray``
+            A boolean array, False means the video is certainly not in the index
+        """
+        if not video_ids:
+            return np.zeros(0, dtype=bool)
+
+        positions = self._bit_positions(video_ids)
+        words = self.bits[(positions >> np.uint64(6)).astype(np.int64)]
+        is_set = (words >> (positions & np.uint64(63))) & np.uint64(1)
+
+        return is_set.astype(bool).all(axis=1)
+
+    def filter_unseen(self, video_urls: List[str]) -> List[str]:
+        """
+        Drop the videos that already exist in the database
+
+        Parameters
+        ----------
+        video_urls: ``List[str]``
+            The urls of the videos
+
+        Returns
+        -------
+        ``List[str]``
+            The urls of the videos that are not in the database, in input order
+        """
+        hits = self.might_contain_many(
+            [video_url.split("=")[-1] for video_url in video_urls]
+        )
+        existing_urls = get_existing_urls(
+            [video_url for video_url, hit in zip(video_urls, hits) if hit]
+        )
+
+        return [video_url for video_url in video_urls if video_url not in existing_urls]
+
+    def load_from_db(self, batch_size: int = 100_000) -> int:
+        """
+        Add all the videos of the ``video_urls`` table to the index
+
+        Parameters
+        ----------
+        batch_size: ``int``, ( default = 100_000 )
+            The number of urls read from the database at once
+
+        Returns
+        -------
+        ``int``
+            The number of loaded video ids
+        """
+        total = 0
+        for video_urls in iter_video_urls(batch_size):
+            self.add_many([video_url.split("=")[-1] for video_url in video_urls])
+            total += len(video_urls)
+
+        return total
+
+    def add_urls(self, video_urls: Iterable[str]):
+        """
+        Add the videos of the given urls to the index, for the rows just inserted into
+        the ``video_urls`` table
+        """
+        self.add_many([video_url.split("=")[-1] for video_url in video_urls])
@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+
+class VideoCacheModel(SQLModel, table=True):
+    __tablename__ = "video_cache"
+    video_id: str = Field(default=None, primary_key=True)
+    license: Optional[str] = None
+    license_checked_at: Optional[float] = None
+    title: Optional[str] = None
+    duration: Optional[int] = None
+    channel_name: Optional[str] = None
+    has_transcripts: Optional[bool] = None
+    transcripts_checked_at: Optional[float] = None
@@ -0,0 +1,20 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+
+class VideoStateModel(SQLModel, table=True):
+    __tablename__ = "video_state"
+    video_id: str = Field(default=None, primary_key=True)
+    query: str = Field(index=True)
+    url: str
+    stage: str
+    video_metadata: Optional[str] = None
+    data: Optional[str] = None
+    updated_at: float
+
+
+class QueryStateModel(SQLModel, table=True):
+    __tablename__ = "query_state"
+    query: str = Field(default=None, primary_key=True)
+    stage: str
+    updated_at: float
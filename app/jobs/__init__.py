@@ -0,0 +1,3 @@
+from .job_queue import JobQueue
+from .memory_job_queue import MemoryJobQueue
+from .sql_job_queue import SQLJobQueue
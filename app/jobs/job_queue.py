@@ -0,0 +1,97 @@
+from abc import abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from app.data_instances.job import Job
+from app.models.lazy_registrable import LazyRegistrable
+
+
+class JobQueue(LazyRegistrable):
+    """
+    Base class for the queues the workers of several machines claim their work from.
+    A claimed job is leased to one worker, which keeps the lease with heartbeats. A
+    job whose lease expires is claimed by another worker, a failed job is retried,
+    and a job that used up its attempts is dead lettered.
+
+    Attributes
+    ----------
+    queue_name: ``str``, ( default = "default" )
+        The name of the queue, several queues can share a backend
+    max_attempts: ``int``, ( default = 3 )
+        The number of attempts before a job is dead lettered
+    """
+
+    provider_modules = {
+        "sql": "app.jobs.sql_job_queue",
+        "memory": "app.jobs.memory_job_queue",
+    }
+
+    def __init__(self, queue_name: str = "default", max_attempts: int = 3) -> None:
+        self.queue_name = queue_name
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def enqueue(
+        self,
+        kind: str,
+        entries: List[Tuple[str, Dict[str, Any]]],
+        parent: Optional[str] = None,
+    ) -> int:
+        """
+        Add the jobs that are not in the queue yet and return how many were added.
+        Each entry is the key and the payload of a job, ``parent`` is the key of the
+        job that added them.
+        """
+        raise NotImplementedError("enqueue method not implemented")
+
+    @abstractmethod
+    def claim(
+        self, kinds: List[str], owner: str, lease_seconds: float
+    ) -> Optional[Job]:
+        """
+        Lease the next available job of the given kinds, the earlier kinds are
+        claimed first. None if no job is available.
+        """
+        raise NotImplementedError("claim method not implemented")
+
+    @abstractmethod
+    def heartbeat(self, job: Job, lease_seconds: float) -> bool:
+        """
+        Extend the lease of a job, False if the lease was lost
+        """
+        raise NotImplementedError("heartbeat method not implemented")
+
+    @abstractmethod
+    def complete(self, job: Job) -> bool:
+        """
+        Mark a leased job as done, False if the lease was lost
+        """
+        raise NotImplementedError("complete method not implemented")
+
+    @abstractmethod
+    def fail(self, job: Job, error: str, retry_delay: float) -> bool:
+        """
+        Retry a leased job after ``retry_delay`` seconds, doubled on every attempt, or
+        dead letter it once it used up its attempts. False if the lease was lost.
+        """
+        raise NotImplementedError("fail method not implemented")
+
+    @abstractmethod
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        Count the jobs of every kind by their state
+        """
+        raise NotImplementedError("counts method not implemented")
+
+    @abstractmethod
+    def count_unfinished(self, parent: Optional[str] = None) -> int:
+        """
+        Count the pending and leased jobs, only the jobs added by the job with the key
+        ``parent`` if given
+        """
+        raise NotImplementedError("count_unfinished method not implemented")
+
+    def has_unfinished(self) -> bool:
+        """
+        Whether some job is still pending or leased. A leased job can still add new
+        jobs, so the queue is only drained once both are gone.
+        """
+        return self.count_unfinished() > 0
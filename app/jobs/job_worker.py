@@ -0,0 +1,315 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import logging
+import os
+import socket
+import threading
+import time
+
+from app.audio_processor import AudioProcessor
+from app.data_instances.download_config import DownloadConfig
+from app.data_instances.job import Job
+from app.data_instances.job_queue_config import JobQueueConfig
+from app.data_instances.run_mode import RunMode
+from app.data_instances.video_meta import VideoMetaData
+from app.data_instances.video_stage import VideoStage
+from app.data_retrival import DataRetrieval
+from app.data_validator import DataValidator
+from app.db.checkpoint import VideoCheckpoint
+from app.db.db_functions import filter_and_insert_videos
+from app.jobs.job_queue import JobQueue
+from app.metrics import STAGE_ITEMS, STAGE_SECONDS
+from app.tracing import TRACER
+from app.utils.file_utils import create_dir
+
+logger = logging.getLogger(__name__)
+
+QUERY_JOB = "query"
+VIDEO_JOB = "video"
+
+
+class JobWorker:
+    """
+    Claim the queries and the videos to collect from a job queue shared by the workers
+    of several machines. A query job searches the query and records its new videos,
+    then adds a video job for each of them, so the videos of one slow query or channel
+    are spread over every worker. A video job fetches and validates the transcripts of
+    the video and, in the full mode, downloads and processes its audio.
+
+    The lease of the running job is kept with heartbeats. A worker that dies loses the
+    lease and the job is claimed by another worker, which resumes the video from the
+    checkpoint.
+
+    Attributes
+    ----------
+    job_queue: ``JobQueue``
+        The job queue to claim the jobs from
+    data_retrieval: ``DataRetrieval``
+        DataRetrieval object to search the videos and fetch their transcripts
+    data_validator: ``DataValidator``
+        DataValidator object to validate the transcripts
+    audio_processor: ``Optional[AudioProcessor]``
+        AudioProcessor object to download and process the audio, only needed in the
+        full mode
+    download_config: ``DownloadConfig``
+        The download configuration
+    job_queue_config: ``JobQueueConfig``
+        The leases, retries and polling of the worker
+    checkpoint: ``VideoCheckpoint``
+        VideoCheckpoint object that carries the state of the videos between workers
+    processed_queries_path: ``Optional[Path]``, ( default = None )
+        The file the finished queries are appended to
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        data_retrieval: DataRetrieval,
+        data_validator: DataValidator,
+        audio_processor: Optional[AudioProcessor],
+        download_config: DownloadConfig,
+        job_queue_config: JobQueueConfig,
+        checkpoint: VideoCheckpoint,
+        processed_queries_path: Optional[Path] = None,
+    ) -> None:
+        self.job_queue = job_queue
+        self.data_retrieval = data_retrieval
+        self.data_validator = data_validator
+        self.audio_processor = audio_processor
+        self.download_config = download_config
+        self.job_queue_config = job_queue_config
+        self.checkpoint = checkpoint
+        self.processed_queries_path = processed_queries_path
+        self.run_mode = RunMode(download_config.mode)
+        self.worker_id = (
+            job_queue_config.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        )
+        self.handlers = {QUERY_JOB: self.run_query_job, VIDEO_JOB: self.run_video_job}
+
+    def enqueue_queries(self, search_queries: List[str]) -> int:
+        """
+        Add a query job for every search query or channel id not in the queue yet
+        """
+        return self.job_queue.enqueue(QUERY_JOB, [(query, {}) for query in search_queries])
+
+    def get_query_folder(self, search_query: str) -> Tuple[str, Path]:
+        """
+        Get the query to search and the folder of its audios
+        """
+        audio_download_folder = Path(self.download_config.dst_folder_name)
+        if self.download_config.is_channel_ids:
+            return search_query, audio_download_folder / search_query
+
+        query = search_query.lower().strip().replace(" ", "+").strip()
+        return query, audio_download_folder / query.replace("+", "_").replace('"', "")
+
+    def run_query_job(self, job: Job):
+        """
+        Search a query, record its new videos and add a video job for each of them. A
+        query searched before is not searched again, its unfinished videos are added.
+        """
+        search_query = job.key
+        if self.checkpoint.is_query_searched(search_query):
+            videos_metadata = self.checkpoint.get_query_videos(search_query)
+            logger.info(
+                f"Resuming {len(videos_metadata)} unfinished videos for query: {search_query}"
+            )
+        else:
+            query, audio_query_folder = self.get_query_folder(search_query)
+            create_dir(audio_query_folder)
+            if self.download_config.is_channel_ids:
+                videos_metadata = self.data_retrieval.get_video_metadata_with_channel_id(
+                    query, self.download_config.license_workers
+                )
+            else:
+                videos_metadata = self.data_retrieval.get_video_metadata_with_query(
+                    query, max_pages=self.download_config.max_pages
+                )
+
+            with open(audio_query_folder / "urls_list.txt", "w") as f:
+                f.write("\n".join(metadata.url for metadata in videos_metadata))
+            logger.info(f"total collected urls before filtering : {len(videos_metadata)}")
+
+            videos_metadata = filter_and_insert_videos(videos_metadata)
+            if self.data_retrieval.seen_video_index:
+                self.data_retrieval.seen_video_index.add_urls(
+                    metadata.url for metadata in videos_metadata
+                )
+            self.checkpoint.mark_discovered(search_query, videos_metadata)
+
+        if not self.run_mode.includes(RunMode.TRANSCRIPTS):
+            logger.info(
+                f"total discovered videos : {len(videos_metadata)} for query: {search_query}"
+            )
+            return
+
+        added = self.job_queue.enqueue(
+            VIDEO_JOB,
+            [
+                (
+                    metadata.video_id,
+                    {"query": search_query, "video_metadata": metadata.as_dict()},
+                )
+                for metadata in videos_metadata
+            ],
+            parent=search_query,
+        )
+        logger.info(f"added {added} video jobs for query: {search_query}")
+        self.finish_query(search_query)
+
+    def finish_query(self, search_query: str):
+        """
+        Mark a query as processed once none of its video jobs is pending or leased.
+        As in a run without the job queue, only the full mode finishes queries, so a
+        later mode still resumes them.
+        """
+        if not self.run_mode.includes(RunMode.FULL):
+            return
+        if self.job_queue.count_unfinished(parent=search_query) > 0:
+            return
+
+        self.checkpoint.mark_query_done(search_query)
+        if self.processed_queries_path:
+            with open(self.processed_queries_path, "a+") as f:
+                f.write(search_query + "\n")
+        logger.info(f"finished all the videos of query: {search_query}")
+
+    def run_video_job(self, job: Job):
+        """
+        Fetch and validate the transcripts of a video, then download and process its
+        audio in the full mode. The stages the video finished before are skipped.
+        """
+        video_metadata = VideoMetaData(**job.payload["video_metadata"])
+        video_url = video_metadata.url
+        stage = self.checkpoint.get_stages([video_metadata.video_id]).get(
+            video_metadata.video_id
+        )
+        if stage is not None and stage.is_at_least(VideoStage.PERSISTED):
+            return
+
+        if stage is None or not stage.is_at_least(VideoStage.VALIDATED):
+            video_transcription_data = self.data_retrieval.get_video_transcripts(
+                [video_metadata], checkpoint=self.checkpoint
+            )
+            self.checkpoint.mark_validated(
+                [video_url],
+                self.data_validator.validate_transcriptions(video_transcription_data),
+            )
+
+        valid_transcriptions = self.checkpoint.get_validated_transcriptions([video_url])
+        if video_url not in valid_transcriptions or not self.run_mode.includes(
+            RunMode.FULL
+        ):
+            return
+
+        _, audio_query_folder = self.get_query_folder(job.payload["query"])
+        create_dir(audio_query_folder)
+        audio_path = self.audio_processor.download_audio(
+            video_url, audio_query_folder, self.download_config.download_audio_format
+        )
+        if audio_path is None or not audio_path.exists():
+            raise RuntimeError(f"the audio of {video_url} could not be downloaded")
+
+        try:
+            self.audio_processor.process_video(
+                audio_path,
+                valid_transcriptions[video_url],
+                video_metadata,
+                self.download_config.percent_match,
+                self.download_config.in_memory_chunks,
+                self.download_config.export_chunks,
+            )
+            # the video only counts as done once its metadata is written
+            if self.audio_processor.metadata_writer:
+                self.audio_processor.metadata_writer.flush()
+        finally:
+            audio_path.unlink(missing_ok=True)
+
+    @contextmanager
+    def keep_leased(self, job: Job) -> Iterator[None]:
+        """
+        Extend the lease of a job every ``heartbeat_seconds`` while it runs
+        """
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(self.job_queue_config.heartbeat_seconds):
+                try:
+                    if not self.job_queue.heartbeat(job, self.job_queue_config.lease_seconds):
+                        logger.warning(f"lost the lease of job {job.job_id}")
+                        return
+                except Exception as e:
+                    logger.warning(f"Exception occurred in the heartbeat of {job.job_id}: {e}")
+
+        thread = threading.Thread(target=heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def run_job(self, job: Job):
+        """
+        Run a claimed job, then complete it or hand it back for a retry
+        """
+        stage = f"{job.kind}_job"
+        try:
+            with self.keep_leased(job), STAGE_SECONDS.time(stage=stage), TRACER.span(
+                stage, category="job", key=job.key, attempt=job.attempts
+            ):
+                self.handlers[job.kind](job)
+        except Exception as e:
+            logger.warning(
+                f"Exception occurred in job {job.job_id} on attempt {job.attempts}: {e}"
+            )
+            is_dead = job.attempts >= self.job_queue.max_attempts
+            STAGE_ITEMS.inc(stage=stage, status="dead" if is_dead else "failed")
+            self.job_queue.fail(job, str(e), self.job_queue_config.retry_delay_seconds)
+        else:
+            if self.job_queue.complete(job):
+                STAGE_ITEMS.inc(stage=stage, status="ok")
+            else:
+                STAGE_ITEMS.inc(stage=stage, status="lost")
+                logger.warning(f"job {job.job_id} finished after its lease was lost")
+
+        # the worker that finishes the last video of a query finishes the query
+        if job.kind == VIDEO_JOB and job.parent:
+            self.finish_query(job.parent)
+
+    def run(self):
+        """
+        Claim and run jobs until the queue is drained, or forever if
+        ``exit_when_idle`` is off. The video jobs are claimed before new queries.
+        """
+        logger.info(
+            f"worker {self.worker_id} claiming from queue {self.job_queue.queue_name}"
+        )
+        while True:
+            try:
+                job = self.job_queue.claim(
+                    [VIDEO_JOB, QUERY_JOB],
+                    self.worker_id,
+                    self.job_queue_config.lease_seconds,
+                )
+                if job is None and (
+                    self.job_queue_config.exit_when_idle
+                    and not self.job_queue.has_unfinished()
+                ):
+                    logger.info(f"queue {self.job_queue.queue_name} is drained")
+                    return
+            except Exception as e:
+                # a busy or reconnecting database must not stop the worker
+                logger.warning(f"Exception occurred while claiming a job: {e}")
+                job = None
+
+            if job is None:
+                time.sleep(self.job_queue_config.poll_seconds)
+                continue
+
+            try:
+                self.run_job(job)
+            except Exception as e:
+                # the lease of the job expires and another worker claims it again
+                logger.warning(f"Exception occurred while finishing job {job.job_id}: {e}")
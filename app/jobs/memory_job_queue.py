@@ -0,0 +1,142 @@
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+from app.data_instances.job import Job, JobState
+from app.jobs.job_queue import JobQueue
+
+
+@JobQueue.register("memory")
+class MemoryJobQueue(JobQueue):
+    """
+    Job queue kept in the memory of one process, with the same leases, retries and
+    dead lettering as the SQL queue. It stands in for the shared table in a single
+    process run or in a test.
+    """
+
+    def __init__(self, queue_name: str = "default", max_attempts: int = 3) -> None:
+        super().__init__(queue_name, max_attempts)
+        self.jobs: Dict[str, Job] = {}
+        self.available_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def enqueue(
+        self,
+        kind: str,
+        entries: List[Tuple[str, Dict[str, Any]]],
+        parent: Optional[str] = None,
+    ) -> int:
+        inserted = 0
+        with self.lock:
+            for key, payload in entries:
+                job_id = f"{self.queue_name}:{kind}:{key}"
+                if job_id in self.jobs:
+                    continue
+                self.jobs[job_id] = Job(job_id, self.queue_name, kind, key, payload, parent)
+                self.available_at[job_id] = time.time()
+                inserted += 1
+
+        return inserted
+
+    def _is_claimable(self, job: Job, now: float) -> bool:
+        if job.state == JobState.PENDING:
+            return self.available_at[job.job_id] <= now
+        return (
+            job.state == JobState.LEASED
+            and job.lease_expires_at < now
+            and job.attempts < self.max_attempts
+        )
+
+    def claim(
+        self, kinds: List[str], owner: str, lease_seconds: float
+    ) -> Optional[Job]:
+        now = time.time()
+        with self.lock:
+            for job in self.jobs.values():
+                if (
+                    job.state == JobState.LEASED
+                    and job.lease_expires_at < now
+                    and job.attempts >= self.max_attempts
+                ):
+                    job.state = JobState.DEAD
+                    job.last_error = "the lease expired on the last attempt"
+
+            for kind in kinds:
+                candidates = [
+                    job
+                    for job in self.jobs.values()
+                    if job.kind == kind and self._is_claimable(job, now)
+                ]
+                if not candidates:
+                    continue
+
+                job = min(candidates, key=lambda job: self.available_at[job.job_id])
+                job.state = JobState.LEASED
+                job.lease_owner = owner
+                job.lease_expires_at = now + lease_seconds
+                job.attempts += 1
+                return replace(job)
+
+        return None
+
+    def _leased_job(self, job: Job) -> Optional[Job]:
+        stored_job = self.jobs.get(job.job_id)
+        if (
+            stored_job is None
+            or stored_job.state != JobState.LEASED
+            or stored_job.lease_owner != job.lease_owner
+        ):
+            return None
+        return stored_job
+
+    def heartbeat(self, job: Job, lease_seconds: float) -> bool:
+        with self.lock:
+            stored_job = self._leased_job(job)
+            if stored_job is None:
+                return False
+            stored_job.lease_expires_at = time.time() + lease_seconds
+            return True
+
+    def complete(self, job: Job) -> bool:
+        with self.lock:
+            stored_job = self._leased_job(job)
+            if stored_job is None:
+                return False
+            stored_job.state = JobState.DONE
+            stored_job.lease_owner = None
+            return True
+
+    def fail(self, job: Job, error: str, retry_delay: float) -> bool:
+        with self.lock:
+            stored_job = self._leased_job(job)
+            if stored_job is None:
+                return False
+
+            stored_job.lease_owner = None
+            stored_job.last_error = error
+            if stored_job.attempts >= self.max_attempts:
+                stored_job.state = JobState.DEAD
+            else:
+                stored_job.state = JobState.PENDING
+                stored_job.lease_expires_at = None
+                self.available_at[job.job_id] = time.time() + retry_delay * 2 ** (
+                    stored_job.attempts - 1
+                )
+            return True
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Dict[str, int]] = {}
+        with self.lock:
+            for job in self.jobs.values():
+                states = counts.setdefault(job.kind, {})
+                states[job.state.value] = states.get(job.state.value, 0) + 1
+
+        return counts
+
+    def count_unfinished(self, parent: Optional[str] = None) -> int:
+        with self.lock:
+            return sum(
+                job.state in (JobState.PENDING, JobState.LEASED)
+                and (parent is None or job.parent == parent)
+                for job in self.jobs.values()
+            )
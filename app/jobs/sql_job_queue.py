@@ -0,0 +1,49 @@
+from typing import Any, Dict, List, Optional, Tuple
+from app.data_instances.job import Job
+from app.db.db_functions import (
+    claim_job,
+    complete_job,
+    count_unfinished_jobs,
+    enqueue_jobs,
+    extend_job_lease,
+    fail_job,
+    get_job_counts,
+)
+from app.jobs.job_queue import JobQueue
+
+
+@JobQueue.register("sql")
+class SQLJobQueue(JobQueue):
+    """
+    Job queue stored in the ``job`` table of the configured database. With a SQLite
+    file on a shared disk or a Postgres ``db_url`` the workers of every machine claim
+    their jobs from the same table.
+    """
+
+    def enqueue(
+        self,
+        kind: str,
+        entries: List[Tuple[str, Dict[str, Any]]],
+        parent: Optional[str] = None,
+    ) -> int:
+        return enqueue_jobs(self.queue_name, kind, entries, parent)
+
+    def claim(
+        self, kinds: List[str], owner: str, lease_seconds: float
+    ) -> Optional[Job]:
+        return claim_job(self.queue_name, kinds, owner, lease_seconds, self.max_attempts)
+
+    def heartbeat(self, job: Job, lease_seconds: float) -> bool:
+        return extend_job_lease(job, lease_seconds)
+
+    def complete(self, job: Job) -> bool:
+        return complete_job(job)
+
+    def fail(self, job: Job, error: str, retry_delay: float) -> bool:
+        return fail_job(job, error, retry_delay, self.max_attempts)
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        return get_job_counts(self.queue_name)
+
+    def count_unfinished(self, parent: Optional[str] = None) -> int:
+        return count_unfinished_jobs(self.queue_name, parent)
@@ -0,0 +1,340 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import bisect
+import json
+import os
+import threading
+import time
+from app.utils.file_utils import create_dir
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    """
+    Base class of the metrics. A metric holds one value per combination of label values
+    and every update is thread safe.
+
+    Attributes
+    ----------
+    name: ``str``
+        The name of the metric in the Prometheus format
+    description: ``str``
+        The help text of the metric
+    label_names: ``Sequence[str]``, ( default = () )
+        The names of the labels of the metric
+    """
+
+    metric_type = "untyped"
+
+    def __init__(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"{self.name} expects the labels {self.label_names}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, label_values: LabelValues, **extra: str) -> str:
+        pairs = list(zip(self.label_names, label_values)) + list(extra.items())
+        if not pairs:
+            return ""
+        formatted = ",".join(
+            f'{name}="{escape_label_value(value)}"' for name, value in pairs
+        )
+        return "{" + formatted + "}"
+
+    def prometheus_lines(self) -> List[str]:
+        raise NotImplementedError("prometheus_lines method not implemented")
+
+    def summary(self) -> Dict[str, object]:
+        raise NotImplementedError("summary method not implemented")
+
+
+class Counter(Metric):
+    """
+    A value that only goes up, such as the number of downloaded videos
+    """
+
+    metric_type = "counter"
+
+    def __init__(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, description, label_names)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        label_values = self._label_values(labels)
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self._label_values(labels), 0)
+
+    def prometheus_lines(self) -> List[str]:
+        with self.lock:
+            return [
+                f"{self.name}{self._format_labels(label_values)} {value}"
+                for label_values, value in sorted(self.values.items())
+            ]
+
+    def summary(self) -> Dict[str, object]:
+        with self.lock:
+            return {",".join(key) or "total": value for key, value in self.values.items()}
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, such as the number of videos in a stage
+    """
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels: str):
+        label_values = self._label_values(labels)
+        with self.lock:
+            self.values[label_values] = value
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """
+    The distribution of observed values in cumulative buckets, such as the latency of
+    the transcript fetches
+
+    Attributes
+    ----------
+    buckets: ``Sequence[float]``, ( default = DEFAULT_SECONDS_BUCKETS )
+        The upper bounds of the buckets, an implicit ``+Inf`` bucket is added
+    """
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_SECONDS_BUCKETS,
+    ) -> None:
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        label_values = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.counts.setdefault(label_values, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self.sums[label_values] = self.sums.get(label_values, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def prometheus_lines(self) -> List[str]:
+        lines = []
+        with self.lock:
+            for label_values, counts in sorted(self.counts.items()):
+                cumulative = 0
+                for upper_bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if upper_bound == float("inf") else f"{upper_bound:g}"
+                    lines.append(
+                        f"{self.name}_bucket{self._format_labels(label_values, le=le)} {cumulative}"
+                    )
+                labels = self._format_labels(label_values)
+                lines.append(f"{self.name}_sum{labels} {self.sums[label_values]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def summary(self) -> Dict[str, object]:
+        summary = {}
+        with self.lock:
+            for label_values, counts in self.counts.items():
+                count = sum(counts)
+                summary[",".join(label_values) or "total"] = {
+                    "count": count,
+                    "sum": self.sums[label_values],
+                    "mean": self.sums[label_values] / count if count else 0.0,
+                    "buckets": {
+                        ("+Inf" if upper_bound == float("inf") else f"{upper_bound:g}"): bucket_count
+                        for upper_bound, bucket_count in zip(
+                            self.buckets + (float("inf"),), counts
+                        )
+                    },
+                }
+        return summary
+
+
+class MetricsRegistry:
+    """
+    Hold the metrics of a run and export them as a Prometheus textfile and as a json
+    summary
+    """
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+        self.started_at = time.time()
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, description, label_names))
+
+    def gauge(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, description, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_SECONDS_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, description, label_names, buckets))
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": time.time() - self.started_at,
+            "metrics": {name: metric.summary() for name, metric in self.metrics.items()},
+        }
+
+    def export(
+        self,
+        metrics_dir: Union[str, Path],
+        prometheus_file_name: str = "data_collector.prom",
+        summary_file_name: str = "metrics_summary.json",
+    ):
+        """
+        Write the Prometheus textfile and the json summary. Both are written to a
+        temporary file and renamed, so the node exporter never reads a partial file.
+
+        Parameters
+        ----------
+        metrics_dir: ``Union[str, Path]``
+            The folder to write the files to, such as the textfile collector folder
+        prometheus_file_name: ``str``, ( default = "data_collector.prom" )
+            The file name of the Prometheus textfile
+        summary_file_name: ``str``, ( default = "metrics_summary.json" )
+            The file name of the json summary
+        """
+        metrics_dir = Path(metrics_dir)
+        create_dir(metrics_dir)
+
+        for file_name, content in (
+            (prometheus_file_name, self.to_prometheus()),
+            (summary_file_name, json.dumps(self.summary(), indent=2)),
+        ):
+            temp_path = metrics_dir / f".{file_name}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(content)
+            os.replace(temp_path, metrics_dir / file_name)
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_ITEMS = REGISTRY.counter(
+    "data_collector_stage_items_total",
+    "Items handled by each stage by their outcome",
+    ["stage", "status"],
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "data_collector_stage_seconds", "Seconds spent on one call of a stage", ["stage"]
+)
+STAGE_IN_PROGRESS = REGISTRY.gauge(
+    "data_collector_stage_in_progress", "Items being handled by a stage", ["stage"]
+)
+TRANSCRIPT_FETCH_SECONDS = REGISTRY.histogram(
+    "data_collector_transcript_fetch_seconds",
+    "Latency of listing and fetching the transcripts of a video",
+)
+DOWNLOAD_BYTES = REGISTRY.counter(
+    "data_collector_download_bytes_total", "Bytes of downloaded audio"
+)
+DOWNLOAD_BYTES_PER_SECOND = REGISTRY.histogram(
+    "data_collector_download_bytes_per_second",
+    "Download speed of the audio of a video",
+    buckets=(1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7),
+)
+CHUNKS_PER_VIDEO = REGISTRY.histogram(
+    "data_collector_chunks_per_video",
+    "Transcript chunks of a video per transcription type",
+    buckets=(10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+LID_LANGUAGES = REGISTRY.counter(
+    "data_collector_lid_languages_total", "Chunks by detected language", ["language"]
+)
+ASR_REAL_TIME_FACTOR = REGISTRY.histogram(
+    "data_collector_asr_real_time_factor",
+    "ASR processing seconds per second of audio of a batch call",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2),
+)
+PERCENT_MATCH = REGISTRY.histogram(
+    "data_collector_percent_match",
+    "Percent match between the YouTube and ASR transcriptions of a scored chunk, "
+    "the chunks pruned by the cheap upper bound are counted in "
+    "data_collector_stage_items_total with status pruned",
+    buckets=tuple(range(10, 101, 10)),
+)
+
+MODEL_SERVER_BATCH_SIZE = REGISTRY.histogram(
+    "data_collector_model_server_batch_size",
+    "Audios in a micro batch of the model server",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+def export_metrics(metrics_dir: Optional[Union[str, Path]]):
+    """
+    Export the metrics of the run, nothing is written if ``metrics_dir`` is None
+    """
+    if metrics_dir is not None:
+        REGISTRY.export(metrics_dir)
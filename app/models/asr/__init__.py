@@ -1,2 +1,15 @@
-from .nemo_model import NemoASR
-from .asr import ASR
\ No newline at end of file
+from .asr import ASR
+import importlib
+
+# The providers are imported on first use, see ``LazyRegistrable``
+_LAZY_ATTRIBUTES = {
+    "NemoASR": ".nemo_model",
+    "FakeASR": ".fake_asr",
+    "RemoteASR": ".remote_asr",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
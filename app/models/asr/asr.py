@@ -1,19 +1,87 @@
-from registrable import Registrable
+from app.models.lazy_registrable import LazyRegistrable
 import numpy as np
-import torch
-from typing import Union
+import os
+from typing import TYPE_CHECKING, List, Union
 from abc import abstractmethod
+from app.tracing import TRACER
 
+if TYPE_CHECKING:
+    import torch
 
-class ASR(Registrable):
-    def __init__(self, model_name: str, device: str):
+
+class ASR(LazyRegistrable):
+    provider_modules = {
+        "nemo": "app.models.asr.nemo_model",
+        "fake": "app.models.asr.fake_asr",
+        "remote": "app.models.asr.remote_asr",
+    }
+
+    def __init__(self, model_name: str, device: str, batch_size: int = 16):
         self.model_name = model_name
         self.device = device
+        self.batch_size = batch_size
 
     @abstractmethod
-    def transcribe_audio(self, audio: Union[torch.Tensor, np.ndarray]) -> str:
+    def transcribe_audio(self, audio: Union["torch.Tensor", np.ndarray]) -> str:
         raise NotImplementedError("transcribe_audio method not implemented")
 
     @abstractmethod
     def transcribe_audio_file(self, audio_file: str) -> str:
         raise NotImplementedError("transcribe_audio_file method not implemented")
+
+    def transcribe_audio_files_batch(self, audio_files: List[str]) -> List[str]:
+        """
+        Transcribe a single batch of audio files. Models with batched inference
+        should override this, the default transcribes the files one by one.
+        """
+        return [self.transcribe_audio_file(audio_file)[0] for audio_file in audio_files]
+
+    def transcribe_audios_batch(
+        self, audios: List[Union["torch.Tensor", np.ndarray]]
+    ) -> List[str]:
+        """
+        Transcribe a single batch of audio signals. Models with batched inference
+        should override this, the default transcribes the signals one by one.
+        """
+        return [self.transcribe_audio(audio) for audio in audios]
+
+    def transcribe_batch(
+        self, audios: List[Union[str, "torch.Tensor", np.ndarray]]
+    ) -> List[str]:
+        """
+        Transcribe many audio files or signals in one call. The inputs are sorted by
+        length and split into buckets of ``batch_size`` so that each batch needs as
+        little padding as possible. The transcriptions are returned in input order.
+
+        Parameters
+        ----------
+        audios: ``List[Union[str, "torch.Tensor", np.ndarray]]``
+            A list of audio file paths or a list of 16 kHz mono audio signals.
+            File sizes are used as the length of the files.
+
+        Returns
+        -------
+        ``List[str]``
+            The transcription of each audio
+        """
+        lengths = [
+            os.path.getsize(audio) if isinstance(audio, str) else len(audio)
+            for audio in audios
+        ]
+        order = sorted(range(len(audios)), key=lambda index: lengths[index])
+        transcriptions: List[str] = [""] * len(audios)
+
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start : start + self.batch_size]
+            batch = [audios[index] for index in indices]
+
+            with TRACER.span("asr.batch", "model", size=len(batch)):
+                if isinstance(batch[0], str):
+                    batch_transcriptions = self.transcribe_audio_files_batch(batch)
+                else:
+                    batch_transcriptions = self.transcribe_audios_batch(batch)
+
+            for index, transcription in zip(indices, batch_transcriptions):
+                transcriptions[index] = transcription
+
+        return transcriptions
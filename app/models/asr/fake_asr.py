@@ -0,0 +1,65 @@
+from .asr import ASR
+from typing import TYPE_CHECKING, List, Union
+import time
+import numpy as np
+
+if TYPE_CHECKING:
+    import torch
+
+DEFAULT_TEXT = "नमस्ते आज हम भारत के इतिहास के बारे में बात करेंगे"
+
+
+@ASR.register("fake")
+class FakeASR(ASR):
+    """
+    Stand-in ASR for benchmarks and offline runs. Every audio is transcribed as the same
+    ``text`` after a configurable latency, so the pipeline can be measured without
+    loading a NeMo checkpoint.
+
+    Attributes
+    ----------
+    model_name: ``str``, ( default = "fake" )
+        Not used, kept for the common provider config
+    device: ``str``, ( default = "cpu" )
+        Not used, kept for the common provider config
+    batch_size: ``int``, ( default = 16 )
+        The number of audios transcribed in one batch
+    text: ``str``, ( default = DEFAULT_TEXT )
+        The transcription returned for every audio
+    batch_latency: ``float``, ( default = 0.0 )
+        The seconds each batch takes, like the fixed cost of a forward pass
+    item_latency: ``float``, ( default = 0.0 )
+        The extra seconds each audio of a batch takes
+    """
+
+    def __init__(
+        self,
+        model_name: str = "fake",
+        device: str = "cpu",
+        batch_size: int = 16,
+        text: str = DEFAULT_TEXT,
+        batch_latency: float = 0.0,
+        item_latency: float = 0.0,
+    ) -> None:
+        super().__init__(model_name, device, batch_size)
+        self.text = text
+        self.batch_latency = batch_latency
+        self.item_latency = item_latency
+
+    def _transcribe(self, num_audios: int) -> List[str]:
+        time.sleep(self.batch_latency + self.item_latency * num_audios)
+        return [self.text] * num_audios
+
+    def transcribe_audio(self, audio: Union["torch.Tensor", np.ndarray]) -> str:
+        return self._transcribe(1)[0]
+
+    def transcribe_audio_file(self, audio_file: str) -> List[str]:
+        return self._transcribe(1)
+
+    def transcribe_audio_files_batch(self, audio_files: List[str]) -> List[str]:
+        return self._transcribe(len(audio_files))
+
+    def transcribe_audios_batch(
+        self, audios: List[Union["torch.Tensor", np.ndarray]]
+    ) -> List[str]:
+        return self._transcribe(len(audios))
@@ -1,8 +1,11 @@
-import nemo.collections.asr as nemo_asr
 from .asr import ASR
-from typing import Union
+from typing import TYPE_CHECKING, List, Union
+import threading
 import numpy as np
-import torch
+from app.tracing import TRACER
+
+if TYPE_CHECKING:
+    import torch
 
 
 @ASR.register("nemo")
@@ -16,18 +19,52 @@ class NemoASR(ASR):
         The name of the model to use. The options are "stt_hi_conformer_ctc_medium" and "stt_hi_conformer_ctc_large"
     device: ``str``
         The device to run the model on. The options are "cpu" and "cuda"
+    batch_size: ``int``, ( default = 16 )
+        The number of audios to transcribe in one forward pass
+
+    NeMo and the checkpoint are loaded on the first transcription, so a run that finds
+    no new videos never pays for them.
     """
 
     def __init__(
-        self, model_name: str = "stt_hi_conformer_ctc_medium", device: str = "cpu"
+        self,
+        model_name: str = "stt_hi_conformer_ctc_medium",
+        device: str = "cpu",
+        batch_size: int = 16,
     ) -> None:
-        self.device = device
-        self.asr_model = nemo_asr.models.EncDecCTCModelBPE.from_pretrained(
-            model_name=model_name,
-        ).to(device)
+        super().__init__(model_name, device, batch_size)
+        self._asr_model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def asr_model(self):
+        if self._asr_model is None:
+            with self._load_lock:
+                if self._asr_model is None:
+                    import nemo.collections.asr as nemo_asr
+
+                    with TRACER.span("asr.load_model", "model", model_name=self.model_name):
+                        self._asr_model = nemo_asr.models.EncDecCTCModelBPE.from_pretrained(
+                            model_name=self.model_name,
+                        ).to(self.device)
+
+        return self._asr_model
 
-    def transcribe_audio(self, audio: Union[torch.Tensor, np.ndarray]):
-        pass
+    def transcribe_audio(self, audio: Union["torch.Tensor", np.ndarray]) -> str:
+        """
+        Transcribe the audio signal using the NeMo ASR model
+
+        Parameters
+        ----------
+        audio: ``Union[torch.Tensor, np.ndarray]``
+            The 16 kHz mono audio signal to transcribe
+
+        Returns
+        -------
+        ``str``
+            The transcription of the audio signal
+        """
+        return self.transcribe_audios_batch([audio])[0]
 
     def transcribe_audio_file(self, audio_file: str):
         """
@@ -46,3 +83,57 @@ class NemoASR(ASR):
         return self.asr_model.transcribe(
             paths2audio_files=[audio_file], batch_size=1, verbose=False
         )
+
+    def transcribe_audio_files_batch(self, audio_files: List[str]) -> List[str]:
+        """
+        Transcribe the audio files in a single NeMo ``transcribe`` call
+
+        Parameters
+        ----------
+        audio_files: ``List[str]``
+            The paths to the audio files to transcribe
+
+        Returns
+        -------
+        ``List[str]``
+            The transcription of each audio file
+        """
+        return self.asr_model.transcribe(
+            paths2audio_files=audio_files, batch_size=len(audio_files), verbose=False
+        )
+
+    def transcribe_audios_batch(
+        self, audios: List[Union["torch.Tensor", np.ndarray]]
+    ) -> List[str]:
+        """
+        Transcribe the audio signals with one forward pass of the NeMo ASR model.
+        The signals are zero padded to the longest signal of the batch.
+
+        Parameters
+        ----------
+        audios: ``List[Union[torch.Tensor, np.ndarray]]``
+            The 16 kHz mono audio signals to transcribe
+
+        Returns
+        -------
+        ``List[str]``
+            The transcription of each audio signal
+        """
+        import torch
+
+        signals = [torch.as_tensor(audio, dtype=torch.float32) for audio in audios]
+        lengths = torch.tensor([len(signal) for signal in signals], device=self.device)
+        padded_signals = torch.nn.utils.rnn.pad_sequence(
+            signals, batch_first=True
+        ).to(self.device)
+
+        self.asr_model.eval()
+        with torch.inference_mode():
+            log_probs, encoded_len, _ = self.asr_model.forward(
+                input_signal=padded_signals, input_signal_length=lengths
+            )
+            transcriptions, _ = self.asr_model.decoding.ctc_decoder_predictions_tensor(
+                log_probs, decoder_lengths=encoded_len, return_hypotheses=False
+            )
+
+        return transcriptions
@@ -0,0 +1,66 @@
+from .asr import ASR
+from typing import TYPE_CHECKING, List, Union
+import numpy as np
+from app.serving.protocol import post_audios
+
+if TYPE_CHECKING:
+    import torch
+
+
+@ASR.register("remote")
+class RemoteASR(ASR):
+    """
+    Client of the ASR hosted by a model server started with
+    ``python -m app.tools.model_server``. The whole list of audios is sent in one
+    request and the server merges it with the requests of other collectors into micro
+    batches, so the weights are loaded once for all of them.
+
+    Attributes
+    ----------
+    model_name: ``str``, ( default = "remote" )
+        Not used, the model is chosen when the server starts
+    device: ``str``, ( default = "cpu" )
+        Not used, the model is chosen when the server starts
+    batch_size: ``int``, ( default = 16 )
+        Not used, the server batches the audios
+    server_url: ``str``, ( default = "http://127.0.0.1:8765" )
+        The url of the model server. Audio files are sent as paths, so a server
+        on another machine can only transcribe signals
+    timeout: ``float``, ( default = 600 )
+        The seconds to wait for the answer of a request
+    """
+
+    def __init__(
+        self,
+        model_name: str = "remote",
+        device: str = "cpu",
+        batch_size: int = 16,
+        server_url: str = "http://127.0.0.1:8765",
+        timeout: float = 600,
+    ) -> None:
+        super().__init__(model_name, device, batch_size)
+        self.server_url = server_url
+        self.timeout = timeout
+
+    def transcribe_batch(
+        self, audios: List[Union[str, "torch.Tensor", np.ndarray]]
+    ) -> List[str]:
+        if not audios:
+            return []
+        return post_audios(self.server_url, "/asr", audios, self.timeout)[
+            "transcriptions"
+        ]
+
+    def transcribe_audio(self, audio: Union["torch.Tensor", np.ndarray]) -> str:
+        return self.transcribe_batch([audio])[0]
+
+    def transcribe_audio_file(self, audio_file: str) -> List[str]:
+        return self.transcribe_batch([audio_file])
+
+    def transcribe_audio_files_batch(self, audio_files: List[str]) -> List[str]:
+        return self.transcribe_batch(audio_files)
+
+    def transcribe_audios_batch(
+        self, audios: List[Union["torch.Tensor", np.ndarray]]
+    ) -> List[str]:
+        return self.transcribe_batch(audios)
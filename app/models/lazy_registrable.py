@@ -0,0 +1,31 @@
+from registrable import Registrable
+from typing import Dict, List
+import importlib
+
+
+class LazyRegistrable(Registrable):
+    """
+    Registrable whose subclasses are imported on the first ``by_name`` of their name.
+    The provider modules import heavy model stacks such as NeMo and Whisper, so they
+    are not imported by the package and only the used provider is ever loaded.
+
+    Attributes
+    ----------
+    provider_modules: ``Dict[str, str]``
+        A dictionary of provider name and the module that registers it
+    """
+
+    provider_modules: Dict[str, str] = {}
+
+    @classmethod
+    def by_name(cls, name: str):
+        if not cls.is_registered(name) and name in cls.provider_modules:
+            importlib.import_module(cls.provider_modules[name])
+        return super().by_name(name)
+
+    @classmethod
+    def list_available(cls) -> List[str]:
+        available = super().list_available()
+        return available + [
+            name for name in cls.provider_modules if name not in available
+        ]
@@ -1,2 +1,15 @@
-from .whisper_model import WhisperModel
-from .speech_language_detection import SpeechLanguageDetection
\ No newline at end of file
+from .speech_language_detection import SpeechLanguageDetection
+import importlib
+
+# The providers are imported on first use, see ``LazyRegistrable``
+_LAZY_ATTRIBUTES = {
+    "WhisperModel": ".whisper_model",
+    "FakeSpeechLanguageDetection": ".fake_detector",
+    "RemoteSpeechLanguageDetection": ".remote_detector",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
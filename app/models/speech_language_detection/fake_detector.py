@@ -0,0 +1,71 @@
+from .speech_language_detection import SpeechLanguageDetection
+from typing import TYPE_CHECKING, List, Union
+import time
+import numpy as np
+from app.data_instances.language_prediction import LanguagePrediction
+from app.tracing import TRACER
+
+if TYPE_CHECKING:
+    import torch
+
+
+@SpeechLanguageDetection.register("fake")
+class FakeSpeechLanguageDetection(SpeechLanguageDetection):
+    """
+    Stand-in language detection for benchmarks and offline runs. Every audio is
+    detected as ``language`` after a configurable latency, so the pipeline can be
+    measured without loading a Whisper checkpoint.
+
+    Attributes
+    ----------
+    model_name: ``str``, ( default = "fake" )
+        Not used, kept for the common provider config
+    device: ``str``, ( default = "cpu" )
+        Not used, kept for the common provider config
+    batch_size: ``int``, ( default = 16 )
+        The number of audios detected in one batch
+    language: ``str``, ( default = "hi" )
+        The language detected for every audio
+    batch_latency: ``float``, ( default = 0.0 )
+        The seconds each batch takes, like the fixed cost of a forward pass
+    item_latency: ``float``, ( default = 0.0 )
+        The extra seconds each audio of a batch takes
+    """
+
+    def __init__(
+        self,
+        model_name: str = "fake",
+        device: str = "cpu",
+        batch_size: int = 16,
+        language: str = "hi",
+        batch_latency: float = 0.0,
+        item_latency: float = 0.0,
+    ) -> None:
+        super().__init__(model_name, device, batch_size)
+        self.language = language
+        self.batch_latency = batch_latency
+        self.item_latency = item_latency
+
+    def detect_language_from_signal(
+        self, audio: Union["torch.Tensor", np.ndarray]
+    ) -> str:
+        return self.detect_language_batch([audio])[0].language
+
+    def detect_language_from_file(self, audio_file: str) -> str:
+        return self.detect_language_batch([audio_file])[0].language
+
+    def detect_language_batch(
+        self, audios: List[Union[str, "torch.Tensor", np.ndarray]]
+    ) -> List[LanguagePrediction]:
+        predictions = []
+
+        for start in range(0, len(audios), self.batch_size):
+            num_audios = len(audios[start : start + self.batch_size])
+            with TRACER.span("lid.batch", "model", size=num_audios):
+                time.sleep(self.batch_latency + self.item_latency * num_audios)
+            predictions.extend(
+                LanguagePrediction(self.language, {self.language: 1.0})
+                for _ in range(num_audios)
+            )
+
+        return predictions
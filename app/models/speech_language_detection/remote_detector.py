@@ -0,0 +1,62 @@
+from .speech_language_detection import SpeechLanguageDetection
+from typing import TYPE_CHECKING, List, Union
+import numpy as np
+from app.data_instances.language_prediction import LanguagePrediction
+from app.serving.protocol import post_audios
+
+if TYPE_CHECKING:
+    import torch
+
+
+@SpeechLanguageDetection.register("remote")
+class RemoteSpeechLanguageDetection(SpeechLanguageDetection):
+    """
+    Client of the language detection hosted by a model server started with
+    ``python -m app.tools.model_server``. The whole list of audios is sent in one
+    request and the server merges it with the requests of other collectors into micro
+    batches, so the weights are loaded once for all of them.
+
+    Attributes
+    ----------
+    model_name: ``str``, ( default = "remote" )
+        Not used, the model is chosen when the server starts
+    device: ``str``, ( default = "cpu" )
+        Not used, the model is chosen when the server starts
+    batch_size: ``int``, ( default = 16 )
+        Not used, the server batches the audios
+    server_url: ``str``, ( default = "http://127.0.0.1:8765" )
+        The url of the model server. Audio files are sent as paths, so a server
+        on another machine can only detect the language of signals
+    timeout: ``float``, ( default = 600 )
+        The seconds to wait for the answer of a request
+    """
+
+    def __init__(
+        self,
+        model_name: str = "remote",
+        device: str = "cpu",
+        batch_size: int = 16,
+        server_url: str = "http://127.0.0.1:8765",
+        timeout: float = 600,
+    ) -> None:
+        super().__init__(model_name, device, batch_size)
+        self.server_url = server_url
+        self.timeout = timeout
+
+    def detect_language_from_signal(
+        self, audio: Union["torch.Tensor", np.ndarray]
+    ) -> str:
+        return self.detect_language_batch([audio])[0].language
+
+    def detect_language_from_file(self, audio_file: str) -> str:
+        return self.detect_language_batch([audio_file])[0].language
+
+    def detect_language_batch(
+        self, audios: List[Union[str, "torch.Tensor", np.ndarray]]
+    ) -> List[LanguagePrediction]:
+        if not audios:
+            return []
+        predictions = post_audios(self.server_url, "/lid", audios, self.timeout)[
+            "predictions"
+        ]
+        return [LanguagePrediction(**prediction) for prediction in predictions]
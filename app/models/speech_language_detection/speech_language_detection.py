@@ -1,21 +1,37 @@
-from registrable import Registrable
+from app.models.lazy_registrable import LazyRegistrable
 import numpy as np
-import torch
-from typing import Union
+from typing import TYPE_CHECKING, List, Union
 from abc import abstractmethod
+from app.data_instances.language_prediction import LanguagePrediction
 
+if TYPE_CHECKING:
+    import torch
 
-class SpeechLanguageDetection(Registrable):
-    def __init__(self, model_name: str, device: str):
+
+class SpeechLanguageDetection(LazyRegistrable):
+    provider_modules = {
+        "whisper": "app.models.speech_language_detection.whisper_model",
+        "fake": "app.models.speech_language_detection.fake_detector",
+        "remote": "app.models.speech_language_detection.remote_detector",
+    }
+
+    def __init__(self, model_name: str, device: str, batch_size: int = 16):
         self.model_name = model_name
         self.device = device
+        self.batch_size = batch_size
 
     @abstractmethod
     def detect_language_from_signal(
-        self, audio: Union[torch.Tensor, np.ndarray]
+        self, audio: Union["torch.Tensor", np.ndarray]
     ) -> str:
         raise NotImplementedError("transcribe_audio method not implemented")
 
     @abstractmethod
     def detect_language_from_file(self, audio_file: str) -> str:
         raise NotImplementedError("transcribe_audio_file method not implemented")
+
+    @abstractmethod
+    def detect_language_batch(
+        self, audios: List[Union[str, "torch.Tensor", np.ndarray]]
+    ) -> List[LanguagePrediction]:
+        raise NotImplementedError("detect_language_batch method not implemented")
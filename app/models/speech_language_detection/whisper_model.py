@@ -1,9 +1,13 @@
-import whisper
 from .speech_language_detection import SpeechLanguageDetection
-import torch
+import threading
 import numpy as np
-from typing import Union
+from typing import TYPE_CHECKING, List, Union
 from pathlib import Path
+from app.data_instances.language_prediction import LanguagePrediction
+from app.tracing import TRACER
+
+if TYPE_CHECKING:
+    import torch
 
 
 @SpeechLanguageDetection.register("whisper")
@@ -17,14 +21,36 @@ class WhisperModel(SpeechLanguageDetection):
         The name of the model to use. The options are "small" and "large"
     device: ``str``
         The device to run the model on. The options are "cpu" and "cuda"
+    batch_size: ``int``, ( default = 16 )
+        The number of audios to detect the language of in one forward pass
+
+    Whisper and the checkpoint are loaded on the first detection, so a run that finds
+    no new videos never pays for them.
     """
 
-    def __init__(self, model_name: str = "small", device: str = "cpu") -> None:
-        self.device = device
-        self.model = whisper.load_model(model_name,download_root="/data1/muni/models/whisper")
+    def __init__(
+        self, model_name: str = "small", device: str = "cpu", batch_size: int = 16
+    ) -> None:
+        super().__init__(model_name, device, batch_size)
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    import whisper
+
+                    with TRACER.span("lid.load_model", "model", model_name=self.model_name):
+                        self._model = whisper.load_model(
+                            self.model_name, download_root="/data1/muni/models/whisper"
+                        )
+
+        return self._model
 
     def detect_language_from_signal(
-        self, audio: Union[torch.Tensor, np.ndarray]
+        self, audio: Union["torch.Tensor", np.ndarray]
     ) -> str:
         """
         Detect the language of the audio signal using the whisper model
@@ -39,6 +65,8 @@ class WhisperModel(SpeechLanguageDetection):
         ``str``
             The detected language of the audio signal
         """
+        import whisper
+
         audio = whisper.pad_or_trim(audio)
         mel = whisper.log_mel_spectrogram(audio).to(self.model.device)
         _, probs = self.model.detect_language(mel)
@@ -61,5 +89,54 @@ class WhisperModel(SpeechLanguageDetection):
         """
         if isinstance(audio_path, Path):
             audio_path = str(audio_path)
+        import whisper
+
         audio= whisper.load_audio(audio_path)
         return self.detect_language_from_signal(audio)
+
+    def detect_language_batch(
+        self, audios: List[Union[str, "torch.Tensor", np.ndarray]]
+    ) -> List[LanguagePrediction]:
+        """
+        Detect the language of many audio files or signals. The mel spectrograms of
+        ``batch_size`` audios are stacked and run through the model in one forward pass.
+
+        Parameters
+        ----------
+        audios: ``List[Union[str, torch.Tensor, np.ndarray]]``
+            A list of audio file paths or 16 kHz mono audio signals
+
+        Returns
+        -------
+        ``List[LanguagePrediction]``
+            The detected language and the probability of every language for each audio
+        """
+        import torch
+        import whisper
+
+        predictions: List[LanguagePrediction] = []
+
+        for start in range(0, len(audios), self.batch_size):
+            mels = []
+            with TRACER.span("lid.mel", "model"):
+                for audio in audios[start : start + self.batch_size]:
+                    if isinstance(audio, (str, Path)):
+                        audio = whisper.load_audio(str(audio))
+                    audio = whisper.pad_or_trim(audio)
+                    mels.append(
+                        whisper.log_mel_spectrogram(audio, n_mels=self.model.dims.n_mels)
+                    )
+
+            with TRACER.span("lid.batch", "model", size=len(mels)):
+                mel = torch.stack(mels).to(self.model.device)
+                _, probs = self.model.detect_language(mel)
+
+            for language_probs in probs:
+                predictions.append(
+                    LanguagePrediction(
+                        language=max(language_probs, key=language_probs.get),
+                        probabilities=language_probs,
+                    )
+                )
+
+        return predictions
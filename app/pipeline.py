@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from queue import Queue
+from typing import Any, Callable, Iterable, List, Optional
+import logging
+import threading
+from app.metrics import STAGE_IN_PROGRESS, STAGE_ITEMS
+from app.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = object()
+
+
+@dataclass
+class Stage:
+    """
+    A stage of the pipeline
+
+    Attributes
+    ----------
+    name: ``str``
+        The name of the stage, used in the logs and thread names
+    func: ``Callable[[Any], Optional[Iterable[Any]]]``
+        The function to run on each item. The items it returns or yields are passed
+        to the next stage, returning None passes nothing on.
+    workers: ``int``, ( default = 1 )
+        The number of threads running the stage concurrently
+    queue_size: ``int``, ( default = 8 )
+        The maximum number of items waiting for this stage. Upstream stages block
+        when the queue is full, which keeps the memory bounded.
+    """
+
+    name: str
+    func: Callable[[Any], Optional[Iterable[Any]]]
+    workers: int = 1
+    queue_size: int = 8
+
+
+class Pipeline:
+    """
+    Run the stages as concurrent workers connected by bounded queues, so that every
+    stage works on a different item at the same time
+
+    Attributes
+    ----------
+    stages: ``List[Stage]``
+        The stages of the pipeline in order
+    """
+
+    def __init__(self, stages: List[Stage]) -> None:
+        self.stages = stages
+
+    def run(self, inputs: Iterable[Any]):
+        """
+        Feed the inputs to the first stage and wait until every stage has finished.
+        An exception raised for one item is logged and only drops that item.
+
+        Parameters
+        ----------
+        inputs: ``Iterable[Any]``
+            The items to process with the first stage
+        """
+        queues = [Queue(maxsize=stage.queue_size) for stage in self.stages]
+        remaining_workers = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+        threads = []
+
+        def worker(index: int):
+            stage = self.stages[index]
+            next_queue = queues[index + 1] if index + 1 < len(queues) else None
+
+            while True:
+                item = queues[index].get()
+                if item is _END_OF_STREAM:
+                    break
+
+                try:
+                    with STAGE_IN_PROGRESS.track_in_progress(
+                        stage=stage.name
+                    ), TRACER.span(stage.name, "stage"):
+                        outputs = stage.func(item)
+                        for output in outputs or []:
+                            if next_queue is not None:
+                                next_queue.put(output)
+                except Exception as e:
+                    STAGE_ITEMS.inc(stage=stage.name, status="error")
+                    logger.warning(f"Exception occurred in stage {stage.name}: {e}")
+
+            with lock:
+                remaining_workers[index] -= 1
+                is_last_worker = remaining_workers[index] == 0
+
+            if is_last_worker and next_queue is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    next_queue.put(_END_OF_STREAM)
+
+        for index, stage in enumerate(self.stages):
+            for worker_index in range(stage.workers):
+                thread = threading.Thread(
+                    target=worker,
+                    args=(index,),
+                    name=f"{stage.name}-{worker_index}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        for item in inputs:
+            queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_END_OF_STREAM)
+
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,2 @@
+from .micro_batcher import MicroBatcher
+from .model_server import ModelServer
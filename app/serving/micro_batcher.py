@@ -0,0 +1,143 @@
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+from app.metrics import MODEL_SERVER_BATCH_SIZE, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Merge the items of concurrent requests into batches for a model. The worker takes
+    the first waiting item, keeps collecting items until ``max_batch_size`` items are
+    collected or ``max_wait_ms`` passed, and runs the batch function once for the
+    audio files and once for the signals of the batch. If a merged batch fails, the
+    audios of each request are run again on their own, so only the requests whose
+    audios fail get the exception.
+
+    Attributes
+    ----------
+    name: ``str``
+        The name of the model, used in the metrics and the thread name
+    batch_func: ``Callable[[List[Any]], List[Any]]``
+        The function that processes a list of audio files or a list of signals and
+        returns one result per audio
+    max_batch_size: ``int``, ( default = 128 )
+        The maximum number of audios run through the batch function at once
+    max_wait_ms: ``float``, ( default = 10 )
+        The milliseconds the first item of a batch waits for more items
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_func: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 128,
+        max_wait_ms: float = 10,
+    ) -> None:
+        self.name = name
+        self.batch_func = batch_func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: Queue = Queue()
+        self.thread = threading.Thread(
+            target=self._run, name=f"{name}-batcher", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, audios: List[Any]) -> List[Any]:
+        """
+        Queue the audios of a request and wait for their results
+
+        Parameters
+        ----------
+        audios: ``List[Any]``
+            The audio files or signals of the request
+
+        Returns
+        -------
+        ``List[Any]``
+            The result of every audio in input order
+        """
+        request = object()
+        futures = []
+        for audio in audios:
+            future = Future()
+            self.queue.put((audio, future, request))
+            futures.append(future)
+
+        return [future.result() for future in futures]
+
+    def _collect(self) -> Optional[List[Tuple[Any, Future, object]]]:
+        item = self.queue.get()
+        if item is _STOP:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except Empty:
+                break
+            if item is _STOP:
+                self.queue.put(_STOP)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run_group(self, group: List[Tuple[Any, Future, object]]):
+        MODEL_SERVER_BATCH_SIZE.observe(len(group), model=self.name)
+        with STAGE_SECONDS.time(stage=f"server_{self.name}"):
+            results = self.batch_func([audio for audio, _, _ in group])
+        for (_, future, _), result in zip(group, results):
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            files = [item for item in batch if isinstance(item[0], str)]
+            signals = [item for item in batch if not isinstance(item[0], str)]
+            for group in (files, signals):
+                if not group:
+                    continue
+
+                try:
+                    self._run_group(group)
+                except Exception as e:
+                    logger.warning(f"Exception occurred in the {self.name} batch: {e}")
+                    self._run_requests(group, e)
+
+    def _run_requests(self, group: List[Tuple[Any, Future, object]], error: Exception):
+        """
+        Run the audios of every request of a failed batch on their own
+        """
+        requests: Dict[object, List[Tuple[Any, Future, object]]] = {}
+        for item in group:
+            requests.setdefault(item[2], []).append(item)
+
+        for request_group in requests.values():
+            try:
+                if len(requests) == 1:
+                    raise error
+                self._run_group(request_group)
+            except Exception as e:
+                for _, future, _ in request_group:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
@@ -0,0 +1,155 @@
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+import json
+import logging
+import threading
+import numpy as np
+from app.metrics import REGISTRY, STAGE_ITEMS
+from app.models.asr.asr import ASR
+from app.models.speech_language_detection.speech_language_detection import (
+    SpeechLanguageDetection,
+)
+from app.serving.micro_batcher import MicroBatcher
+from app.serving.protocol import decode_audios
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class ModelServer:
+    """
+    Host an ASR and a language detection provider behind a localhost HTTP server, so
+    several collector processes share one loaded copy of the models. The audios of
+    concurrent requests are merged into micro batches for each model.
+
+    The server answers:
+        POST /asr       the transcription of every audio, {"transcriptions": [...]}
+        POST /lid       the language of every audio, {"predictions": [...]}
+        GET  /health    the hosted models
+        GET  /metrics   the metrics of the server in the Prometheus format
+
+    Attributes
+    ----------
+    asr: ``Optional[ASR]``
+        The ASR provider to host, /asr is not served if None
+    speech_language_detector: ``Optional[SpeechLanguageDetection]``
+        The language detection provider to host, /lid is not served if None
+    host: ``str``, ( default = "127.0.0.1" )
+        The address to listen on
+    port: ``int``, ( default = 8765 )
+        The port to listen on, a free port is picked if 0
+    max_batch_size: ``int``, ( default = 128 )
+        The maximum number of audios in a micro batch
+    max_wait_ms: ``float``, ( default = 10 )
+        The milliseconds a micro batch waits for more audios
+    """
+
+    def __init__(
+        self,
+        asr: Optional[ASR],
+        speech_language_detector: Optional[SpeechLanguageDetection],
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        max_batch_size: int = 128,
+        max_wait_ms: float = 10,
+    ) -> None:
+        self.batchers: Dict[str, MicroBatcher] = {}
+        if asr is not None:
+            self.batchers["asr"] = MicroBatcher(
+                "asr", asr.transcribe_batch, max_batch_size, max_wait_ms
+            )
+        if speech_language_detector is not None:
+            self.batchers["lid"] = MicroBatcher(
+                "lid",
+                lambda audios: [
+                    asdict(prediction)
+                    for prediction in speech_language_detector.detect_language_batch(
+                        audios
+                    )
+                ],
+                max_batch_size,
+                max_wait_ms,
+            )
+
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread: Optional[threading.Thread] = None
+
+    def warmup(self):
+        """
+        Run one second of silence through every model, so the weights are loaded before
+        the first request
+        """
+        for name, batcher in self.batchers.items():
+            logger.info(f"warming up {name}")
+            batcher.submit([np.zeros(SAMPLE_RATE, dtype=np.float32)])
+
+    def _make_handler(self):
+        model_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, body: bytes, content_type: str, status: int = 200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_json(self, data: Any, status: int = 200):
+                self.send(
+                    json.dumps(data, ensure_ascii=False).encode(), "application/json", status
+                )
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self.send_json({"models": list(model_server.batchers)})
+                elif self.path == "/metrics":
+                    self.send(REGISTRY.to_prometheus().encode(), "text/plain; version=0.0.4")
+                else:
+                    self.send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                name = self.path.strip("/")
+                if name not in model_server.batchers:
+                    self.send_json({"error": f"{name} is not served"}, 404)
+                    return
+
+                try:
+                    body = self.rfile.read(int(self.headers["Content-Length"]))
+                    audios = decode_audios(body, self.headers["Content-Type"])
+                    results = model_server.batchers[name].submit(audios)
+                except Exception as e:
+                    STAGE_ITEMS.inc(stage=f"server_{name}", status="failed")
+                    logger.warning(f"Exception occurred while serving {self.path}: {e}")
+                    self.send_json({"error": str(e)}, 500)
+                    return
+
+                STAGE_ITEMS.inc(stage=f"server_{name}", status="ok")
+                key = "transcriptions" if name == "asr" else "predictions"
+                self.send_json({key: results})
+
+        return Handler
+
+    def serve_forever(self):
+        logger.info(f"serving {', '.join(self.batchers)} on {self.url}")
+        self.server.serve_forever()
+
+    def start(self):
+        """
+        Serve on a background thread
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for batcher in self.batchers.values():
+            batcher.close()
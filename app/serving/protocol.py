@@ -0,0 +1,88 @@
+from typing import Any, Dict, List, Tuple, Union
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+import io
+import json
+import numpy as np
+
+JSON_CONTENT_TYPE = "application/json"
+SIGNALS_CONTENT_TYPE = "application/x-npz"
+
+
+class ModelServerUnavailableError(RuntimeError):
+    """
+    The model server could not be reached or did not answer in time. Unlike an error
+    of the audios it says nothing about the video, so the video is retried later
+    instead of rejected.
+    """
+
+
+def encode_audios(audios: List[Union[str, np.ndarray]]) -> Tuple[bytes, str]:
+    """
+    Encode the audio file paths as json or the 16 kHz signals as an uncompressed npz
+    archive of float32 arrays named by their index
+
+    Parameters
+    ----------
+    audios: ``List[Union[str, np.ndarray]]``
+        A list of audio file paths or a list of audio signals
+
+    Returns
+    -------
+    ``Tuple[bytes, str]``
+        The request body and its content type
+    """
+    if all(isinstance(audio, str) for audio in audios):
+        return json.dumps({"files": audios}).encode(), JSON_CONTENT_TYPE
+
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        **{
+            str(index): np.asarray(audio, dtype=np.float32)
+            for index, audio in enumerate(audios)
+        },
+    )
+    return buffer.getvalue(), SIGNALS_CONTENT_TYPE
+
+
+def decode_audios(body: bytes, content_type: str) -> List[Union[str, np.ndarray]]:
+    """
+    Decode a request body written by ``encode_audios``
+    """
+    if content_type == JSON_CONTENT_TYPE:
+        return [str(audio) for audio in json.loads(body)["files"]]
+    if content_type == SIGNALS_CONTENT_TYPE:
+        with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+            return [archive[str(index)] for index in range(len(archive.files))]
+
+    raise ValueError(f"unsupported content type {content_type}")
+
+
+def post_audios(
+    server_url: str, path: str, audios: List[Union[str, np.ndarray]], timeout: float
+) -> Dict[str, Any]:
+    """
+    Send the audios to an endpoint of the model server and return its json answer.
+    The file paths must be readable by the server, so they are only sent to a server
+    on the same machine.
+
+    Raises ``ModelServerUnavailableError`` if the server can not be reached or does
+    not answer in time, an error answer of the server is raised as ``HTTPError``.
+    """
+    body, content_type = encode_audios(audios)
+    request = Request(
+        f"{server_url.rstrip('/')}{path}",
+        data=body,
+        headers={"Content-Type": content_type},
+        method="POST",
+    )
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except HTTPError:
+        raise
+    except (URLError, OSError) as e:
+        raise ModelServerUnavailableError(
+            f"the model server at {server_url} is unavailable: {e}"
+        ) from e
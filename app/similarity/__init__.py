@@ -0,0 +1,3 @@
+from .lcs_scorer import LCSScorer
+from .error_rate_scorer import CERScorer, WERScorer
+from .similarity_scorer import SimilarityScorer
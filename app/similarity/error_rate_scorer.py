@@ -0,0 +1,70 @@
+from typing import List
+from abc import abstractmethod
+from .similarity_scorer import SimilarityScorer
+from app.data_instances.similarity_score import SimilarityScore
+from app.utils.transcription_utils import calculate_edit_distance
+
+
+class ErrorRateScorer(SimilarityScorer):
+    """
+    Score the texts with ``100 - error rate`` where the error rate is the edit
+    distance between the tokens of the two texts relative to the number of tokens
+    in the first (YouTube) text. Scores are clipped to zero.
+    """
+
+    @abstractmethod
+    def tokenize(self, text: str) -> List[str]:
+        raise NotImplementedError("tokenize method not implemented")
+
+    def upper_bound(self, text1: str, text2: str) -> float:
+        """
+        The edit distance is at least the difference of the token counts
+
+        Parameters
+        ----------
+        text1: ``str``
+            The reference (YouTube) text
+        text2: ``str``
+            The hypothesis (ASR) text
+
+        Returns
+        -------
+        ``float``
+            An upper bound on the percent match of the two texts
+        """
+        len1 = len(self.tokenize(text1))
+        len2 = len(self.tokenize(text2))
+        if len1 == 0:
+            return 0
+
+        return max(0, 1 - abs(len1 - len2) / len1) * 100
+
+    def score(self, text1: str, text2: str) -> SimilarityScore:
+        tokens1 = self.tokenize(text1)
+        tokens2 = self.tokenize(text2)
+        if not tokens1:
+            return SimilarityScore(percent_match=0)
+
+        error_rate = calculate_edit_distance(tokens1, tokens2) / len(tokens1)
+
+        return SimilarityScore(percent_match=max(0, 1 - error_rate) * 100)
+
+
+@SimilarityScorer.register("cer")
+class CERScorer(ErrorRateScorer):
+    """
+    Score the texts with the character error rate
+    """
+
+    def tokenize(self, text: str) -> List[str]:
+        return list(text)
+
+
+@SimilarityScorer.register("wer")
+class WERScorer(ErrorRateScorer):
+    """
+    Score the texts with the word error rate
+    """
+
+    def tokenize(self, text: str) -> List[str]:
+        return text.split()
@@ -0,0 +1,46 @@
+from collections import Counter
+from .similarity_scorer import SimilarityScorer
+from app.data_instances.similarity_score import SimilarityScore
+from app.utils.transcription_utils import (
+    calculate_similarity,
+    find_longest_common_substring,
+)
+
+
+@SimilarityScorer.register("lcs")
+class LCSScorer(SimilarityScorer):
+    """
+    Score the texts with the length of their longest common substring relative to
+    the average length of the two texts
+    """
+
+    def upper_bound(self, text1: str, text2: str) -> float:
+        """
+        The common substring can not be longer than the shorter text, nor contain a
+        character more often than both texts do
+
+        Parameters
+        ----------
+        text1: ``str``
+            The first string
+        text2: ``str``
+            The second string
+
+        Returns
+        -------
+        ``float``
+            An upper bound on the percent match of the two texts
+        """
+        total_len = (len(text1) + len(text2)) / 2
+        if total_len == 0:
+            return 0
+
+        max_len = sum((Counter(text1) & Counter(text2)).values())
+
+        return (max_len / total_len) * 100
+
+    def score(self, text1: str, text2: str) -> SimilarityScore:
+        sub_string = find_longest_common_substring(text1, text2)
+        percent_match = calculate_similarity(text1, text2, sub_string)
+
+        return SimilarityScore(percent_match=percent_match, sub_string=sub_string)
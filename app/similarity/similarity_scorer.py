@@ -0,0 +1,48 @@
+from registrable import Registrable
+from typing import List, Optional, Tuple
+from abc import abstractmethod
+from app.data_instances.similarity_score import SimilarityScore
+
+
+class SimilarityScorer(Registrable):
+    """
+    Base class for the scorers that measure how well the YouTube transcription of a
+    chunk matches the ASR transcription. Scores are percentages in ``[0, 100]``.
+    """
+
+    @abstractmethod
+    def upper_bound(self, text1: str, text2: str) -> float:
+        raise NotImplementedError("upper_bound method not implemented")
+
+    @abstractmethod
+    def score(self, text1: str, text2: str) -> SimilarityScore:
+        raise NotImplementedError("score method not implemented")
+
+    def score_batch(
+        self, text_pairs: List[Tuple[str, str]], threshold: float = 0
+    ) -> List[Optional[SimilarityScore]]:
+        """
+        Score all the text pairs of a video in one call. Pairs whose cheap upper bound
+        is not above the ``threshold`` are skipped without running the full score.
+
+        Parameters
+        ----------
+        text_pairs: ``List[Tuple[str, str]]``
+            A list of (youtube text, asr text) pairs
+        threshold: ``float``, ( default = 0 )
+            Pairs need a score above this threshold to be accepted
+
+        Returns
+        -------
+        ``List[Optional[SimilarityScore]]``
+            The score of each pair, or None if the pair can not pass the threshold
+        """
+        scores: List[Optional[SimilarityScore]] = []
+
+        for text1, text2 in text_pairs:
+            if self.upper_bound(text1, text2) <= threshold:
+                scores.append(None)
+            else:
+                scores.append(self.score(text1, text2))
+
+        return scores
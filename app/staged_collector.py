@@ -0,0 +1,286 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+import threading
+
+from app.audio_processor import AudioProcessor
+from app.data_instances.download_config import DownloadConfig
+from app.data_instances.pipeline_config import PipelineConfig
+from app.data_instances.run_mode import RunMode
+from app.data_instances.video_meta import VideoMetaData
+from app.data_instances.video_stage import VideoStage
+from app.data_retrival import DataRetrieval
+from app.data_validator import DataValidator
+from app.db.checkpoint import VideoCheckpoint
+from app.db.db_functions import filter_and_insert_videos
+from app.pipeline import Pipeline, Stage
+from app.tracing import TRACER
+from app.utils.file_utils import create_dir, remove_files_with_pattern
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryJob:
+    query: str
+    audio_query_folder: Path
+    videos_metadata: List[VideoMetaData]
+    is_resumed: bool = False
+    pending_videos: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@dataclass
+class VideoJob:
+    query_job: QueryJob
+    video_url: str
+    transcription_data: Dict[str, Any]
+    video_metadata: Optional[VideoMetaData]
+    audio_path: Optional[Path] = None
+
+
+class StagedCollector:
+    """
+    Collect the data of the search queries with the stages search, transcripts,
+    download and process running concurrently. While the models process one video
+    the next videos are downloaded and the next queries are searched.
+
+    In the discover and transcripts modes the pipeline stops after the transcripts
+    stage, which then only records the new videos or their validated transcripts in
+    the checkpoint.
+
+    Attributes
+    ----------
+    data_retrieval: ``DataRetrieval``
+        DataRetrieval object to search the videos and fetch their transcripts
+    data_validator: ``DataValidator``
+        DataValidator object to validate the transcripts
+    audio_processor: ``Optional[AudioProcessor]``
+        AudioProcessor object to download and process the audio, only needed in the
+        full mode
+    download_config: ``DownloadConfig``
+        The download configuration
+    pipeline_config: ``PipelineConfig``
+        The number of workers of each stage and the size of the queues between them
+    processed_queries_path: ``Path``
+        The file the finished queries are appended to
+    checkpoint: ``Optional[VideoCheckpoint]``, ( default = None )
+        VideoCheckpoint object to resume the searched queries and their unfinished videos
+    """
+
+    def __init__(
+        self,
+        data_retrieval: DataRetrieval,
+        data_validator: DataValidator,
+        audio_processor: Optional[AudioProcessor],
+        download_config: DownloadConfig,
+        pipeline_config: PipelineConfig,
+        processed_queries_path: Path,
+        checkpoint: Optional[VideoCheckpoint] = None,
+    ) -> None:
+        self.data_retrieval = data_retrieval
+        self.data_validator = data_validator
+        self.audio_processor = audio_processor
+        self.download_config = download_config
+        self.pipeline_config = pipeline_config
+        self.processed_queries_path = processed_queries_path
+        self.checkpoint = checkpoint
+        self.run_mode = RunMode(download_config.mode)
+        self.processed_queries_lock = threading.Lock()
+
+    def search(self, search_query: str) -> List[QueryJob]:
+        """
+        Search the videos of a query or channel id and save their urls
+        """
+        audio_download_folder = Path(self.download_config.dst_folder_name)
+        logger.info(f"Collecting urls for query or channel id: {search_query}")
+
+        if self.download_config.is_channel_ids:
+            query = search_query
+            audio_query_folder = audio_download_folder / search_query
+        else:
+            query = search_query.lower().strip().replace(" ", "+").strip()
+            audio_query_folder = audio_download_folder / query.replace(
+                "+", "_"
+            ).replace('"', "")
+
+        create_dir(audio_query_folder)
+
+        if self.checkpoint and self.checkpoint.is_query_searched(search_query):
+            videos_metadata = self.checkpoint.get_query_videos(search_query)
+            logger.info(
+                f"Resuming {len(videos_metadata)} unfinished videos for query: {search_query}"
+            )
+            return [QueryJob(search_query, audio_query_folder, videos_metadata, True)]
+
+        if self.download_config.is_channel_ids:
+            videos_metadata = self.data_retrieval.get_video_metadata_with_channel_id(
+                search_query, self.download_config.license_workers
+            )
+        else:
+            videos_metadata = self.data_retrieval.get_video_metadata_with_query(
+                query, max_pages=self.download_config.max_pages
+            )
+
+        with open(audio_query_folder / "urls_list.txt", "w") as f:
+            f.write("\n".join(metadata.url for metadata in videos_metadata))
+        logger.info(f"total collected urls before filtering : {len(videos_metadata)}")
+
+        return [QueryJob(search_query, audio_query_folder, videos_metadata)]
+
+    def collect_transcripts(self, query_job: QueryJob) -> List[VideoJob]:
+        """
+        Filter the new videos of a query, fetch and validate their transcripts
+        """
+        if query_job.is_resumed:
+            videos_metadata = query_job.videos_metadata
+            videos_to_fetch = self.checkpoint.get_query_videos(
+                query_job.query, before=VideoStage.VALIDATED
+            )
+        else:
+            videos_metadata = filter_and_insert_videos(query_job.videos_metadata)
+            if self.data_retrieval.seen_video_index:
+                self.data_retrieval.seen_video_index.add_urls(
+                    metadata.url for metadata in videos_metadata
+                )
+            if self.checkpoint:
+                self.checkpoint.mark_discovered(query_job.query, videos_metadata)
+            videos_to_fetch = videos_metadata
+
+        if not self.run_mode.includes(RunMode.TRANSCRIPTS):
+            logger.info(
+                f"total discovered videos : {len(videos_to_fetch)} for query: {query_job.query}"
+            )
+            return []
+
+        video_transcription_data = self.data_retrieval.get_video_transcripts(
+            videos_to_fetch,
+            self.download_config.transcript_workers,
+            self.checkpoint,
+        )
+        valid_transcriptions = self.data_validator.validate_transcriptions(
+            video_transcription_data
+        )
+        if self.checkpoint:
+            self.checkpoint.mark_validated(
+                [metadata.url for metadata in videos_to_fetch], valid_transcriptions
+            )
+            valid_transcriptions = self.checkpoint.get_validated_transcriptions(
+                [metadata.url for metadata in videos_metadata]
+            )
+        logger.info(
+            f"total valid transcriptions : {len(valid_transcriptions)} for query: {query_job.query}"
+        )
+        if not self.run_mode.includes(RunMode.FULL):
+            return []
+
+        metadata_by_url = {metadata.url: metadata for metadata in videos_metadata}
+        video_jobs = [
+            VideoJob(
+                query_job, video_url, transcription_data, metadata_by_url.get(video_url)
+            )
+            for video_url, transcription_data in valid_transcriptions.items()
+        ]
+        query_job.pending_videos = len(video_jobs)
+
+        if not video_jobs:
+            self.finish_query(query_job)
+
+        return video_jobs
+
+    def download(self, video_job: VideoJob) -> List[VideoJob]:
+        """
+        Download the audio of a video, videos that are already processed are skipped
+        """
+        try:
+            video_id = video_job.video_url.split("=")[-1]
+            stages = self.checkpoint.get_stages([video_id]) if self.checkpoint else {}
+            if not self.audio_processor.is_video_finished(
+                video_job.query_job.audio_query_folder, video_id, stages
+            ):
+                video_job.audio_path = self.audio_processor.download_audio(
+                    video_job.video_url,
+                    video_job.query_job.audio_query_folder,
+                    self.download_config.download_audio_format,
+                )
+        finally:
+            if video_job.audio_path is None:
+                self.finish_video(video_job)
+
+        return [video_job] if video_job.audio_path else []
+
+    def process(self, video_job: VideoJob):
+        """
+        Split the audio of a video into chunks and validate them with the models
+        """
+        try:
+            with TRACER.span("process_video", video_id=video_job.audio_path.stem):
+                self.audio_processor.process_video(
+                    video_job.audio_path,
+                    video_job.transcription_data,
+                    video_job.video_metadata,
+                    self.download_config.percent_match,
+                    self.download_config.in_memory_chunks,
+                    self.download_config.export_chunks,
+                )
+        finally:
+            self.finish_video(video_job)
+
+    def finish_video(self, video_job: VideoJob):
+        query_job = video_job.query_job
+        with query_job.lock:
+            query_job.pending_videos -= 1
+            is_last_video = query_job.pending_videos == 0
+
+        if is_last_video:
+            self.finish_query(query_job)
+
+    def finish_query(self, query_job: QueryJob):
+        """
+        Mark the query as processed and delete the long audio files of the query
+        """
+        if self.audio_processor.metadata_writer:
+            self.audio_processor.metadata_writer.flush()
+        if self.checkpoint:
+            self.checkpoint.mark_query_done(query_job.query)
+
+        with self.processed_queries_lock:
+            with open(self.processed_queries_path, "a+") as f:
+                f.write(query_job.query + "\n")
+
+        audio_format = self.download_config.download_audio_format
+        logger.info(
+            f"Deleting longer audio files for prompt: {query_job.audio_query_folder} and pattern: {audio_format}"
+        )
+        remove_files_with_pattern(query_job.audio_query_folder, audio_format)
+        remove_files_with_pattern(query_job.audio_query_folder, ".part")
+
+    def run(self, search_queries: List[str]):
+        """
+        Run the staged pipeline over the search queries
+
+        Parameters
+        ----------
+        search_queries: ``List[str]``
+            The search queries or channel ids to collect
+        """
+        config = self.pipeline_config
+        stages = [
+            Stage("search", self.search, config.search_workers, config.queue_size),
+            Stage(
+                "transcripts",
+                self.collect_transcripts,
+                config.transcript_workers,
+                config.queue_size,
+            ),
+        ]
+        if self.run_mode == RunMode.FULL:
+            stages += [
+                Stage(
+                    "download", self.download, config.download_workers, config.queue_size
+                ),
+                Stage("process", self.process, config.process_workers, config.queue_size),
+            ]
+
+        Pipeline(stages).run(search_queries)
@@ -0,0 +1,2 @@
+from .manifest import ManifestWriter, get_total_duration, read_manifest
+from .pcm_shards import PCMShardReader, PCMShardWriter
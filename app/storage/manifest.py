@@ -0,0 +1,160 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import os
+import threading
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from app.utils.file_utils import create_dir
+
+MANIFEST_SCHEMA = pa.schema(
+    [
+        ("video_id", pa.string()),
+        ("channel_name", pa.string()),
+        ("published_year", pa.string()),
+        ("transcription_type", pa.string()),
+        ("start", pa.float64()),
+        ("duration", pa.float64()),
+        ("youtube_text", pa.string()),
+        ("asr_text", pa.string()),
+        ("percent_match", pa.float64()),
+        ("language", pa.string()),
+        ("location", pa.string()),
+    ]
+)
+
+
+class ManifestWriter:
+    """
+    Append one row per accepted chunk to a Parquet manifest. The rows are buffered and
+    every flush writes a new part file, written to a temporary file and renamed into
+    place, so readers only ever see complete part files.
+
+    Attributes
+    ----------
+    manifest_dir: ``Union[str, Path]``
+        The folder of the Parquet part files
+    max_rows: ``int``, ( default = 50_000 )
+        The number of buffered rows that triggers a flush
+    """
+
+    def __init__(self, manifest_dir: Union[str, Path], max_rows: int = 50_000) -> None:
+        self.manifest_dir = Path(manifest_dir)
+        self.max_rows = max_rows
+        self.columns: Dict[str, List[Any]] = {name: [] for name in MANIFEST_SCHEMA.names}
+        self.num_rows = 0
+        self.num_parts = 0
+        self.run_id = f"{time.time_ns()}-{os.getpid()}"
+        self.lock = threading.RLock()
+        create_dir(self.manifest_dir)
+
+    def add(self, **row: Any):
+        """
+        Add a row to the manifest, missing columns are null
+
+        Parameters
+        ----------
+        row: ``Any``
+            The values of the columns of ``MANIFEST_SCHEMA``
+        """
+        with self.lock:
+            for name, values in self.columns.items():
+                values.append(row.get(name))
+            self.num_rows += 1
+
+            if self.num_rows >= self.max_rows:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows to a new part file
+        """
+        with self.lock:
+            if not self.num_rows:
+                return
+
+            table = pa.table(self.columns, schema=MANIFEST_SCHEMA)
+            part_path = (
+                self.manifest_dir / f"part-{self.run_id}-{self.num_parts:06d}.parquet"
+            )
+            temp_path = part_path.with_name(f".{part_path.name}.tmp")
+            pq.write_table(table, temp_path)
+            os.replace(temp_path, part_path)
+
+            self.columns = {name: [] for name in MANIFEST_SCHEMA.names}
+            self.num_rows = 0
+            self.num_parts += 1
+
+    def close(self):
+        self.flush()
+
+
+def read_manifest(
+    manifest_dir: Union[str, Path],
+    columns: Optional[List[str]] = None,
+    filter: Optional[pc.Expression] = None,
+) -> pa.Table:
+    """
+    Read the manifest as a single Arrow table, only the given columns are read
+
+    Parameters
+    ----------
+    manifest_dir: ``Union[str, Path]``
+        The folder of the Parquet part files
+    columns: ``Optional[List[str]]``, ( default = None )
+        The columns to read, all columns if not given
+    filter: ``Optional[pc.Expression]``, ( default = None )
+        A filter on the rows such as ``pc.field("transcription_type") == "manual"``
+
+    Returns
+    -------
+    ``pa.Table``
+        The rows of the manifest
+    """
+    # files starting with "." are ignored, so the temporary part files are never read
+    dataset = ds.dataset(manifest_dir, format="parquet", schema=MANIFEST_SCHEMA)
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+def get_total_duration(
+    manifest_dir: Union[str, Path],
+    low: Optional[float] = None,
+    high: Optional[float] = None,
+    transcription_type: Optional[str] = None,
+) -> float:
+    """
+    Get the total duration of the accepted chunks from the manifest
+
+    Parameters
+    ----------
+    manifest_dir: ``Union[str, Path]``
+        The folder of the Parquet part files
+    low: ``Optional[float]``, ( default = None )
+        Only count the chunks with a percent match of at least ``low``
+    high: ``Optional[float]``, ( default = None )
+        Only count the chunks with a percent match of at most ``high``
+    transcription_type: ``Optional[str]``, ( default = None )
+        Only count the chunks of this transcription type, "manual" or "auto"
+
+    Returns
+    -------
+    ``float``
+        The total duration in seconds
+    """
+    filter = None
+    conditions = []
+    if low is not None:
+        conditions.append(pc.field("percent_match") >= low)
+    if high is not None:
+        conditions.append(pc.field("percent_match") <= high)
+    if transcription_type is not None:
+        conditions.append(pc.field("transcription_type") == transcription_type)
+    for condition in conditions:
+        filter = condition if filter is None else filter & condition
+
+    table = read_manifest(manifest_dir, ["duration"], filter)
+    total_duration = pc.sum(table["duration"]).as_py()
+
+    return total_duration or 0.0
@@ -0,0 +1,267 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import json
+import threading
+import numpy as np
+from app.utils.file_utils import create_dir
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+DATA_SUFFIX = ".pcm"
+INDEX_SUFFIX = ".jsonl"
+
+
+def to_pcm16(signal: np.ndarray) -> np.ndarray:
+    """
+    Convert a float signal in ``[-1, 1]`` to 16 bit PCM, int16 signals are returned as is
+    """
+    if signal.dtype == np.int16:
+        return signal
+
+    return np.clip(np.round(signal * 32768.0), -32768, 32767).astype(np.int16)
+
+
+class PCMShardWriter:
+    """
+    Pack the audio chunks into size bounded shards instead of one file per chunk.
+    A shard is a raw blob of 16 kHz mono 16 bit PCM samples and a json lines index
+    with the key, sample offset, number of samples and text of every chunk.
+
+    The samples of a chunk are flushed to the blob before its index line is written,
+    so an interrupted run never indexes a partial chunk. A writer never appends to an
+    existing shard, a new run starts with the next free shard number.
+
+    Attributes
+    ----------
+    root_dir: ``Union[str, Path]``
+        The folder of the shards
+    shard_size_mb: ``float``, ( default = 1024 )
+        A new shard is started once the blob of the current shard reaches this size
+    prefix: ``str``, ( default = "shard" )
+        The file name prefix of the shards
+    """
+
+    def __init__(
+        self,
+        root_dir: Union[str, Path],
+        shard_size_mb: float = 1024,
+        prefix: str = "shard",
+    ) -> None:
+        self.root_dir = Path(root_dir)
+        self.max_shard_bytes = int(shard_size_mb * 1024 * 1024)
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.shard_index = -1
+        self.data_file = None
+        self.index_file = None
+        self.num_samples = 0
+        create_dir(self.root_dir)
+
+    def _open_next_shard(self):
+        self._close_shard()
+
+        while True:
+            self.shard_index += 1
+            shard_path = self.root_dir / f"{self.prefix}-{self.shard_index:06d}"
+            try:
+                self.data_file = open(shard_path.with_suffix(DATA_SUFFIX), "xb")
+            except FileExistsError:
+                continue
+            break
+
+        self.index_file = open(shard_path.with_suffix(INDEX_SUFFIX), "w")
+        self.num_samples = 0
+
+    def _close_shard(self):
+        if self.data_file is not None:
+            self.data_file.close()
+            self.index_file.close()
+            self.data_file = None
+            self.index_file = None
+
+    def write(self, key: str, signal: np.ndarray, **metadata: Any) -> str:
+        """
+        Append a chunk to the current shard, starting a new shard when it is full
+
+        Parameters
+        ----------
+        key: ``str``
+            The unique key of the chunk
+        signal: ``np.ndarray``
+            The 16 kHz mono signal of the chunk, float in ``[-1, 1]`` or int16
+        metadata: ``Any``
+            Extra json serializable values stored in the index line of the chunk
+
+        Returns
+        -------
+        ``str``
+            The location of the chunk as ``{shard name}:{key}``
+        """
+        samples = to_pcm16(np.asarray(signal))
+
+        with self.lock:
+            if (
+                self.data_file is None
+                or self.num_samples * SAMPLE_WIDTH >= self.max_shard_bytes
+            ):
+                self._open_next_shard()
+
+            self.data_file.write(samples.tobytes())
+            self.data_file.flush()
+
+            entry = {
+                "key": key,
+                "offset": self.num_samples,
+                "num_samples": len(samples),
+                **metadata,
+            }
+            self.index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.index_file.flush()
+            self.num_samples += len(samples)
+
+            return f"{Path(self.data_file.name).stem}:{key}"
+
+    def write_chunks(
+        self,
+        video_id: str,
+        transcription_type: str,
+        audio_signals: Dict[str, np.ndarray],
+        transcript: Dict[str, str],
+    ) -> Dict[str, str]:
+        """
+        Write the chunks of a transcription of a video, the keys of the chunks are
+        ``{video_id}/{transcription_type}/{chunk name}``
+
+        Parameters
+        ----------
+        video_id: ``str``
+            The id of the video
+        transcription_type: ``str``
+            The type of the transcription, "manual" or "auto"
+        audio_signals: ``Dict[str, np.ndarray]``
+            A dictionary of chunk file name and its 16 kHz signal
+        transcript: ``Dict[str, str]``
+            A dictionary of chunk file name and its text
+
+        Returns
+        -------
+        ``Dict[str, str]``
+            A dictionary of chunk file name and its location in the shards
+        """
+        return {
+            chunk_name: self.write(
+                f"{video_id}/{transcription_type}/{chunk_name}",
+                signal,
+                video_id=video_id,
+                transcription_type=transcription_type,
+                text=transcript.get(chunk_name, ""),
+            )
+            for chunk_name, signal in audio_signals.items()
+        }
+
+    def close(self):
+        with self.lock:
+            self._close_shard()
+
+
+class PCMShardReader:
+    """
+    Random access to the chunks of the PCM shards. The blobs are memory mapped, so
+    reading a chunk only touches its own pages and the returned samples are views
+    of the mapped file. When a key was written more than once the last entry is used.
+
+    Attributes
+    ----------
+    root_dir: ``Union[str, Path]``
+        The folder of the shards
+    prefix: ``str``, ( default = "shard" )
+        The file name prefix of the shards
+    """
+
+    def __init__(self, root_dir: Union[str, Path], prefix: str = "shard") -> None:
+        self.root_dir = Path(root_dir)
+        self.entries: Dict[str, Tuple[Path, Dict[str, Any]]] = {}
+        self.blobs: Dict[Path, np.memmap] = {}
+
+        for index_path in sorted(self.root_dir.glob(f"{prefix}-*{INDEX_SUFFIX}")):
+            data_path = index_path.with_suffix(DATA_SUFFIX)
+            if not data_path.exists():
+                continue
+
+            total_samples = data_path.stat().st_size // SAMPLE_WIDTH
+            with open(index_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if entry["offset"] + entry["num_samples"] > total_samples:
+                        break
+                    self.entries[entry["key"]] = (data_path, entry)
+
+        self.keys: List[str] = list(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _blob(self, data_path: Path) -> np.memmap:
+        blob = self.blobs.get(data_path)
+        if blob is None:
+            blob = np.memmap(data_path, dtype=np.int16, mode="r")
+            self.blobs[data_path] = blob
+
+        return blob
+
+    def get_entry(self, key: str) -> Dict[str, Any]:
+        return self.entries[key][1]
+
+    def get_pcm(self, key: str) -> np.ndarray:
+        """
+        Get the 16 bit PCM samples of a chunk as a view of the memory mapped shard
+
+        Parameters
+        ----------
+        key: ``str``
+            The key of the chunk
+
+        Returns
+        -------
+        ``np.ndarray``
+            The int16 samples of the chunk
+        """
+        data_path, entry = self.entries[key]
+        offset = entry["offset"]
+
+        return self._blob(data_path)[offset : offset + entry["num_samples"]]
+
+    def get_signal(self, key: str) -> np.ndarray:
+        """
+        Get the 16 kHz float32 signal in ``[-1, 1]`` of a chunk
+        """
+        return self.get_pcm(key).astype(np.float32) / 32768.0
+
+    def __getitem__(self, index: int) -> Tuple[np.ndarray, Dict[str, Any]]:
+        key = self.keys[index]
+        return self.get_signal(key), self.get_entry(key)
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, Dict[str, Any]]]:
+        for index in range(len(self.keys)):
+            yield self[index]
+
+    def filter_keys(
+        self,
+        video_id: Optional[str] = None,
+        transcription_type: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Get the keys of the chunks of a video and or a transcription type
+        """
+        return [
+            key
+            for key, (_, entry) in self.entries.items()
+            if (video_id is None or entry.get("video_id") == video_id)
+            and (
+                transcription_type is None
+                or entry.get("transcription_type") == transcription_type
+            )
+        ]
@@ -0,0 +1,112 @@
+"""
+Multi-process write contention benchmark for the video metadata table.
+
+Several processes write videos metadata to the same SQLite database at the same time,
+either one transaction per video with ``insert_video_metadata`` or in batches with
+``VideoMetadataWriter``. The total time and the number of "database is locked" errors
+are reported for each mode.
+
+Usage: ``python -m app.tools.benchmark_db_contention [--processes 8] [--videos 500]``
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from app.data_instances.video_meta import VideoMetaData
+from app.db.connection import configure_engine, create_db_and_tables, get_engine
+from app.db.db_functions import insert_video_metadata
+from app.db.metadata_writer import VideoMetadataWriter
+
+
+def make_video(process_index: int, index: int) -> VideoMetaData:
+    video_id = f"{process_index:03d}{index:08d}"
+    return VideoMetaData(
+        video_id=video_id,
+        url=f"https://www.youtube.com/watch?v={video_id}",
+        title="title",
+        duration=60,
+        published_time="1 year ago",
+        channel_name="channel",
+        published_year="2023",
+    )
+
+
+def configure_journal(db_path: str, use_wal: bool):
+    if use_wal:
+        configure_engine(db_path)
+    else:
+        configure_engine(db_path, busy_timeout=5, journal_mode="DELETE", synchronous="FULL")
+
+
+def write_videos(args: Tuple[str, str, int, int, int, bool]) -> int:
+    db_path, mode, process_index, videos, batch_size, use_wal = args
+    configure_journal(db_path, use_wal)
+
+    errors = 0
+    writer = VideoMetadataWriter(max_batch_size=batch_size)
+
+    for index in range(videos):
+        video_metadata = make_video(process_index, index)
+        try:
+            if mode == "batched":
+                writer.add(video_metadata)
+            else:
+                insert_video_metadata(video_metadata)
+        except OperationalError:
+            errors += 1
+
+    try:
+        writer.close()
+    except OperationalError:
+        errors += 1
+
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--videos", type=int, default=500)
+    parser.add_argument("--batch_size", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'journal':>8} {'mode':>10} {'processes':>10} {'videos':>8} {'seconds':>9} {'errors':>7}")
+
+    for use_wal in (False, True):
+        for mode in ("per_video", "batched"):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                db_path = str(Path(tmp_dir) / "benchmark.db")
+                # the database is created in the journal mode under test, and no
+                # connection of the parent stays open to block the pragmas of the
+                # children
+                configure_journal(db_path, use_wal)
+                create_db_and_tables()
+                get_engine().dispose()
+
+                start = time.perf_counter()
+                with multiprocessing.Pool(args.processes) as pool:
+                    errors = sum(
+                        pool.map(
+                            write_videos,
+                            [
+                                (db_path, mode, index, args.videos, args.batch_size, use_wal)
+                                for index in range(args.processes)
+                            ],
+                        )
+                    )
+                elapsed = time.perf_counter() - start
+
+            journal = "WAL" if use_wal else "DELETE"
+            print(
+                f"{journal:>8} {mode:>10} {args.processes:>10} "
+                f"{args.processes * args.videos:>8} {elapsed:>9.3f} {errors:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
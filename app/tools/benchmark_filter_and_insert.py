@@ -0,0 +1,69 @@
+"""
+Benchmark for ``filter_and_insert_videos`` against a ``video_urls`` table that already
+holds 10k, 100k and 1M rows. Each run filters a batch of videos where half of the urls
+already exist and a tenth are duplicated within the batch.
+
+Usage: ``python -m app.tools.benchmark_filter_and_insert [--batch_size 5000]``
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from app.data_instances.video_meta import VideoMetaData
+from app.db.connection import configure_engine, create_db_and_tables
+from app.db.db_functions import filter_and_insert_videos
+
+EXISTING_ROWS = [10_000, 100_000, 1_000_000]
+
+
+def make_video(index: int) -> VideoMetaData:
+    video_id = f"{index:011d}"
+    return VideoMetaData(
+        video_id=video_id,
+        url=f"https://www.youtube.com/watch?v={video_id}",
+        title="title",
+        duration=60,
+        published_time="1 year ago",
+        channel_name="channel",
+        published_year="2023",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch_size", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'existing_rows':>14} {'batch_size':>11} {'inserted':>9} {'seconds':>9}")
+
+    for existing_rows in EXISTING_ROWS:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / "benchmark.db"
+            engine = configure_engine(str(db_path))
+            create_db_and_tables()
+
+            with sqlite3.connect(db_path) as connection:
+                connection.executemany(
+                    "INSERT INTO video_urls (url) VALUES (?)",
+                    (
+                        (f"https://www.youtube.com/watch?v={index:011d}",)
+                        for index in range(existing_rows)
+                    ),
+                )
+
+            first_index = existing_rows - args.batch_size // 2
+            videos = [make_video(first_index + i) for i in range(args.batch_size)]
+            videos += videos[: args.batch_size // 10]
+
+            start = time.perf_counter()
+            inserted = filter_and_insert_videos(videos)
+            elapsed = time.perf_counter() - start
+            engine.dispose()
+
+        print(f"{existing_rows:>14} {args.batch_size:>11} {len(inserted):>9} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Micro-benchmark for ``find_longest_common_substring``.
+
+Compares the bit-parallel engine against the classic full table implementation
+for chunk lengths from 50 to 5,000 characters and checks that both return the
+same output at every length. Only the timing of the slow table implementation is
+skipped above ``--max_reference_length``. A randomized check then compares both on
+``--random_checks`` pairs of overlapping texts, and the exit code is 1 on any
+mismatch.
+
+Usage: ``python -m app.tools.benchmark_lcs [--repeat 3] [--max_reference_length 2000]
+[--random_checks 200]``
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from app.utils.transcription_utils import find_longest_common_substring
+
+CHUNK_LENGTHS = [50, 100, 250, 500, 1000, 2000, 5000]
+HINDI_CHARACTERS = "कखगघचछजझटठडढणतथदधनपफबभमयरलवशसह" + "ािीुूेैोौंः्"
+
+
+def reference_longest_common_substring(text1: str, text2: str) -> str:
+    """
+    The original full ``(m + 1) x (n + 1)`` table implementation, kept here as the
+    baseline for the benchmark and the equivalence check
+    """
+    m = len(text1)
+    n = len(text2)
+    table = [[0 for _ in range(n + 1)] for _ in range(m + 1)]
+
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if text1[i - 1] == text2[j - 1]:
+                table[i][j] = table[i - 1][j - 1] + 1
+            else:
+                table[i][j] = max(table[i - 1][j], table[i][j - 1])
+
+    common_substring = []
+    i = m
+    j = n
+
+    while i > 0 and j > 0:
+        if text1[i - 1] == text2[j - 1]:
+            common_substring.append(text1[i - 1])
+            i -= 1
+            j -= 1
+        elif table[i - 1][j] > table[i][j - 1]:
+            i -= 1
+        else:
+            j -= 1
+
+    common_substring.reverse()
+    final_string = ""
+    all_words = set(text1.split() + text2.split())
+
+    for word in "".join(common_substring).split():
+        if word in all_words:
+            final_string = final_string + " " + word
+
+    return final_string.strip()
+
+
+def make_text(length: int, rng: random.Random) -> str:
+    """
+    Generate a random Hindi-like text of the given length with words of 2 to 7 characters
+    """
+    words = []
+    total = 0
+    while total < length:
+        word = "".join(rng.choice(HINDI_CHARACTERS) for _ in range(rng.randint(2, 7)))
+        words.append(word)
+        total += len(word) + 1
+
+    return " ".join(words)[:length]
+
+
+def mutate_text(text: str, rng: random.Random, rate: float) -> str:
+    """
+    Replace, drop or insert characters of a text at the given rate, so the pair shares
+    long common runs like a YouTube and an ASR transcription
+    """
+    characters = []
+    for character in text:
+        roll = rng.random()
+        if roll < rate / 3:
+            characters.append(rng.choice(HINDI_CHARACTERS + " "))
+        elif roll < 2 * rate / 3:
+            continue
+        elif roll < rate:
+            characters.extend([character, rng.choice(HINDI_CHARACTERS + " ")])
+        else:
+            characters.append(character)
+
+    return "".join(characters)
+
+
+def check_random_pairs(checks: int, rng: random.Random) -> int:
+    """
+    Compare both implementations on random pairs of texts up to 400 characters and
+    return the number of mismatches
+    """
+    mismatches = 0
+    for _ in range(checks):
+        text1 = make_text(rng.randint(0, 400), rng)
+        text2 = mutate_text(text1, rng, rng.choice([0.0, 0.05, 0.2, 0.5, 1.0]))
+        if rng.random() < 0.5:
+            text1, text2 = text2, text1
+
+        output = find_longest_common_substring(text1, text2)
+        expected = reference_longest_common_substring(text1, text2)
+        if output != expected:
+            mismatches += 1
+            print(f"mismatch for {text1!r} and {text2!r}: {output!r} != {expected!r}")
+
+    return mismatches
+
+
+def measure(
+    func: Callable[[str, str], str], text1: str, text2: str, repeat: int
+) -> Tuple[str, float, int]:
+    """
+    Return the output, the best wall time in seconds and the peak allocation in bytes
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(text1, text2)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(text1, text2)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return output, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max_reference_length", type=int, default=2000)
+    parser.add_argument("--random_checks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(
+        f"{'length':>8} {'engine_ms':>10} {'engine_kb':>10} "
+        f"{'table_ms':>10} {'table_kb':>10} {'equal':>6}"
+    )
+
+    mismatches = 0
+    for length in CHUNK_LENGTHS:
+        text1 = make_text(length, rng)
+        text2 = mutate_text(text1, rng, 0.2)
+        output, engine_time, engine_peak = measure(
+            find_longest_common_substring, text1, text2, args.repeat
+        )
+
+        if length > args.max_reference_length:
+            # the output is still checked, only the slow timing and tracing are skipped
+            expected = reference_longest_common_substring(text1, text2)
+            table_columns = f"{'-':>10} {'-':>10}"
+        else:
+            expected, table_time, table_peak = measure(
+                reference_longest_common_substring, text1, text2, 1
+            )
+            table_columns = f"{table_time * 1000:>10.2f} {table_peak / 1024:>10.1f}"
+
+        mismatches += output != expected
+        print(
+            f"{length:>8} {engine_time * 1000:>10.2f} {engine_peak / 1024:>10.1f} "
+            f"{table_columns} {str(output == expected):>6}"
+        )
+
+    mismatches += check_random_pairs(args.random_checks, rng)
+    print(f"{mismatches} mismatches")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Offline end-to-end benchmark of the collection pipeline.
+
+Synthetic videos are served by a local fixture server that stands in for YouTube
+search, the transcript api and the audio downloads, and the "fake" ASR and language
+detection providers stand in for NeMo and Whisper. Every query runs through search,
+transcript fetching, validation, download and processing like ``main.py``, and the
+throughput of every stage, the peak RSS and the pipeline metrics are reported as
+JSON. With ``--trace`` the spans of the run are written as a Chrome trace, and
+``--profile_stage`` samples the stacks of a single stage such as "lid".
+
+Usage:
+    python -m app.tools.benchmark_pipeline [--num_queries 2] [--videos_per_query 10]
+        [--video_seconds 120] [--asr_batch_latency 0.05] [--in_memory]
+        [--output benchmark.json] [--trace trace.json] [--profile_stage lid]
+"""
+import argparse
+import json
+import resource
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict
+
+from app.audio_processor import AudioProcessor
+from app.data_retrival import DataRetrieval
+from app.data_validator import DataValidator
+from app.db.connection import configure_engine, create_db_and_tables
+from app.db.db_functions import filter_and_insert_videos
+from app.metrics import REGISTRY
+from app.tracing import TRACER
+from app.models.asr.asr import ASR
+from app.models.speech_language_detection.speech_language_detection import (
+    SpeechLanguageDetection,
+)
+from app.similarity.similarity_scorer import SimilarityScorer
+from app.tools.fixture_server import (
+    RESULTS_PER_PAGE,
+    FixtureSearch,
+    FixtureServer,
+    FixtureTranscriptApi,
+    generate_fixtures,
+)
+
+
+class StageTimer:
+    """
+    Accumulate the seconds, videos, chunks and audio seconds of every stage
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"seconds": 0.0, "videos": 0, "chunks": 0, "audio_seconds": 0.0}
+        )
+
+    def add(
+        self,
+        stage: str,
+        seconds: float,
+        videos: int = 0,
+        chunks: int = 0,
+        audio_seconds: float = 0.0,
+    ):
+        self.stages[stage]["seconds"] += seconds
+        self.stages[stage]["videos"] += videos
+        self.stages[stage]["chunks"] += chunks
+        self.stages[stage]["audio_seconds"] += audio_seconds
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for stage, totals in self.stages.items():
+            seconds = max(totals["seconds"], 1e-9)
+            report[stage] = {
+                **totals,
+                "videos_per_second": totals["videos"] / seconds,
+                "chunks_per_second": totals["chunks"] / seconds,
+                "audio_hours_per_hour": totals["audio_seconds"] / seconds,
+            }
+        return report
+
+
+def get_peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num_queries", type=int, default=2)
+    parser.add_argument("--videos_per_query", type=int, default=10)
+    parser.add_argument("--video_seconds", type=float, default=120)
+    parser.add_argument("--segment_seconds", type=float, default=5)
+    parser.add_argument("--match_rate", type=float, default=0.8)
+    parser.add_argument("--network_latency", type=float, default=0.05)
+    parser.add_argument("--asr_batch_latency", type=float, default=0.05)
+    parser.add_argument("--asr_item_latency", type=float, default=0.005)
+    parser.add_argument("--lid_batch_latency", type=float, default=0.02)
+    parser.add_argument("--lid_item_latency", type=float, default=0.002)
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--similarity_scorer", default="lcs")
+    parser.add_argument("--percent_match", type=float, default=40)
+    parser.add_argument("--transcript_workers", type=int, default=8)
+    parser.add_argument("--in_memory", action="store_true")
+    parser.add_argument("--chunk_format", default="mp3")
+    parser.add_argument("--export_engine", default="pydub")
+    parser.add_argument("--export_workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--trace", default=None)
+    parser.add_argument("--profile_stage", default=None)
+    parser.add_argument("--profile_interval", type=float, default=0.005)
+    args = parser.parse_args()
+
+    if args.trace:
+        TRACER.configure(True, args.profile_stage, args.profile_interval)
+
+    timer = StageTimer()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        start_time = time.perf_counter()
+        fixtures = generate_fixtures(
+            tmp_dir / "fixtures",
+            args.num_queries,
+            args.videos_per_query,
+            args.video_seconds,
+            args.segment_seconds,
+            args.match_rate,
+            args.seed,
+        )
+        timer.add("generate_fixtures", time.perf_counter() - start_time)
+
+        configure_engine(str(tmp_dir / "benchmark.db"))
+        create_db_and_tables()
+        server = FixtureServer(tmp_dir / "fixtures", args.network_latency).start()
+
+        data_retrieval = DataRetrieval(
+            transcript_api=FixtureTranscriptApi(server.url),
+            search_client=lambda query, searchPreferences: FixtureSearch(
+                server.url, query, searchPreferences
+            ),
+        )
+        data_validator = DataValidator()
+        audio_processor = AudioProcessor(
+            SpeechLanguageDetection.by_name("fake")(
+                batch_size=args.batch_size,
+                batch_latency=args.lid_batch_latency,
+                item_latency=args.lid_item_latency,
+            ),
+            ASR.by_name("fake")(
+                batch_size=args.batch_size,
+                batch_latency=args.asr_batch_latency,
+                item_latency=args.asr_item_latency,
+            ),
+            SimilarityScorer.by_name(args.similarity_scorer)(),
+            args.chunk_format,
+            args.export_engine,
+            args.export_workers,
+        )
+
+        total_start_time = time.perf_counter()
+        for query in fixtures["queries"]:
+            audio_query_folder = tmp_dir / "output" / query.replace("+", "_")
+
+            start_time = time.perf_counter()
+            videos_metadata = data_retrieval.get_video_metadata_with_query(
+                query, max_pages=-(-args.videos_per_query // RESULTS_PER_PAGE)
+            )
+            timer.add("search", time.perf_counter() - start_time, len(videos_metadata))
+
+            start_time = time.perf_counter()
+            videos_metadata = filter_and_insert_videos(videos_metadata)
+            timer.add("filter", time.perf_counter() - start_time, len(videos_metadata))
+
+            start_time = time.perf_counter()
+            video_transcription_data = data_retrieval.get_video_transcripts(
+                videos_metadata, args.transcript_workers
+            )
+            timer.add(
+                "transcripts",
+                time.perf_counter() - start_time,
+                len(video_transcription_data),
+            )
+
+            start_time = time.perf_counter()
+            valid_transcriptions = data_validator.validate_transcriptions(
+                video_transcription_data
+            )
+            timer.add(
+                "validate", time.perf_counter() - start_time, len(valid_transcriptions)
+            )
+
+            metadata_by_url = {metadata.url: metadata for metadata in videos_metadata}
+            for video_url, transcription_data in valid_transcriptions.items():
+                video_metadata = metadata_by_url.get(video_url)
+                audio_seconds = video_metadata.duration if video_metadata else 0
+
+                start_time = time.perf_counter()
+                audio_path = audio_processor.download_audio(
+                    video_url, audio_query_folder, "mp3"
+                )
+                timer.add(
+                    "download",
+                    time.perf_counter() - start_time,
+                    1,
+                    audio_seconds=audio_seconds,
+                )
+                if not audio_path or not audio_path.exists():
+                    continue
+
+                num_chunks = sum(
+                    len(transcriptions or [])
+                    for transcriptions in transcription_data.values()
+                )
+                start_time = time.perf_counter()
+                audio_processor.process_video(
+                    audio_path,
+                    transcription_data,
+                    video_metadata,
+                    args.percent_match,
+                    args.in_memory,
+                )
+                timer.add(
+                    "process",
+                    time.perf_counter() - start_time,
+                    1,
+                    num_chunks,
+                    audio_seconds,
+                )
+
+        total_seconds = time.perf_counter() - total_start_time
+        server.stop()
+
+    stages = timer.report()
+    processed = timer.stages["process"]
+    report = {
+        "config": vars(args),
+        "total_seconds": total_seconds,
+        "videos_per_second": processed["videos"] / total_seconds,
+        "chunks_per_second": processed["chunks"] / total_seconds,
+        "audio_hours_per_hour": processed["audio_seconds"] / total_seconds,
+        "stages": stages,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "metrics": REGISTRY.summary()["metrics"],
+    }
+
+    if args.trace:
+        TRACER.write(args.trace)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
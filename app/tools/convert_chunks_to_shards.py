@@ -0,0 +1,91 @@
+"""
+Migrate the chunk folders written by the "files" storage into PCM shards.
+
+Every ``{video_id}/{manual|auto}/transcript.json`` folder under ``--root_dir`` is
+decoded to 16 kHz mono PCM and appended to the shards in ``--shard_dir``. A
+``shards.json`` with the location of each chunk is written next to the transcript,
+it also marks the folder as converted so an interrupted migration can be restarted.
+
+Usage:
+    python -m app.tools.convert_chunks_to_shards --root_dir DATA_DIR --shard_dir SHARD_DIR
+        [--shard_size_mb 1024] [--workers 8] [--delete_chunks]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+from pydub import AudioSegment
+
+from app.storage.pcm_shards import SAMPLE_RATE, PCMShardWriter
+from app.utils.common_utils import load_json, save_json
+
+
+def decode_folder(folder: Path) -> Tuple[Dict[str, np.ndarray], Dict[str, str]]:
+    """
+    Decode the chunks of a folder to 16 kHz mono 16 bit PCM, chunks whose file is
+    missing are left out
+    """
+    transcript = load_json(folder / "transcript.json")
+    audio_signals = {}
+
+    for chunk_name in transcript:
+        chunk_path = folder / chunk_name
+        if not chunk_path.exists():
+            continue
+
+        audio = (
+            AudioSegment.from_file(chunk_path)
+            .set_channels(1)
+            .set_frame_rate(SAMPLE_RATE)
+            .set_sample_width(2)
+        )
+        audio_signals[chunk_name] = np.frombuffer(audio.raw_data, dtype=np.int16)
+
+    return audio_signals, transcript
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root_dir", required=True)
+    parser.add_argument("--shard_dir", required=True)
+    parser.add_argument("--shard_size_mb", type=float, default=1024)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--delete_chunks", action="store_true")
+    args = parser.parse_args()
+
+    folders = [
+        transcript_path.parent
+        for transcript_path in Path(args.root_dir).rglob("transcript.json")
+        if not (transcript_path.parent / "shards.json").exists()
+    ]
+    print(f"Converting {len(folders)} folders")
+
+    writer = PCMShardWriter(args.shard_dir, args.shard_size_mb)
+    total_chunks = 0
+
+    # decode a bounded batch of folders at a time so the decoded audio stays small
+    batch_size = args.workers * 4
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for start in range(0, len(folders), batch_size):
+            batch = folders[start : start + batch_size]
+            for folder, (audio_signals, transcript) in zip(
+                batch, executor.map(decode_folder, batch)
+            ):
+                locations = writer.write_chunks(
+                    folder.parent.name, folder.name, audio_signals, transcript
+                )
+                save_json(locations, folder / "shards.json", ensure_ascii=False)
+                total_chunks += len(locations)
+
+                if args.delete_chunks:
+                    for chunk_name in audio_signals:
+                        (folder / chunk_name).unlink()
+
+    writer.close()
+    print(f"Converted {total_chunks} chunks of {len(folders)} folders")
+
+
+if __name__ == "__main__":
+    main()
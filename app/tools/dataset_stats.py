@@ -0,0 +1,216 @@
+"""
+Report the hours of the accepted chunks in the output tree by transcription type,
+channel, published year and percent match band.
+
+The query folders under ``--root_dir`` are scanned with ``os.scandir`` on a process
+pool. For every video the manual ``text_similarity.json`` is used when it exists,
+otherwise the auto generated one. The result of every video is cached in
+``{query folder}/.dataset_stats_cache.json`` together with the mtime of its files,
+so a repeated run only parses the files that changed.
+
+The channel and year of the videos are read from the ``video_metadata`` table.
+
+Usage:
+    python -m app.tools.dataset_stats --root_dir DATA_DIR [--db_path youtube.db]
+        [--bands 0 30 50 70 100] [--low 30] [--high 100] [--workers 8] [--output stats.json]
+"""
+import argparse
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.db.connection import configure_engine, create_db_and_tables
+from app.db.db_functions import get_videos_metadata
+from app.utils.audio_utils import get_chunk_duration
+from app.utils.common_utils import load_json, save_json
+
+CACHE_FILE_NAME = ".dataset_stats_cache.json"
+# version 1 cached integer percent matches, which truncated 29.9 to 29
+CACHE_VERSION = 2
+SIMILARITY_FILE_NAME = "text_similarity.json"
+TRANSCRIPTION_TYPES = ("manual", "auto")
+
+
+def scan_video(video_dir: str, cached: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Get the seconds of the accepted chunks of a video per percent match, the manual
+    transcription is preferred over the auto generated one. The percent matches are
+    kept as floats, so they compare with ``--low``, ``--high`` and the bands like
+    ``get_total_duration_from_transcription_file`` compares them.
+
+    Parameters
+    ----------
+    video_dir: ``str``
+        The folder of the video
+    cached: ``Optional[Dict[str, Any]]``
+        The cached result of the video, reused when the mtimes of its files match
+
+    Returns
+    -------
+    ``Optional[Dict[str, Any]]``
+        The mtimes, the used transcription type and the seconds per percent match
+        written as a string, None if the video has no accepted chunk
+    """
+    mtimes = {}
+    for transcription_type in TRANSCRIPTION_TYPES:
+        try:
+            mtimes[transcription_type] = os.stat(
+                os.path.join(video_dir, transcription_type, SIMILARITY_FILE_NAME)
+            ).st_mtime_ns
+        except FileNotFoundError:
+            continue
+
+    if not mtimes:
+        return None
+    if cached and cached["mtimes"] == mtimes:
+        return cached
+
+    transcription_type = "manual" if "manual" in mtimes else "auto"
+    similarity = load_json(
+        os.path.join(video_dir, transcription_type, SIMILARITY_FILE_NAME)
+    )
+    seconds = defaultdict(float)
+    for chunk_name, values in similarity.items():
+        percent_match = min(100.0, max(0.0, float(values.get("percent_match", 0))))
+        seconds[repr(percent_match)] += get_chunk_duration(chunk_name)
+
+    return {
+        "mtimes": mtimes,
+        "transcription_type": transcription_type,
+        "seconds": dict(seconds),
+    }
+
+
+def scan_query_folder(query_folder: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Scan the video folders of a query folder and update its cache
+
+    Parameters
+    ----------
+    query_folder: ``str``
+        The folder of a search query or channel
+
+    Returns
+    -------
+    ``Dict[str, Dict[str, Any]]``
+        A dictionary of video id and its result from ``scan_video``
+    """
+    cache_path = Path(query_folder) / CACHE_FILE_NAME
+    try:
+        cache = load_json(cache_path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+    cache = cache.get("videos", {}) if cache.get("version") == CACHE_VERSION else {}
+
+    videos = {}
+    with os.scandir(query_folder) as entries:
+        for entry in entries:
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+
+            result = scan_video(entry.path, cache.get(entry.name))
+            if result is not None:
+                videos[entry.name] = result
+
+    if videos != cache:
+        save_json({"version": CACHE_VERSION, "videos": videos}, cache_path)
+
+    return videos
+
+
+def get_band(percent_match: float, bands: List[float]) -> Optional[str]:
+    for low, high in zip(bands, bands[1:]):
+        if low <= percent_match < high or (high == bands[-1] and percent_match == high):
+            return f"{low:g}-{high:g}"
+
+    return None
+
+
+def print_table(title: str, hours: Dict[str, float]):
+    print(f"\n{title}")
+    for key, value in sorted(hours.items(), key=lambda item: -item[1]):
+        print(f"  {key:<40} {value:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root_dir", required=True)
+    parser.add_argument("--db_path", default="youtube.db")
+    parser.add_argument("--bands", nargs="+", type=float, default=[0, 30, 50, 70, 100])
+    parser.add_argument("--low", type=float, default=30)
+    parser.add_argument("--high", type=float, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with os.scandir(args.root_dir) as entries:
+        query_folders = [
+            entry.path
+            for entry in entries
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+
+    videos = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for query_videos in executor.map(scan_query_folder, query_folders, chunksize=4):
+            videos.update(query_videos)
+
+    configure_engine(args.db_path)
+    create_db_and_tables()
+    videos_metadata = get_videos_metadata(list(videos))
+
+    hours_by_type = defaultdict(float)
+    hours_by_channel = defaultdict(float)
+    hours_by_year = defaultdict(float)
+    hours_by_band = defaultdict(float)
+    total_hours = 0.0
+
+    for video_id, result in videos.items():
+        video_metadata = videos_metadata.get(video_id)
+        channel_name = video_metadata.channel_name if video_metadata else "unknown"
+        published_year = video_metadata.published_year if video_metadata else "unknown"
+
+        for percent_match, seconds in result["seconds"].items():
+            percent_match = float(percent_match)
+            hours = seconds / 3600
+            band = get_band(percent_match, args.bands)
+            if band is not None:
+                hours_by_band[band] += hours
+
+            if not args.low <= percent_match <= args.high:
+                continue
+
+            total_hours += hours
+            hours_by_type[result["transcription_type"]] += hours
+            hours_by_channel[channel_name] += hours
+            hours_by_year[published_year] += hours
+
+    print(
+        f"{len(videos)} videos, {total_hours:.2f} hours with a percent match "
+        f"between {args.low:g} and {args.high:g}"
+    )
+    print_table("hours by transcription type", hours_by_type)
+    print_table("hours by percent match band", hours_by_band)
+    print_table("hours by year", hours_by_year)
+    print_table("hours by channel", hours_by_channel)
+
+    if args.output:
+        save_json(
+            {
+                "videos": len(videos),
+                "total_hours": total_hours,
+                "hours_by_type": hours_by_type,
+                "hours_by_band": hours_by_band,
+                "hours_by_year": hours_by_year,
+                "hours_by_channel": hours_by_channel,
+            },
+            args.output,
+            ensure_ascii=False,
+        )
+
+
+if __name__ == "__main__":
+    main()
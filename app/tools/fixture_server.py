@@ -0,0 +1,300 @@
+"""
+Synthetic fixtures and a local HTTP server that stands in for YouTube search,
+the transcript api and the audio downloads, used by ``benchmark_pipeline``.
+
+The server answers:
+    /search?q=QUERY&page=N    a page of search results in the youtubesearchpython format
+    /transcripts?v=VIDEO_ID   the manual and auto generated transcripts of a video
+    /watch?v=VIDEO_ID         the audio of a video as a wav file
+"""
+import io
+import json
+import random
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import parse_qs, quote_plus, urlparse
+from urllib.request import urlopen
+
+import numpy as np
+from youtube_transcript_api import NoTranscriptFound
+
+from app.db.seen_video_index import ID_ALPHABET, ID_LENGTH
+from app.models.asr.fake_asr import DEFAULT_TEXT
+
+SAMPLE_RATE = 16000
+RESULTS_PER_PAGE = 20
+OTHER_TEXTS = [
+    "कल मौसम बहुत अच्छा रहेगा और बारिश की संभावना कम है",
+    "इस खेल में दोनों टीमों ने शानदार प्रदर्शन किया",
+    "सरकार ने नई शिक्षा नीति की घोषणा की है",
+]
+
+
+def make_video_id(rng: random.Random) -> str:
+    # the last character of a YouTube id only uses its upper 4 bits
+    return "".join(rng.choice(ID_ALPHABET) for _ in range(ID_LENGTH - 1)) + rng.choice(
+        ID_ALPHABET[::4]
+    )
+
+
+def make_transcript(
+    rng: random.Random, video_seconds: float, segment_seconds: float, match_rate: float
+) -> List[Dict[str, Any]]:
+    """
+    Make the segments of a transcript, ``match_rate`` of them have the text that the
+    fake ASR returns and pass the similarity threshold
+    """
+    segments = []
+    start = 0.0
+
+    while start + segment_seconds <= video_seconds:
+        text = DEFAULT_TEXT if rng.random() < match_rate else rng.choice(OTHER_TEXTS)
+        segments.append(
+            {"text": text, "start": round(start, 2), "duration": segment_seconds}
+        )
+        start += segment_seconds
+
+    return segments
+
+
+def make_wav(rng: random.Random, video_seconds: float) -> bytes:
+    """
+    Make a 16 kHz mono wav of a few tones with some noise
+    """
+    np_rng = np.random.default_rng(rng.randrange(2**32))
+    times = np.arange(int(video_seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    frequencies = np_rng.uniform(100, 1000, size=3)
+    signal = sum(np.sin(2 * np.pi * frequency * times) for frequency in frequencies)
+    signal = signal / 4 + np_rng.normal(0, 0.05, size=len(times))
+    samples = np.clip(signal * 32767, -32768, 32767).astype(np.int16)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(samples.tobytes())
+
+    return buffer.getvalue()
+
+
+def generate_fixtures(
+    fixture_dir: Union[str, Path],
+    num_queries: int = 2,
+    videos_per_query: int = 10,
+    video_seconds: float = 120,
+    segment_seconds: float = 5,
+    match_rate: float = 0.8,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Generate the search results, transcripts and audio of the fixture videos
+
+    Parameters
+    ----------
+    fixture_dir: ``Union[str, Path]``
+        The folder to write ``fixtures.json`` and the wav files to
+    num_queries: ``int``, ( default = 2 )
+        The number of search queries
+    videos_per_query: ``int``, ( default = 10 )
+        The number of videos found for each query
+    video_seconds: ``float``, ( default = 120 )
+        The duration of every video
+    segment_seconds: ``float``, ( default = 5 )
+        The duration of every transcript segment
+    match_rate: ``float``, ( default = 0.8 )
+        The fraction of the segments whose text matches the fake ASR
+    seed: ``int``, ( default = 0 )
+        The seed of the random generator
+
+    Returns
+    -------
+    ``Dict[str, Any]``
+        The queries with their video ids and the videos with their metadata and
+        transcripts
+    """
+    rng = random.Random(seed)
+    fixture_dir = Path(fixture_dir)
+    (fixture_dir / "audio").mkdir(parents=True, exist_ok=True)
+    fixtures = {"queries": {}, "videos": {}}
+    minutes, seconds = divmod(int(video_seconds), 60)
+
+    for query_index in range(num_queries):
+        query = f"benchmark query {query_index}"
+        video_ids = [make_video_id(rng) for _ in range(videos_per_query)]
+        fixtures["queries"][query.replace(" ", "+")] = video_ids
+
+        for video_id in video_ids:
+            fixtures["videos"][video_id] = {
+                "title": f"video {video_id}",
+                "duration": f"{minutes}:{seconds:02d}",
+                "publishedTime": f"{rng.randint(1, 10)} years ago",
+                "channel": f"channel {rng.randint(0, 4)}",
+                "manual": make_transcript(
+                    rng, video_seconds, segment_seconds, match_rate
+                ),
+                "auto": make_transcript(
+                    rng, video_seconds, segment_seconds, match_rate
+                ),
+            }
+            with open(fixture_dir / "audio" / f"{video_id}.wav", "wb") as f:
+                f.write(make_wav(rng, video_seconds))
+
+    with open(fixture_dir / "fixtures.json", "w") as f:
+        json.dump(fixtures, f, ensure_ascii=False)
+
+    return fixtures
+
+
+class FixtureServer:
+    """
+    Serve the fixtures over HTTP on a free local port in a background thread
+
+    Attributes
+    ----------
+    fixture_dir: ``Union[str, Path]``
+        The folder with ``fixtures.json`` and the wav files
+    latency: ``float``, ( default = 0.0 )
+        The seconds every request waits before it is answered, like a network round trip
+    """
+
+    def __init__(self, fixture_dir: Union[str, Path], latency: float = 0.0) -> None:
+        self.fixture_dir = Path(fixture_dir)
+        with open(self.fixture_dir / "fixtures.json", "r") as f:
+            self.fixtures = json.load(f)
+        self.latency = latency
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def search_results(self, query: str, page: int) -> List[Dict[str, Any]]:
+        video_ids = self.fixtures["queries"].get(query, [])
+        page_ids = video_ids[page * RESULTS_PER_PAGE : (page + 1) * RESULTS_PER_PAGE]
+
+        return [
+            {
+                "id": video_id,
+                "link": f"{self.url}/watch?v={video_id}",
+                "title": self.fixtures["videos"][video_id]["title"],
+                "duration": self.fixtures["videos"][video_id]["duration"],
+                "publishedTime": self.fixtures["videos"][video_id]["publishedTime"],
+                "channel": {"name": self.fixtures["videos"][video_id]["channel"]},
+            }
+            for video_id in page_ids
+        ]
+
+    def _make_handler(self):
+        fixture_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, body: bytes, content_type: str, status: int = 200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_GET(self):
+                time.sleep(fixture_server.latency)
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                videos = fixture_server.fixtures["videos"]
+
+                if url.path == "/search":
+                    results = fixture_server.search_results(
+                        params.get("q", ""), int(params.get("page", 0))
+                    )
+                    self.send(json.dumps({"result": results}).encode(), "application/json")
+                elif url.path == "/transcripts" and params.get("v") in videos:
+                    video = videos[params["v"]]
+                    body = {"manual": video["manual"], "auto": video["auto"]}
+                    self.send(
+                        json.dumps(body, ensure_ascii=False).encode(), "application/json"
+                    )
+                elif url.path == "/watch" and params.get("v") in videos:
+                    audio_path = fixture_server.fixture_dir / "audio" / f"{params['v']}.wav"
+                    self.send(audio_path.read_bytes(), "audio/wav")
+                else:
+                    self.send(b"not found", "text/plain", 404)
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FixtureSearch:
+    """
+    Stand-in for ``CustomSearch`` that pages through the results of the fixture server
+    """
+
+    def __init__(self, server_url: str, query: str, searchPreferences: str = "") -> None:
+        self.server_url = server_url
+        self.query = query
+        self.page = 0
+
+    def result(self) -> Dict[str, Any]:
+        with urlopen(
+            f"{self.server_url}/search?q={quote_plus(self.query)}&page={self.page}"
+        ) as response:
+            return json.load(response)
+
+    def next(self):
+        self.page += 1
+
+
+class FixtureTranscript:
+    def __init__(self, segments: List[Dict[str, Any]]) -> None:
+        self.segments = segments
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        return self.segments
+
+
+class FixtureTranscriptList:
+    def __init__(
+        self, video_id: str, transcripts: Dict[str, Optional[List[Dict[str, Any]]]]
+    ) -> None:
+        self.video_id = video_id
+        self.transcripts = transcripts
+
+    def _find(self, transcription_type: str, language_codes: List[str]) -> FixtureTranscript:
+        if not self.transcripts.get(transcription_type):
+            raise NoTranscriptFound(self.video_id, language_codes, None)
+        return FixtureTranscript(self.transcripts[transcription_type])
+
+    def find_manually_created_transcript(self, language_codes: List[str]):
+        return self._find("manual", language_codes)
+
+    def find_generated_transcript(self, language_codes: List[str]):
+        return self._find("auto", language_codes)
+
+
+class FixtureTranscriptApi:
+    """
+    Stand-in for ``YouTubeTranscriptApi`` that fetches the transcripts from the fixture
+    server
+    """
+
+    def __init__(self, server_url: str) -> None:
+        self.server_url = server_url
+
+    def list_transcripts(self, video_id: str) -> FixtureTranscriptList:
+        with urlopen(f"{self.server_url}/transcripts?v={video_id}") as response:
+            return FixtureTranscriptList(video_id, json.load(response))
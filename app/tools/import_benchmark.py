@@ -0,0 +1,129 @@
+"""
+Measure the import time of the collector modules and check that the lightweight
+ones stay free of the model stacks.
+
+Every module is imported in a fresh interpreter with ``-X importtime``. The wall
+time of the import, the slowest imported packages and any forbidden module pulled
+in are reported, and the exit code is 1 if a module imported a forbidden one.
+
+Usage:
+    python -m app.tools.import_benchmark [--modules app.data_retrival app.audio_processor]
+        [--forbidden torch nemo whisper] [--repeat 3] [--top 10] [--output imports.json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+DEFAULT_MODULES = [
+    "app.data_retrival",
+    "app.data_validator",
+    "app.audio_processor",
+    "app.models.asr",
+    "app.models.speech_language_detection",
+]
+DEFAULT_FORBIDDEN = ["torch", "nemo", "whisper"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start_time = time.perf_counter()
+import {module}
+elapsed_time = time.perf_counter() - start_time
+print(json.dumps({{"seconds": elapsed_time, "modules": sorted(sys.modules)}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """
+    Get the cumulative import seconds of every top level package from the
+    ``-X importtime`` output
+    """
+    seconds = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        package = name.strip().split(".")[0]
+        seconds[package] = max(seconds.get(package, 0.0), int(cumulative) / 1e6)
+
+    return seconds
+
+
+def benchmark_import(
+    module: str, forbidden: List[str], repeat: int = 3, top: int = 10
+) -> Dict[str, Any]:
+    """
+    Import a module in fresh interpreters and report its import time
+
+    Parameters
+    ----------
+    module: ``str``
+        The module to import
+    forbidden: ``List[str]``
+        The top level packages the module must not import
+    repeat: ``int``, ( default = 3 )
+        The number of fresh imports, the fastest one is reported
+    top: ``int``, ( default = 10 )
+        The number of slowest packages to report
+
+    Returns
+    -------
+    ``Dict[str, Any]``
+        The import seconds, the slowest packages and the forbidden packages imported
+    """
+    runs = []
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(module=module)],
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            return {"error": process.stderr.strip().splitlines()[-1]}
+        runs.append((json.loads(process.stdout.strip().splitlines()[-1]), process.stderr))
+
+    result, stderr = min(runs, key=lambda run: run[0]["seconds"])
+    packages = parse_importtime(stderr)
+    imported = {name.split(".")[0] for name in result["modules"]}
+
+    return {
+        "seconds": result["seconds"],
+        "slowest_packages": dict(
+            sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ),
+        "forbidden_imported": sorted(imported & set(forbidden)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--forbidden", nargs="+", default=DEFAULT_FORBIDDEN)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    report = {
+        module: benchmark_import(module, args.forbidden, args.repeat, args.top)
+        for module in args.modules
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [
+        module
+        for module, result in report.items()
+        if "error" in result or result["forbidden_imported"]
+    ]
+    if failed:
+        print(f"forbidden imports or import errors in: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Invalidate entries of the video cache so they are checked again on the next crawl.
+
+Usage:
+    python -m app.tools.invalidate_video_cache --all
+    python -m app.tools.invalidate_video_cache --video_ids VIDEO_ID [VIDEO_ID ...]
+    python -m app.tools.invalidate_video_cache --older_than_days 7
+"""
+import argparse
+
+from app.db.connection import create_db_and_tables
+from app.db.db_functions import invalidate_video_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video_ids", nargs="+", default=None)
+    parser.add_argument("--older_than_days", type=float, default=None)
+    parser.add_argument("--all", action="store_true")
+    args = parser.parse_args()
+
+    if not args.all and args.video_ids is None and args.older_than_days is None:
+        parser.error("pass --all, --video_ids or --older_than_days")
+
+    older_than = (
+        args.older_than_days * 24 * 60 * 60 if args.older_than_days is not None else None
+    )
+    create_db_and_tables()
+    deleted = invalidate_video_cache(args.video_ids, older_than)
+    print(f"Deleted {deleted} entries from the video cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Inspect the shared job queue, list the dead lettered jobs with their last error and
+requeue them once the cause is fixed.
+
+Usage:
+    python -m app.tools.job_queue status [--queue full] [--db_path youtube.db | --db_url URL]
+    python -m app.tools.job_queue dead [--queue full] [--limit 100]
+    python -m app.tools.job_queue requeue [--queue full] [--kind video]
+"""
+import argparse
+import json
+
+from app.db.connection import configure_engine, create_db_and_tables
+from app.db.db_functions import get_dead_jobs, get_job_counts, requeue_dead_jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["status", "dead", "requeue"])
+    parser.add_argument("--queue", default=None)
+    parser.add_argument("--kind", default=None)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--db_path", default="youtube.db")
+    parser.add_argument("--db_url", default=None)
+    args = parser.parse_args()
+
+    configure_engine(args.db_path, db_url=args.db_url)
+    create_db_and_tables()
+
+    if args.command == "status":
+        print(json.dumps(get_job_counts(args.queue), indent=2))
+    elif args.command == "dead":
+        for job in get_dead_jobs(args.queue, args.limit):
+            print(f"{job.job_id}\tattempts={job.attempts}\t{job.last_error}")
+    else:
+        print(f"Requeued {requeue_dead_jobs(args.queue, args.kind)} dead jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Run the ASR and language detection models in a long-running local server, so the
+weights are loaded once and shared by every collector on the machine.
+
+The providers are built from the same config files as ``main.py``. The collectors
+use them through the "remote" providers, for example with
+``python main.py asr_provider=remote speech_language_detection=remote``.
+
+Usage:
+    python -m app.tools.model_server
+        [--asr_config app/configs/asr_provider/nemo.yaml]
+        [--lid_config app/configs/speech_language_detection/whisper.yaml]
+        [--host 127.0.0.1] [--port 8765] [--max_batch_size 128] [--max_wait_ms 10]
+        [--no_asr] [--no_lid] [--no_warmup]
+"""
+import argparse
+import logging
+import sys
+
+from omegaconf import OmegaConf
+
+from app.models.asr.asr import ASR
+from app.models.speech_language_detection.speech_language_detection import (
+    SpeechLanguageDetection,
+)
+from app.serving.model_server import ModelServer
+
+logging.basicConfig(
+    stream=sys.stdout,
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s:%(message)s",
+)
+
+
+def build_provider(registrable, config_path: str):
+    config = OmegaConf.to_container(OmegaConf.load(config_path), resolve=True)
+    provider = config.pop("provider")
+    if provider == "remote":
+        raise ValueError(f"{config_path} configures the remote client, not a model")
+
+    return registrable.by_name(provider)(**config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--asr_config", default="app/configs/asr_provider/nemo.yaml")
+    parser.add_argument(
+        "--lid_config", default="app/configs/speech_language_detection/whisper.yaml"
+    )
+    parser.add_argument("--no_asr", action="store_true")
+    parser.add_argument("--no_lid", action="store_true")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max_batch_size", type=int, default=128)
+    parser.add_argument("--max_wait_ms", type=float, default=10)
+    parser.add_argument("--no_warmup", action="store_true")
+    args = parser.parse_args()
+
+    asr = None if args.no_asr else build_provider(ASR, args.asr_config)
+    speech_language_detector = (
+        None
+        if args.no_lid
+        else build_provider(SpeechLanguageDetection, args.lid_config)
+    )
+
+    server = ModelServer(
+        asr,
+        speech_language_detector,
+        args.host,
+        args.port,
+        args.max_batch_size,
+        args.max_wait_ms,
+    )
+    if not args.no_warmup:
+        server.warmup()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
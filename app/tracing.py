@@ -0,0 +1,229 @@
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+import json
+import os
+import sys
+import threading
+import time
+
+
+class Tracer:
+    """
+    Record the spans of a run as Chrome Trace Event complete events, the written file
+    can be opened in ``chrome://tracing`` or https://ui.perfetto.dev. Nothing is
+    recorded until the tracer is enabled, a disabled span only costs a function call.
+
+    With a profiled stage the threads inside a span of that name are sampled on a
+    background thread, and the stacks are written in the collapsed format next to the
+    trace so that only that stage shows up in the flame graph.
+
+    Attributes
+    ----------
+    enabled: ``bool``, ( default = False )
+        Flag to record the spans
+    profile_stage: ``Optional[str]``, ( default = None )
+        The name of the span to sample the stacks of, nothing is sampled if None
+    sample_interval: ``float``, ( default = 0.005 )
+        The seconds between two stack samples
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        profile_stage: Optional[str] = None,
+        sample_interval: float = 0.005,
+    ) -> None:
+        self.events: List[Dict[str, Any]] = []
+        self.thread_names: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.start_time = time.perf_counter()
+        self.profiled_threads: Dict[int, int] = {}
+        self.stack_counts: Counter = Counter()
+        self.sampler: Optional[threading.Thread] = None
+        self.stop_sampling = threading.Event()
+        self.configure(enabled, profile_stage, sample_interval)
+
+    def configure(
+        self,
+        enabled: bool = True,
+        profile_stage: Optional[str] = None,
+        sample_interval: float = 0.005,
+    ):
+        """
+        Enable or disable the tracer and start the sampler of the profiled stage
+        """
+        self.enabled = enabled
+        self.profile_stage = profile_stage if enabled else None
+        self.sample_interval = sample_interval
+
+        if self.profile_stage and self.sampler is None:
+            self.stop_sampling.clear()
+            self.sampler = threading.Thread(
+                target=self._sample, name="trace-sampler", daemon=True
+            )
+            self.sampler.start()
+
+    def _timestamp(self) -> float:
+        return (time.perf_counter() - self.start_time) * 1e6
+
+    def _add_event(self, event: Dict[str, Any]):
+        tid = threading.get_ident()
+        event.update(pid=self.pid, tid=tid)
+        with self.lock:
+            if tid not in self.thread_names:
+                self.thread_names[tid] = threading.current_thread().name
+            self.events.append(event)
+
+    def _enter_profiled(self):
+        with self.lock:
+            tid = threading.get_ident()
+            self.profiled_threads[tid] = self.profiled_threads.get(tid, 0) + 1
+
+    def _exit_profiled(self):
+        with self.lock:
+            tid = threading.get_ident()
+            self.profiled_threads[tid] -= 1
+            if not self.profiled_threads[tid]:
+                del self.profiled_threads[tid]
+
+    def _sample(self):
+        while not self.stop_sampling.wait(self.sample_interval):
+            with self.lock:
+                thread_ids = list(self.profiled_threads)
+            if not thread_ids:
+                continue
+
+            frames = sys._current_frames()
+            for tid in thread_ids:
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                if stack:
+                    with self.lock:
+                        self.stack_counts[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def span(self, name: str, category: str = "pipeline", **args: Any) -> Iterator[None]:
+        """
+        Record the time spent in the block as a span
+
+        Parameters
+        ----------
+        name: ``str``
+            The name of the span, such as the stage
+        category: ``str``, ( default = "pipeline" )
+            The category of the span, used to filter the spans in the viewer
+        args: ``Any``
+            Extra values shown with the span, such as the video id
+        """
+        if not self.enabled:
+            yield
+            return
+
+        profiled = name == self.profile_stage
+        if profiled:
+            self._enter_profiled()
+        start = self._timestamp()
+        try:
+            yield
+        finally:
+            self._add_event(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start,
+                    "dur": self._timestamp() - start,
+                    "args": args,
+                }
+            )
+            if profiled:
+                self._exit_profiled()
+
+    def begin(self, name: str, category: str = "pipeline", **args: Any):
+        """
+        Open a span that is closed by ``end`` on the same thread, for spans whose start
+        and end are reported by callbacks
+        """
+        if self.enabled:
+            if name == self.profile_stage:
+                self._enter_profiled()
+            self._add_event(
+                {"name": name, "cat": category, "ph": "B", "ts": self._timestamp(), "args": args}
+            )
+
+    def end(self, name: str, category: str = "pipeline"):
+        if self.enabled:
+            self._add_event(
+                {"name": name, "cat": category, "ph": "E", "ts": self._timestamp()}
+            )
+            if name == self.profile_stage:
+                self._exit_profiled()
+
+    def traced(self, name: str, category: str = "model") -> Callable:
+        """
+        Decorate a function to record every call as a span
+        """
+
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, category):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def write(self, trace_path: Union[str, Path]):
+        """
+        Write the recorded spans as a Chrome Trace Event json file. With a profiled
+        stage the sampled stacks are written to ``{trace_path}.folded`` in the
+        collapsed format that flamegraph.pl and speedscope read.
+
+        Parameters
+        ----------
+        trace_path: ``Union[str, Path]``
+            The path of the trace file
+        """
+        if self.sampler is not None:
+            self.stop_sampling.set()
+            self.sampler.join()
+            self.sampler = None
+
+        trace_path = Path(trace_path)
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            events = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+                for tid, thread_name in self.thread_names.items()
+            ] + list(self.events)
+            stack_counts = dict(self.stack_counts)
+
+        temp_path = trace_path.with_name(f".{trace_path.name}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(temp_path, trace_path)
+
+        if stack_counts:
+            with open(f"{trace_path}.folded", "w") as f:
+                for stack, count in sorted(stack_counts.items()):
+                    f.write(f"{stack} {count}\n")
+
+
+TRACER = Tracer()
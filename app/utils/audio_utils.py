@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple, Union
+import subprocess
+
+CODECS = {"mp3": "libmp3lame", "flac": "flac", "wav": "pcm_s16le"}
+
+
+def get_chunk_duration(chunk_name: str) -> float:
+    """
+    Get the duration of a chunk from its ``{start}_{end}.{format}`` file name
+    """
+    start_time, end_time = chunk_name.rsplit(".", 1)[0].split("_")
+    return float(end_time) - float(start_time)
+
+
+def export_chunks_with_ffmpeg(
+    audio_path: Union[str, Path],
+    chunks: List[Tuple[float, float, Union[str, Path]]],
+    format: str = "mp3",
+):
+    """
+    Export the chunks of an audio file in a single ffmpeg process. The input is decoded
+    once and every chunk is a separate mono output trimmed with ``-ss`` and ``-t``.
+
+    Parameters
+    ----------
+    audio_path: ``Union[str, Path]``
+        Path to the audio file to split into chunks
+    chunks: ``List[Tuple[float, float, Union[str, Path]]]``
+        A list of start time, end time in seconds and the output path of each chunk
+    format: ``str``, ( default = "mp3" )
+        The format of the chunks, one of "mp3", "flac" and "wav"
+    """
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-i", str(audio_path)]
+
+    for start_time, end_time, chunk_path in chunks:
+        command += [
+            "-map", "0:a:0",
+            "-ss", str(start_time),
+            "-t", str(end_time - start_time),
+            "-ac", "1",
+            "-c:a", CODECS[format],
+            "-f", format,
+            str(chunk_path),
+        ]  # fmt: skip
+
+    subprocess.run(command, check=True, stdin=subprocess.DEVNULL)
+
+
+def export_chunks_parallel(
+    audio_path: Union[str, Path],
+    chunks: List[Tuple[float, float, Union[str, Path]]],
+    format: str = "mp3",
+    workers: int = 4,
+    chunks_per_process: int = 64,
+):
+    """
+    Export the chunks of an audio file with ``chunks_per_process`` chunks per ffmpeg
+    process and ``workers`` ffmpeg processes running at the same time
+
+    Parameters
+    ----------
+    audio_path: ``Union[str, Path]``
+        Path to the audio file to split into chunks
+    chunks: ``List[Tuple[float, float, Union[str, Path]]]``
+        A list of start time, end time in seconds and the output path of each chunk
+    format: ``str``, ( default = "mp3" )
+        The format of the chunks, one of "mp3", "flac" and "wav"
+    workers: ``int``, ( default = 4 )
+        The number of ffmpeg processes running at the same time
+    chunks_per_process: ``int``, ( default = 64 )
+        The number of chunks exported by one ffmpeg process
+    """
+    batches = [
+        chunks[start : start + chunks_per_process]
+        for start in range(0, len(chunks), chunks_per_process)
+    ]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(export_chunks_with_ffmpeg, audio_path, batch, format)
+            for batch in batches
+        ]
+        for future in futures:
+            future.result()
@@ -9,7 +9,8 @@ import shutil
 
 def save_json(data: Any, save_path: Union[str, Path], ensure_ascii: bool = True):
     """
-    Save the data as a json file to the given path
+    Save the data as a json file to the given path. The data is written to a temporary
+    file that replaces the target, so an interrupted run never leaves a partial file.
 
     Parameters
     ----------
@@ -23,8 +24,10 @@ def save_json(data: Any, save_path: Union[str, Path], ensure_ascii: bool = True)
     save_path = Path(save_path)
     create_dir(save_path.parent, parents=True)
 
-    with open(save_path, "w") as f:
+    temp_path = save_path.with_name(f"{save_path.name}.tmp")
+    with open(temp_path, "w") as f:
         json.dump(data, f, ensure_ascii=ensure_ascii)
+    os.replace(temp_path, save_path)
 
 
 def load_json(file_path: Union[str, Path]):
@@ -120,13 +120,26 @@ def get_total_duration_from_transcription_file(
 
 
 def filter_unqiue_files(transcription_files: List[str]) -> list:
-    unique_files = set()
+    """
+    Keep one transcription file per video, the manual transcription is preferred over
+    the auto generated one. The files are expected at
+    ``{video_id}/{manual|auto}/{file name}``.
+
+    Parameters
+    ----------
+    transcription_files: ``List[str]``
+        The paths to the transcription files
+
+    Returns
+    -------
+    ``list``
+        The path of the preferred transcription file of each video
+    """
+    unique_files = {}
     for transcript_file in transcription_files:
-        if "manual" in str(transcript_file):
-            unique_files.add(str(transcript_file))
-        else:
-            auto_trans = str(transcript_file).replace("auto", "manual")
-            if auto_trans not in unique_files:
-                unique_files.add(str(transcript_file))
+        transcript_path = Path(transcript_file)
+        video_dir = transcript_path.parent.parent
+        if transcript_path.parent.name == "manual" or video_dir not in unique_files:
+            unique_files[video_dir] = str(transcript_file)
 
-    return list(unique_files)
+    return list(unique_files.values())
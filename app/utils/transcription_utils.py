@@ -1,11 +1,50 @@
 import re
 import string
+from math import isqrt
+from typing import Dict, List, Sequence, Union
+
+
+def _popcount(value: int) -> int:
+    """
+    Count the set bits of a non-negative integer
+    """
+    return bin(value).count("1")
+
+
+def _lcs_rows(
+    text1: str,
+    match_masks: Dict[str, int],
+    full_mask: int,
+    start_row: int,
+    end_row: int,
+    row: int,
+) -> List[int]:
+    """
+    Advance the bit-parallel LCS row of ``start_row`` up to ``end_row`` and return every
+    row in between, both ends included.
+
+    A row is an ``n`` bit integer where a zero at bit ``j`` means that the LCS table
+    increases by one between column ``j`` and ``j + 1``.
+    """
+    rows = [row]
+    for i in range(start_row, end_row):
+        matches = row & match_masks.get(text1[i], 0)
+        row = ((row + matches) | (row - matches)) & full_mask
+        rows.append(row)
+
+    return rows
 
 
 def find_longest_common_substring(text1: str, text2: str) -> str:
     """
     Find the longest common substring between two strings
 
+    The LCS table is computed with a bit-parallel algorithm where each row of the
+    table is stored as the bits of a single integer. Only every ``sqrt(m)`` th row
+    is kept during the forward pass, the rows in between are recomputed block by
+    block while tracing back, so the memory stays close to linear in the length of
+    the strings. The output is identical to the classic full table implementation.
+
     Parameters
     ----------
     text1: ``str``
@@ -18,33 +57,63 @@ def find_longest_common_substring(text1: str, text2: str) -> str:
     ``str``
         The longest common substring between the two strings
     """
-    list1 = list(text1)
-    list2 = list(text2)
-
-    m = len(list1)
-    n = len(list2)
-    table = [[0 for _ in range(n + 1)] for _ in range(m + 1)]
-
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if list1[i - 1] == list2[j - 1]:
-                table[i][j] = table[i - 1][j - 1] + 1
-            else:
-                table[i][j] = max(table[i - 1][j], table[i][j - 1])
+    m = len(text1)
+    n = len(text2)
+    full_mask = (1 << n) - 1
+
+    match_masks: Dict[str, int] = {}
+    for j, char in enumerate(text2):
+        match_masks[char] = match_masks.get(char, 0) | (1 << j)
+
+    # Forward pass, keeping only the checkpoint rows
+    block_size = max(1, isqrt(m))
+    checkpoints = [full_mask]
+    row = full_mask
+    for i in range(m):
+        matches = row & match_masks.get(text1[i], 0)
+        row = ((row + matches) | (row - matches)) & full_mask
+        if (i + 1) % block_size == 0:
+            checkpoints.append(row)
 
     common_substring = []
     i = m
     j = n
+    block_start = -1
+    rows: List[int] = []
 
+    # Trace back from the bottom right corner. ``current`` is table[i][j] and
+    # ``upper`` is table[i - 1][j], both derived from the rows of the block.
     while i > 0 and j > 0:
-        if list1[i - 1] == list2[j - 1]:
-            common_substring.append(list1[i - 1])
+        if i <= block_start or block_start < 0:
+            block_start = ((i - 1) // block_size) * block_size
+            block_end = min(block_start + block_size, m)
+            rows = _lcs_rows(
+                text1,
+                match_masks,
+                full_mask,
+                block_start,
+                block_end,
+                checkpoints[block_start // block_size],
+            )
+            current = j - _popcount(rows[i - block_start] & ((1 << j) - 1))
+            upper = j - _popcount(rows[i - 1 - block_start] & ((1 << j) - 1))
+
+        if text1[i - 1] == text2[j - 1]:
+            common_substring.append(text1[i - 1])
             i -= 1
             j -= 1
-        elif table[i - 1][j] > table[i][j - 1]:
+            current -= 1
+        elif upper > current - 1 + ((rows[i - block_start] >> (j - 1)) & 1):
             i -= 1
+            current = upper
         else:
+            current -= 1 - ((rows[i - block_start] >> (j - 1)) & 1)
+            upper -= 1 - ((rows[i - 1 - block_start] >> (j - 1)) & 1)
             j -= 1
+            continue
+
+        if i > block_start and j > 0:
+            upper = j - _popcount(rows[i - 1 - block_start] & ((1 << j) - 1))
 
     common_substring.reverse()
     final_string = ""
@@ -103,3 +172,65 @@ def clean_transcription(transcription: str) -> str:
     transcription = re.sub(r"[\u200b\s]+", " ", transcription)
 
     return transcription.strip()
+
+
+def calculate_edit_distance(
+    sequence1: Union[str, Sequence[str]], sequence2: Union[str, Sequence[str]]
+) -> int:
+    """
+    Calculate the Levenshtein distance between two sequences of characters or words
+
+    Uses Myers' bit-vector algorithm, so each element of ``sequence2`` updates a whole
+    column of the edit distance table with a handful of integer operations.
+
+    Parameters
+    ----------
+    sequence1: ``Union[str, Sequence[str]]``
+        The reference sequence, either a string or a list of words
+    sequence2: ``Union[str, Sequence[str]]``
+        The hypothesis sequence, either a string or a list of words
+
+    Returns
+    -------
+    ``int``
+        The minimum number of insertions, deletions and substitutions to turn
+        ``sequence1`` into ``sequence2``
+    """
+    m = len(sequence1)
+    if m == 0:
+        return len(sequence2)
+
+    full_mask = (1 << m) - 1
+    last_bit = 1 << (m - 1)
+    match_masks: Dict[str, int] = {}
+    for i, token in enumerate(sequence1):
+        match_masks[token] = match_masks.get(token, 0) | (1 << i)
+
+    positive_vertical = full_mask
+    negative_vertical = 0
+    distance = m
+
+    for token in sequence2:
+        matches = match_masks.get(token, 0)
+        vertical = matches | negative_vertical
+        horizontal = (
+            ((matches & positive_vertical) + positive_vertical) ^ positive_vertical
+        ) | matches
+        positive_horizontal = negative_vertical | (
+            ~(horizontal | positive_vertical) & full_mask
+        )
+        negative_horizontal = positive_vertical & horizontal
+
+        if positive_horizontal & last_bit:
+            distance += 1
+        elif negative_horizontal & last_bit:
+            distance -= 1
+
+        positive_horizontal = ((positive_horizontal << 1) | 1) & full_mask
+        negative_horizontal = (negative_horizontal << 1) & full_mask
+        positive_vertical = negative_horizontal | (
+            ~(vertical | positive_horizontal) & full_mask
+        )
+        negative_vertical = positive_horizontal & vertical
+
+    return distance
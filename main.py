@@ -5,10 +5,26 @@ from app.models.speech_language_detection.speech_language_detection import (
 )
 from app.data_validator import DataValidator
 from app.models.asr.asr import ASR
+from app.similarity.similarity_scorer import SimilarityScorer
 from app.data_instances.download_config import DownloadConfig
+from app.data_instances.pipeline_config import PipelineConfig
+from app.data_instances.database_config import DatabaseConfig
+from app.data_instances.job_queue_config import JobQueueConfig
 from app.db.db_functions import filter_and_insert_videos
-from app.db.connection import create_db_and_tables
+from app.db.connection import configure_engine, create_db_and_tables
+from app.db.metadata_writer import VideoMetadataWriter
+from app.db.seen_video_index import SeenVideoIndex
+from app.db.checkpoint import VideoCheckpoint
+from app.data_instances.video_stage import VideoStage
+from app.data_instances.run_mode import RunMode
+from app.storage.manifest import ManifestWriter
+from app.storage.pcm_shards import PCMShardWriter
 from app.utils.file_utils import create_dir, remove_files_with_pattern
+from app.staged_collector import StagedCollector
+from app.jobs.job_queue import JobQueue
+from app.jobs.job_worker import JobWorker
+from app.metrics import export_metrics
+from app.tracing import TRACER
 import hydra
 from omegaconf import DictConfig, OmegaConf
 
@@ -31,7 +47,20 @@ def main(cfg: DictConfig):
     speech_language_detection_config =config.pop("speech_language_detection")
 
     asr_config = config.pop("asr_provider")
+    similarity_scorer_config = config.pop("similarity_scorer")
+    pipeline_config = PipelineConfig(**config.pop("pipeline"))
+    database_config = DatabaseConfig(**config.pop("database"))
+    job_queue_config = JobQueueConfig(**config.pop("job_queue"))
     download_config = DownloadConfig(**config)
+    run_mode = RunMode(download_config.mode)
+    if run_mode != RunMode.FULL and not download_config.use_checkpoint:
+        raise ValueError(
+            f"mode {run_mode.value} stores its output in the checkpoint, set use_checkpoint to true"
+        )
+    if job_queue_config.enabled and not download_config.use_checkpoint:
+        raise ValueError(
+            "the job queue hands the videos between workers through the checkpoint, set use_checkpoint to true"
+        )
     
     logger.info(
         f"device: {download_config.device}\nmax_pages: {download_config.max_pages}\nlanguage: {download_config.language}"
@@ -45,16 +74,89 @@ def main(cfg: DictConfig):
     file_path = Path(__file__).parent
 
     audio_download_folder = Path(download_config.dst_folder_name)
+    metrics_dir = download_config.metrics_dir or audio_download_folder / "metrics"
+    if download_config.trace_path:
+        TRACER.configure(
+            True, download_config.profile_stage, download_config.profile_interval
+        )
+
+    configure_engine(
+        database_config.db_path,
+        database_config.busy_timeout,
+        database_config.journal_mode,
+        database_config.synchronous,
+        database_config.pool_size,
+        database_config.db_url,
+    )
+    create_db_and_tables()
+    checkpoint = VideoCheckpoint() if download_config.use_checkpoint else None
+    manifest_writer = None
+    if download_config.use_manifest and run_mode == RunMode.FULL:
+        manifest_writer = ManifestWriter(
+            download_config.manifest_dir or audio_download_folder / "manifest",
+            download_config.manifest_rows_per_file,
+        )
+
+    def on_metadata_flush(videos_metadata):
+        # the manifest rows of the videos are written before they count as persisted
+        if manifest_writer:
+            manifest_writer.flush()
+        if checkpoint:
+            checkpoint.mark_persisted(videos_metadata)
+
+    metadata_writer = VideoMetadataWriter(
+        database_config.metadata_batch_size,
+        database_config.metadata_flush_seconds,
+        on_metadata_flush,
+    )
+
+    seen_video_index = None
+    if download_config.use_seen_video_index:
+        seen_video_index = SeenVideoIndex(
+            download_config.seen_video_index_capacity,
+            download_config.seen_video_index_false_positive_rate,
+        )
+        logger.info(f"loaded {seen_video_index.load_from_db()} videos into the seen video index")
 
     # Initialize the data retrieval, whisper model, nemo model, audio processor and data validator
-    data_retrieval = DataRetrieval()
+    data_retrieval = DataRetrieval(
+        use_cache=download_config.use_video_cache,
+        cache_ttl_days=download_config.video_cache_ttl_days,
+        seen_video_index=seen_video_index,
+    )
+
+    # The discover and transcripts modes never touch the audio, so no model is built
+    audio_processor = None
+    shard_writer = None
+    if run_mode == RunMode.FULL:
+        with TRACER.span("resolve_providers"):
+            speech_language_detector = SpeechLanguageDetection.by_name(
+                speech_language_detection_config.pop("provider")
+            )(**speech_language_detection_config)
+            asr = ASR.by_name(asr_config.pop("provider"))(**asr_config)
+        similarity_scorer = SimilarityScorer.by_name(
+            similarity_scorer_config.pop("provider")
+        )(**similarity_scorer_config)
 
-    speech_language_detector = SpeechLanguageDetection.by_name(
-        speech_language_detection_config.pop("provider")
-    )(**speech_language_detection_config)
-    asr = ASR.by_name(asr_config.pop("provider"))(**asr_config)
+        if download_config.chunk_storage == "pcm_shards":
+            shard_writer = PCMShardWriter(
+                download_config.shard_dir or audio_download_folder / "shards",
+                download_config.shard_size_mb,
+            )
 
-    audio_processor = AudioProcessor(speech_language_detector, asr)
+        audio_processor = AudioProcessor(
+            speech_language_detector,
+            asr,
+            similarity_scorer,
+            download_config.chunk_format,
+            download_config.chunk_export_engine,
+            download_config.chunk_export_workers,
+            download_config.chunks_per_export_process,
+            metadata_writer,
+            checkpoint,
+            shard_writer,
+            manifest_writer,
+        )
     data_validator = DataValidator()
 
     if isinstance(search_queries, str):
@@ -62,69 +164,182 @@ def main(cfg: DictConfig):
     processed_queries_path = file_path / "processed_queries.txt"
     if processed_queries_path.exists():
         with open(file_path / "processed_queries.txt", "r") as f:
-            processed_queries = f.read().splitlines()
-        for query in processed_queries:
-            if query in search_queries:
-                search_queries.remove(query)
+            processed_queries = set(f.read().splitlines())
+        search_queries = [query for query in search_queries if query not in processed_queries]
+
+    if job_queue_config.enabled:
+        # every mode has its own queue, so a later mode claims the queries again and
+        # resumes them from the checkpoint
+        job_queue = JobQueue.by_name(job_queue_config.backend)(
+            run_mode.value, job_queue_config.max_attempts
+        )
+        job_worker = JobWorker(
+            job_queue,
+            data_retrieval,
+            data_validator,
+            audio_processor,
+            download_config,
+            job_queue_config,
+            checkpoint,
+            processed_queries_path,
+        )
+        try:
+            logger.info(f"added {job_worker.enqueue_queries(search_queries)} query jobs")
+            job_worker.run()
+            metadata_writer.close()
+            if shard_writer:
+                shard_writer.close()
+            if manifest_writer:
+                manifest_writer.close()
+        finally:
+            export_metrics(metrics_dir)
+            if download_config.trace_path:
+                TRACER.write(download_config.trace_path)
+        return
+
+    if pipeline_config.enabled:
+        try:
+            StagedCollector(
+                data_retrieval,
+                data_validator,
+                audio_processor,
+                download_config,
+                pipeline_config,
+                processed_queries_path,
+                checkpoint,
+            ).run(search_queries)
+            metadata_writer.close()
+            if shard_writer:
+                shard_writer.close()
+            if manifest_writer:
+                manifest_writer.close()
+        finally:
+            export_metrics(metrics_dir)
+            if download_config.trace_path:
+                TRACER.write(download_config.trace_path)
+        return
 
     # Collect the video metadata, transcriptions for each query.
     # Download the audio and split it into chunks and save the transcription along with the metadata
-    for search_query in search_queries:
-        logger.info(f"Collecting urls for query or channel id: {search_query}")
-        if download_config.is_channel_ids:
-            audio_query_folder = audio_download_folder / search_query
-            videos_metadata = data_retrieval.get_video_metadata_with_channel_id(
-                search_query
-            )
-        else:
+    try:
+        for search_query in search_queries:
             original_query = search_query
-            search_query = search_query.lower().strip()
-            search_query = search_query.replace(" ", "+").strip()
-            audio_query_folder = audio_download_folder / search_query.replace(
-                "+", "_"
-            ).replace('"', "")
-            logger.info(f"Collecting urls for query: {search_query}")
-            videos_metadata = data_retrieval.get_video_metadata_with_query(
-                search_query, max_pages=download_config.max_pages
-            )
+            with TRACER.span("query", query=original_query):
+                logger.info(f"Collecting urls for query or channel id: {search_query}")
+                if download_config.is_channel_ids:
+                    audio_query_folder = audio_download_folder / search_query
+                else:
+                    search_query = search_query.lower().strip()
+                    search_query = search_query.replace(" ", "+").strip()
+                    audio_query_folder = audio_download_folder / search_query.replace(
+                        "+", "_"
+                    ).replace('"', "")
 
-        create_dir(audio_query_folder)
+                create_dir(audio_query_folder)
 
-        with open(audio_query_folder / "urls_list.txt", "w") as f:
-            video_urls = [metadata.url for metadata in videos_metadata]
-            f.write("\n".join(video_urls))
-        logger.info(f"total collected urls before filtering : {len(videos_metadata)}")
-        videos_metadata = filter_and_insert_videos(videos_metadata)
+                if checkpoint and checkpoint.is_query_searched(original_query):
+                    # The query was searched before an interruption, continue with its
+                    # unfinished videos and only fetch the transcripts that were not fetched
+                    videos_metadata = checkpoint.get_query_videos(original_query)
+                    videos_to_fetch = checkpoint.get_query_videos(
+                        original_query, before=VideoStage.VALIDATED
+                    )
+                    logger.info(
+                        f"Resuming {len(videos_metadata)} unfinished videos for prompt: {search_query}"
+                    )
+                else:
+                    with TRACER.span("search", query=search_query):
+                        if download_config.is_channel_ids:
+                            videos_metadata = data_retrieval.get_video_metadata_with_channel_id(
+                                search_query, download_config.license_workers
+                            )
+                        else:
+                            logger.info(f"Collecting urls for query: {search_query}")
+                            videos_metadata = data_retrieval.get_video_metadata_with_query(
+                                search_query, max_pages=download_config.max_pages
+                            )
 
-        logger.info(f"Collecting transcripts for prompt: {search_query}")
-        video_transcription_data = data_retrieval.get_video_transcripts(videos_metadata)
+                    with open(audio_query_folder / "urls_list.txt", "w") as f:
+                        video_urls = [metadata.url for metadata in videos_metadata]
+                        f.write("\n".join(video_urls))
+                    logger.info(f"total collected urls before filtering : {len(videos_metadata)}")
+                    with TRACER.span("filter", videos=len(videos_metadata)):
+                        videos_metadata = filter_and_insert_videos(videos_metadata)
+                    if seen_video_index:
+                        seen_video_index.add_urls(metadata.url for metadata in videos_metadata)
+                    if checkpoint:
+                        checkpoint.mark_discovered(original_query, videos_metadata)
+                    videos_to_fetch = videos_metadata
 
-        logger.info(f"total collected transcriptions : {len(video_transcription_data)}")
-        logger.info(f"Validating transcripts for prompt: {search_query}")
-        valid_transcriptions = data_validator.validate_transcriptions(
-            video_transcription_data
-        )
+                if not run_mode.includes(RunMode.TRANSCRIPTS):
+                    logger.info(f"total discovered videos : {len(videos_to_fetch)} for prompt: {search_query}")
+                    continue
 
-        logger.info(f"total valid transcriptions : {len(valid_transcriptions)}")
-        logger.info(f"Downloading audio and splitting for prompt: {search_query}")
-        audio_processor.download_and_split_audio(
-            audio_query_folder,
-            valid_transcriptions,
-            videos_metadata,
-            download_config.download_audio_format,
-            download_config.percent_match,
-        )
+                logger.info(f"Collecting transcripts for prompt: {search_query}")
+                with TRACER.span("transcripts", videos=len(videos_to_fetch)):
+                    video_transcription_data = data_retrieval.get_video_transcripts(
+                        videos_to_fetch,
+                        download_config.transcript_workers,
+                        checkpoint,
+                    )
+
+                logger.info(f"total collected transcriptions : {len(video_transcription_data)}")
+                logger.info(f"Validating transcripts for prompt: {search_query}")
+                with TRACER.span("validate", videos=len(video_transcription_data)):
+                    valid_transcriptions = data_validator.validate_transcriptions(
+                        video_transcription_data
+                    )
+                if checkpoint:
+                    checkpoint.mark_validated(
+                        [metadata.url for metadata in videos_to_fetch], valid_transcriptions
+                    )
+                    valid_transcriptions = checkpoint.get_validated_transcriptions(
+                        [metadata.url for metadata in videos_metadata]
+                    )
+
+                logger.info(f"total valid transcriptions : {len(valid_transcriptions)}")
+                if not run_mode.includes(RunMode.FULL):
+                    continue
+
+                logger.info(f"Downloading audio and splitting for prompt: {search_query}")
+                with TRACER.span("download_and_split", videos=len(valid_transcriptions)):
+                    audio_processor.download_and_split_audio(
+                        audio_query_folder,
+                        valid_transcriptions,
+                        videos_metadata,
+                        download_config.download_audio_format,
+                        download_config.percent_match,
+                        download_config.in_memory_chunks,
+                        download_config.export_chunks,
+                        download_config.download_workers,
+                        download_config.download_lookahead,
+                    )
 
-        with open(file_path / "processed_queries.txt", "a+") as f:
-            f.write(original_query + "\n")
+                metadata_writer.flush()
+                if checkpoint:
+                    checkpoint.mark_query_done(original_query)
+                with open(file_path / "processed_queries.txt", "a+") as f:
+                    f.write(original_query + "\n")
         
-        logger.info(f"Deleting longer audio files for prompt: {audio_query_folder} and pattern: {download_config.download_audio_format}")
-        remove_files_with_pattern(
-            audio_query_folder, download_config.download_audio_format
-        )
-        remove_files_with_pattern(audio_query_folder, ".part")
+                logger.info(f"Deleting longer audio files for prompt: {audio_query_folder} and pattern: {download_config.download_audio_format}")
+                remove_files_with_pattern(
+                    audio_query_folder, download_config.download_audio_format
+                )
+                remove_files_with_pattern(audio_query_folder, ".part")
+                # the textfile is refreshed after every query so a long run can be scraped
+                export_metrics(metrics_dir)
+
+        metadata_writer.close()
+        if shard_writer:
+            shard_writer.close()
+        if manifest_writer:
+            manifest_writer.close()
+    finally:
+        # an interrupted run still writes its metrics and a balanced trace
+        export_metrics(metrics_dir)
+        if download_config.trace_path:
+            TRACER.write(download_config.trace_path)
 
 
 if __name__ == "__main__":
-    create_db_and_tables()
     main()